@@ -0,0 +1,80 @@
+"""Microbenchmark: per-call cost of building osxphotos argv for export_photos.
+
+Compares the previous per-call `locals()`/isinstance loop with the precompiled
+option-spec builder. Run with:
+
+    python benchmarks/bench_argv.py [iterations]
+"""
+import inspect
+import os
+import sys
+import timeit
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.server import _append_multi_arg_group, _append_multi_arg_pairs, _flag, build_argv  # noqa: E402
+
+
+def legacy_export_argv(values):
+    """The loop export_photos ran on every call before option specs."""
+    cmd = ["osxphotos", "export", values["dest"]]
+    for key, value in values.items():
+        if key == 'dest':
+            continue
+        if key == "cmd":
+            continue
+        if value:
+            if key in {"xattr_template", "post_command", "regex", "exif"}:
+                _append_multi_arg_pairs(cmd, key, value)
+            elif key == "sidecar_template":
+                _append_multi_arg_group(cmd, key, value, 3)
+            else:
+                if isinstance(value, bool):
+                    cmd.append(_flag(key))
+                elif isinstance(value, list):
+                    for item in value:
+                        cmd.extend([_flag(key), str(item)])
+                else:
+                    cmd.extend([_flag(key), str(value)])
+    return cmd
+
+
+def export_values():
+    """Every export_photos parameter at its default, plus a typical set of options."""
+    fn = server.mcp._tool_manager._tools["export_photos"].fn
+    values = {
+        name: (None if p.default is inspect.Parameter.empty else p.default)
+        for name, p in inspect.signature(fn).parameters.items()
+    }
+    values.update({
+        "dest": "/Volumes/Backup/Photos",
+        "library": "~/Pictures/Photos Library.photoslibrary",
+        "keyword": ["travel", "family"],
+        "album": ["2024"],
+        "update": True,
+        "directory": "{created.year}/{created.mm}",
+        "exif": [{"tag": "Make", "value": "Apple"}],
+        "verbose": True,
+    })
+    return values
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    values = export_values()
+    assert sorted(legacy_export_argv(values)) == sorted(build_argv("export_photos", values))
+    print(f"export_photos: {len(values)} parameters, {iterations} iterations")
+    for label, func in (
+        ("locals() loop", lambda: legacy_export_argv(values)),
+        ("option specs", lambda: build_argv("export_photos", values)),
+    ):
+        best = min(timeit.repeat(func, number=iterations, repeat=5))
+        print(f"  {label:<14} {best / iterations * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cold start to first tools/list response, eager versus lazy tool registration.
+
+Spawns the server the way MCP clients do (stdio), sends initialize, the initialized
+notification and tools/list, and measures wall time from spawn to the tools/list
+response. "lazy, no schema cache" is a first start: it registers the tools eagerly and
+writes the cache for the next start, so it should cost about the same as eager. Run with:
+
+    python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+
+_REQUESTS = [
+    {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+        "protocolVersion": "2025-06-18", "capabilities": {},
+        "clientInfo": {"name": "bench", "version": "0"}}},
+    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+    {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+]
+
+
+def time_to_list_tools(env):
+    """Return (seconds from spawn to the tools/list response, tool names)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "mcp_osxphotos"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        env=env, cwd=SRC_DIR, text=True,
+    )
+    try:
+        for request in _REQUESTS:
+            proc.stdin.write(json.dumps(request) + "\n")
+        proc.stdin.flush()
+        for line in proc.stdout:
+            message = json.loads(line)
+            if message.get("id") == 2:
+                elapsed = time.perf_counter() - start
+                return elapsed, sorted(t["name"] for t in message["result"]["tools"])
+        raise RuntimeError("server exited before answering tools/list")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cache_dir = tempfile.mkdtemp(prefix="mcp-osxphotos-bench-")
+    base = dict(os.environ, PYTHONPATH=SRC_DIR, MCP_OSXPHOTOS_SCHEMA_CACHE=os.path.join(cache_dir, "schemas.json"))
+    base.pop("MCP_OSXPHOTOS_LAZY_TOOLS", None)
+    lazy = dict(base, MCP_OSXPHOTOS_LAZY_TOOLS="1")
+
+    def cold(env):
+        try:
+            os.remove(env["MCP_OSXPHOTOS_SCHEMA_CACHE"])
+        except OSError:
+            pass
+        return time_to_list_tools(env)
+
+    def warm(env):
+        # The server is killed right after tools/list, before a first start writes the cache
+        if not os.path.exists(env["MCP_OSXPHOTOS_SCHEMA_CACHE"]):
+            subprocess.run([sys.executable, "-m", "mcp_osxphotos", "--build-schema-cache"],
+                           env=env, cwd=SRC_DIR, stdout=subprocess.DEVNULL, check=True)
+        return time_to_list_tools(env)
+
+    results = {}
+    names = {}
+    for label, env, fn in (
+        ("eager", base, time_to_list_tools),
+        ("lazy, no schema cache", lazy, cold),
+        ("lazy, schema cache", lazy, warm),
+    ):
+        times = []
+        for _ in range(runs):
+            elapsed, names[label] = fn(env)
+            times.append(elapsed)
+        results[label] = times
+    assert len({tuple(n) for n in names.values()}) == 1, "lazy mode listed different tools"
+    print(f"spawn to first tools/list response, {runs} runs ({len(names['eager'])} tools)")
+    for label, times in results.items():
+        print(f"  {label:<22} median {1000 * statistics.median(times):7.1f} ms   min {1000 * min(times):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Tool-level benchmarks of the server against a synthetic osxphotos.
+
+`stub_osxphotos.py` stands in for the real CLI (which only runs on macOS with a Photos
+library), so the numbers measure what the server adds on top of osxphotos: spawning,
+scheduling, reading and parsing output, pagination, progress streaming and caching.
+Each scenario runs in a fresh Python process so caches and peak RSS do not leak
+between scenarios. For every scenario the suite reports latency percentiles of the
+tool calls, throughput, peak RSS of the server process and the number of calls that
+returned an error.
+
+Run with:
+
+    python benchmarks/bench_tools.py [--photos 10000,100000] [--concurrency 1,8,32]
+        [--iterations 20] [--output results.json] [--compare baseline.json --threshold 0.15]
+
+`--photos` accepts up to 1000000 (the stub then prints about 600 MB of JSON per query).
+With `--compare`, every metric is checked against the baseline file and the exit status
+is 1 when one regressed by more than the threshold, so two commits can be compared:
+
+    git checkout main && python benchmarks/bench_tools.py --output base.json
+    git checkout topic && python benchmarks/bench_tools.py --compare base.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_osxphotos.py")
+
+# Metrics compared against a baseline and whether a larger value is better
+METRICS = {
+    "p50_ms": False,
+    "p90_ms": False,
+    "p99_ms": False,
+    "mean_ms": False,
+    "throughput_per_s": True,
+    "peak_rss_mb": False,
+}
+
+
+# ---- scenarios ----
+def scenarios(photos: List[int], concurrency: List[int], iterations: int, export_photos: int) -> List[Dict[str, Any]]:
+    """The scenario list; each entry is self-contained and passed to a child process."""
+    out: List[Dict[str, Any]] = []
+    for n in photos:
+        # Keep the total amount of synthetic JSON per scenario roughly constant
+        runs = max(3, iterations * 10000 // max(n, 1))
+        out.append({"name": f"query_json_{n}", "tool": "query_photos", "kwargs": {"json": True},
+                    "env": {"STUB_PHOTOS": n}, "iterations": runs})
+        out.append({"name": f"query_page_{n}", "tool": "query_photos", "kwargs": {"json": True, "page_size": 100},
+                    "env": {"STUB_PHOTOS": n}, "iterations": runs})
+    out.append({"name": "persons_json", "tool": "persons", "kwargs": {"json": True},
+                "env": {"STUB_PHOTOS": 10000, "MCP_OSXPHOTOS_CACHE_TTL": 0}, "iterations": iterations})
+    out.append({"name": "persons_json_cached", "tool": "persons", "kwargs": {"json": True},
+                "env": {"STUB_PHOTOS": 10000}, "iterations": iterations * 10})
+    out.append({"name": f"export_progress_{export_photos}", "tool": "export_photos", "kwargs": {"dest": "{tmp}"},
+                "env": {"STUB_PHOTOS": export_photos}, "iterations": max(3, iterations // 4)})
+    out.append({"name": "failures", "tool": "persons", "kwargs": {"json": True},
+                "env": {"STUB_PHOTOS": 1000, "STUB_FAIL_RATE": 0.5, "MCP_OSXPHOTOS_CACHE_TTL": 0},
+                "iterations": iterations})
+    for callers in concurrency:
+        # 50 ms of simulated osxphotos work per call, so throughput shows how well calls overlap
+        env = {"STUB_PHOTOS": 1000, "STUB_LATENCY_MS": 50, "MCP_OSXPHOTOS_MAX_CONCURRENCY": max(callers, 1)}
+        out.append({"name": f"concurrent_{callers}", "tool": "query_photos", "kwargs": {"json": True},
+                    "vary": "keyword", "env": env, "iterations": iterations, "callers": callers})
+        if callers > 1:
+            out.append({"name": f"concurrent_{callers}_duplicates", "tool": "query_photos", "kwargs": {"json": True},
+                        "env": env, "iterations": iterations, "callers": callers})
+    return out
+
+
+# ---- child: run one scenario in this process ----
+def _max_rss_mb(who: int) -> float:
+    # Only the server process is measured: forked children inherit its RSS until exec,
+    # so RUSAGE_CHILDREN would mostly report the parent again
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _run_scenario(scenario: Dict[str, Any], tmp: str) -> Dict[str, Any]:
+    from mcp_osxphotos import server
+
+    fn = getattr(server, scenario["tool"])
+    callers = scenario.get("callers", 1)
+    latencies: List[float] = []
+    errors = 0
+
+    def kwargs(caller: int) -> Dict[str, Any]:
+        values = {k: v.format(tmp=tmp) if isinstance(v, str) else v for k, v in scenario["kwargs"].items()}
+        if scenario.get("vary"):
+            values[scenario["vary"]] = [f"caller-{caller}"]
+        return values
+
+    async def caller(index: int) -> None:
+        nonlocal errors
+        for _ in range(scenario["iterations"]):
+            start = time.perf_counter()
+            result = await fn(**kwargs(index))
+            latencies.append(time.perf_counter() - start)
+            if result.startswith("Error:"):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(i) for i in range(callers)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    ms = [1000 * value for value in latencies]
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(ms, 0.50), 3),
+        "p90_ms": round(_percentile(ms, 0.90), 3),
+        "p99_ms": round(_percentile(ms, 0.99), 3),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "throughput_per_s": round(len(latencies) / wall, 3) if wall else 0.0,
+        "peak_rss_mb": round(_max_rss_mb(resource.RUSAGE_SELF), 1),
+    }
+
+
+def child_main(scenario: Dict[str, Any]) -> None:
+    sys.path.insert(0, SRC_DIR)
+    with tempfile.TemporaryDirectory(prefix="mcp-osxphotos-bench-") as tmp:
+        result = asyncio.run(_run_scenario(scenario, tmp))
+    json.dump(result, sys.stdout)
+
+
+# ---- parent: run every scenario and compare ----
+def _stub_launcher(directory: str) -> str:
+    """An executable that runs the stub under this interpreter."""
+    path = os.path.join(directory, "osxphotos")
+    with open(path, "w") as fh:
+        fh.write(f"#!{sys.executable}\nimport runpy\nrunpy.run_path({STUB!r}, run_name='__main__')\n")
+    os.chmod(path, 0o755)
+    return path
+
+
+def run_scenario(scenario: Dict[str, Any], launcher: str, cache_dir: str) -> Dict[str, Any]:
+    env = dict(os.environ, OSXPHOTOS_BIN=launcher, XDG_CACHE_HOME=cache_dir, PYTHONPATH=SRC_DIR)
+    env.update({key: str(value) for key, value in scenario["env"].items()})
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", json.dumps(scenario)],
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"scenario {scenario['name']} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, min_delta: float) -> List[str]:
+    """Return a description of every metric that regressed by more than `threshold`.
+
+    Differences smaller than `min_delta` (in the metric's own unit) are ignored so that
+    sub-millisecond jitter does not count as a regression.
+    """
+    regressions = []
+    for name, metrics in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None or abs(new - old) < min_delta:
+                continue
+            change = (new - old) / old
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append(f"{name}.{metric}: {old:g} -> {new:g} ({change:+.1%})")
+    return regressions
+
+
+def _print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'scenario':<30} {'calls':>6} {'err':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+          f"{'calls/s':>9} {'rss MB':>7}")
+    for name, r in results.items():
+        print(f"{name:<30} {r['calls']:>6} {r['errors']:>4} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['throughput_per_s']:>9.1f} {r['peak_rss_mb']:>7.1f}")
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main() -> None:
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child_main(json.loads(sys.argv[2]))
+        return
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--photos", type=_int_list, default=[10000, 100000],
+                        help="library sizes for the query scenarios (comma-separated, up to 1000000)")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="concurrent callers")
+    parser.add_argument("--iterations", type=int, default=20, help="calls per caller and scenario")
+    parser.add_argument("--export-photos", type=int, default=5000, help="photos in the export progress stream")
+    parser.add_argument("--only", help="run only scenarios whose name contains this text")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as regression")
+    parser.add_argument("--min-delta", type=float, default=1.0,
+                        help="ignore absolute differences below this (ms, MB or calls/s)")
+    args = parser.parse_args()
+
+    selected = [s for s in scenarios(args.photos, args.concurrency, args.iterations, args.export_photos)
+                if not args.only or args.only in s["name"]]
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="mcp-osxphotos-bench-") as tmp:
+        launcher = _stub_launcher(tmp)
+        for scenario in selected:
+            print(f"running {scenario['name']} ...", file=sys.stderr, flush=True)
+            results[scenario["name"]] = dict(
+                run_scenario(scenario, launcher, os.path.join(tmp, "cache")),
+                config={"env": scenario["env"], "iterations": scenario["iterations"],
+                        "callers": scenario.get("callers", 1)},
+            )
+    report = {
+        "version": 1,
+        "meta": {
+            "revision": _git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": results,
+    }
+    _print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(baseline, report, args.threshold, args.min_delta)
+        revision = baseline.get("meta", {}).get("revision") or args.compare
+        if regressions:
+            print(f"regressions against {revision} (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"no regressions against {revision} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
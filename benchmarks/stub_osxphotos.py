@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Synthetic `osxphotos` executable for benchmarks.
+
+Point OSXPHOTOS_BIN at this file (it is executable with a shebang) to run the server
+against deterministic fake data instead of a Photos library. Behavior is configured
+with environment variables:
+
+- STUB_PHOTOS: number of photos in the fake library (default: 10000)
+- STUB_LATENCY_MS: extra delay before every command produces output (default: 0)
+- STUB_LINE_DELAY_MS: delay between progress lines of export/import (default: 0)
+- STUB_FAIL_RATE: probability in [0, 1] that a command fails with exit status 1 (default: 0)
+- STUB_SEED: seed for the synthetic data (default: 1)
+
+Supported commands: ``query``/``dump`` (``--json`` prints every photo, ``--count``
+prints the count), ``persons``/``keywords``/``albums``/``labels`` (``--json`` summary),
+``export``/``import`` (a progress stream of one line per photo), ``--version``,
+``--help`` and ``COMMAND --help``. Anything else echoes its arguments.
+"""
+import json
+import os
+import random
+import sys
+import time
+
+KEYWORDS = ["travel", "family", "beach", "mountains", "city", "food", "pets", "birthday", "snow", "sunset",
+            "concert", "garden", "hiking", "museum", "wedding", "friends", "work", "car", "boat", "river"]
+PERSONS = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy", "_UNKNOWN_"]
+ALBUMS = ["Favorites 2020", "Summer", "Winter", "Road trip", "Kids", "Best of", "To print", "Archive"]
+LABELS = ["Sky", "Plant", "Dog", "Cat", "Food", "Beach", "Mountain", "People", "Vehicle", "Building", "Water"]
+_CHUNK = 1000
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def photo(index, rng):
+    """The synthetic photo number `index`; the same seed always yields the same library."""
+    year = 2010 + index % 15
+    ext = "mov" if index % 17 == 0 else "heic" if index % 3 else "jpg"
+    return {
+        "uuid": f"{index:08X}-{rng.getrandbits(16):04X}-4{rng.getrandbits(12):03X}-8000-{index * 7919 % 16**12:012X}",
+        "filename": f"IMG_{index:07d}.{ext}",
+        "original_filename": f"IMG_{index:07d}.{ext}",
+        "date": f"{year}-{1 + index % 12:02d}-{1 + index % 28:02d}T{index % 24:02d}:{index % 60:02d}:00+00:00",
+        "date_added": f"{year}-{1 + index % 12:02d}-{1 + index % 28:02d}T12:00:00+00:00",
+        "title": f"Photo {index}" if index % 5 == 0 else None,
+        "description": f"Synthetic photo number {index}" if index % 11 == 0 else None,
+        "keywords": rng.sample(KEYWORDS, index % 4),
+        "persons": rng.sample(PERSONS, index % 3),
+        "albums": rng.sample(ALBUMS, index % 2),
+        "labels": rng.sample(LABELS, index % 5),
+        "favorite": index % 9 == 0,
+        "hidden": index % 97 == 0,
+        "ismovie": ext == "mov",
+        "isphoto": ext != "mov",
+        "width": 4032,
+        "height": 3024,
+        "original_filesize": 1_000_000 + rng.randrange(4_000_000),
+        "latitude": round(rng.uniform(-60, 70), 6) if index % 4 else None,
+        "longitude": round(rng.uniform(-180, 180), 6) if index % 4 else None,
+        "path": f"/Photos Library.photoslibrary/originals/{index % 16:X}/IMG_{index:07d}.{ext}",
+    }
+
+
+def photos(count, seed):
+    rng = random.Random(seed)
+    for index in range(count):
+        yield photo(index, rng)
+
+
+def write_json_list(count, seed):
+    out = sys.stdout
+    out.write("[")
+    chunk = []
+    for index, item in enumerate(photos(count, seed)):
+        chunk.append(json.dumps(item))
+        if len(chunk) == _CHUNK:
+            out.write(("," if index >= _CHUNK else "") + ",".join(chunk))
+            chunk = []
+    if chunk:
+        out.write(("," if count > len(chunk) else "") + ",".join(chunk))
+    out.write("]\n")
+
+
+def summary(field, count, seed):
+    counts = {}
+    for item in photos(min(count, 20000), seed):
+        for name in item[field]:
+            counts[name] = counts.get(name, 0) + 1
+    scale = max(1, count // 20000)
+    return {name: value * scale for name, value in sorted(counts.items())}
+
+
+def progress(verb, dest, count, line_delay):
+    print(f"{verb} {count} photos to {dest}", flush=True)
+    for index in range(count):
+        print(f"{verb[:-3]}ed IMG_{index:07d}.heic", flush=True)
+        if line_delay:
+            time.sleep(line_delay)
+    print(f"Processed: {count} photos, exported: {count}, missing: 0, error: 0", flush=True)
+
+
+def main(argv):
+    count = _env_int("STUB_PHOTOS", 10000)
+    seed = _env_int("STUB_SEED", 1)
+    latency = _env_float("STUB_LATENCY_MS", 0.0) / 1000
+    if latency:
+        time.sleep(latency)
+    if random.random() < _env_float("STUB_FAIL_RATE", 0.0):
+        sys.stderr.write("Error: synthetic failure\n")
+        return 1
+    if argv in (["--version"], ["-v"]):
+        print("osxphotos, version 0.0.0-stub")
+        return 0
+    if "--help" in argv:
+        print("Usage: osxphotos [OPTIONS] COMMAND [ARGS]...\n\nOptions:\n  --help  Show this message and exit.")
+        return 0
+    command = argv[0] if argv else ""
+    if command in ("query", "dump"):
+        if "--count" in argv:
+            print(count)
+        elif "--json" in argv:
+            write_json_list(count, seed)
+        else:
+            for item in photos(count, seed):
+                print(f"{item['uuid']}, {item['filename']}")
+        return 0
+    if command in ("persons", "keywords", "albums", "labels") and "--json" in argv:
+        print(json.dumps({command: summary(command, count, seed)}))
+        return 0
+    if command in ("export", "import"):
+        dest = argv[1] if len(argv) > 1 else "."
+        progress("Exporting" if command == "export" else "Importing", dest, count,
+                 _env_float("STUB_LINE_DELAY_MS", 0.0) / 1000)
+        return 0
+    print(" ".join(argv))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,7 @@
-from . import server
+import os
+import sys
+
+from . import startup
 
 
 def main() -> None:
@@ -6,5 +9,24 @@ def main() -> None:
 
     This MUST NOT emit any non-JSON to stdout. Avoid `mcp dev` here because it prints
     banners/tooling helpers that will break clients expecting pure JSON-RPC over stdio.
+
+    `mcp-osxphotos --build-schema-cache` prebuilds the tool schema cache used by the
+    lazy startup mode (MCP_OSXPHOTOS_LAZY_TOOLS) and exits.
     """
+    build_cache = sys.argv[1:] == ["--build-schema-cache"]
+    if build_cache:
+        # The cache key is computed from the lazily recorded tools
+        os.environ["MCP_OSXPHOTOS_LAZY_TOOLS"] = "1"
+    # Started before the server is imported so the profile covers all of its imports
+    startup.start_profile()
+    from . import server
+
+    startup.mark("server imported")
+    if build_cache:
+        print(server.mcp.build_schema_cache())
+        return
     server.mcp.run()
+
+
+if __name__ == "__main__":
+    main()
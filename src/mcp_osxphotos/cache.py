@@ -0,0 +1,135 @@
+"""In-memory result cache for osxphotos listing commands.
+
+Entries are keyed by the command argv and validated against a cheap fingerprint of
+the Photos library database (mtime and size of ``Photos.sqlite`` and its WAL file),
+so a cached listing is served only while the library is unchanged. Entries also
+expire after a TTL and are evicted least-recently-used once the entry count or the
+total cached size passes its limit.
+"""
+from collections import OrderedDict
+import os
+import time
+from typing import Any, Hashable, Optional, Tuple
+
+DEFAULT_LIBRARY = os.path.join("~", "Pictures", "Photos Library.photoslibrary")
+
+Fingerprint = Tuple[Tuple[int, int], ...]
+
+
+def cache_directory() -> str:
+    """Directory for the server's persistent caches ($XDG_CACHE_HOME/mcp-osxphotos)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mcp-osxphotos")
+
+
+def resolve_library(library: Optional[str]) -> str:
+    """Normalize a library path; None means the default system library.
+
+    osxphotos may pick the last library opened in Photos when --library is omitted;
+    the default location is the best cheap approximation for fingerprinting.
+    """
+    path = os.path.expanduser(library or DEFAULT_LIBRARY)
+    return os.path.realpath(path)
+
+
+def library_fingerprint(library_path: str) -> Optional[Fingerprint]:
+    """Return (mtime_ns, size) of the library database and its WAL, or None if absent."""
+    database = os.path.join(library_path, "database")
+    for name in ("Photos.sqlite", "photos.db"):
+        db_path = os.path.join(database, name)
+        try:
+            st = os.stat(db_path)
+        except OSError:
+            continue
+        parts = [(st.st_mtime_ns, st.st_size)]
+        try:
+            wal = os.stat(db_path + "-wal")
+            parts.append((wal.st_mtime_ns, wal.st_size))
+        except OSError:
+            parts.append((0, 0))
+        return tuple(parts)
+    return None
+
+
+class _Entry:
+    __slots__ = ("library", "fingerprint", "expires", "value", "size")
+
+    def __init__(
+        self, library: Optional[str], fingerprint: Optional[Fingerprint], expires: float, value: Any, size: int
+    ) -> None:
+        self.library = library
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.value = value
+        self.size = size
+
+
+class ResultCache:
+    """LRU cache with TTL, entry-count and total-size limits."""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable, fingerprint: Optional[Fingerprint]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires <= time.monotonic() or entry.fingerprint != fingerprint:
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(
+        self, key: Hashable, library: Optional[str], fingerprint: Optional[Fingerprint], value: Any,
+        size: Optional[int] = None,
+    ) -> None:
+        """Cache `value`; `size` (bytes) defaults to ``len(value)``, right for strings."""
+        size = len(value) if size is None else size
+        if not self.enabled or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = _Entry(library, fingerprint, time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_library(self, library: Optional[str]) -> int:
+        """Drop every entry for `library` (a resolved path); returns the number dropped."""
+        keys = [k for k, e in self._entries.items() if e.library == library]
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
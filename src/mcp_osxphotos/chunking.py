@@ -0,0 +1,70 @@
+"""Adaptive chunk sizing for tools that run one osxphotos process per batch of UUIDs.
+
+Every osxphotos invocation pays a fixed startup cost (interpreter, imports, PhotosDB
+load) before it processes any item. `ChunkCostModel` fits ``seconds = startup + per_item * n``
+to measured invocations and picks a chunk size that keeps the startup share small
+without starving parallel workers.
+"""
+from collections import deque
+import math
+from typing import Deque, Tuple
+
+# Priors used until enough samples are collected to fit the model (seconds)
+DEFAULT_STARTUP_COST = 2.0
+DEFAULT_PER_ITEM_COST = 0.1
+
+# Fraction of each invocation we are willing to spend on startup
+TARGET_STARTUP_SHARE = 0.1
+
+MAX_CHUNK_SIZE = 500
+
+
+class ChunkCostModel:
+    """Online linear model of invocation time versus number of items."""
+
+    def __init__(
+        self,
+        startup_cost: float = DEFAULT_STARTUP_COST,
+        per_item_cost: float = DEFAULT_PER_ITEM_COST,
+        window: int = 32,
+    ) -> None:
+        self._prior = (startup_cost, per_item_cost)
+        self._samples: Deque[Tuple[int, float]] = deque(maxlen=window)
+
+    def record(self, items: int, seconds: float) -> None:
+        """Record the wall time of one invocation that processed `items` UUIDs."""
+        if items > 0 and seconds >= 0:
+            self._samples.append((items, seconds))
+
+    def estimate(self) -> Tuple[float, float]:
+        """Return the current (startup_cost, per_item_cost) estimate in seconds."""
+        startup, per_item = self._prior
+        if len(self._samples) < 2:
+            return startup, per_item
+        n = len(self._samples)
+        mean_x = sum(x for x, _ in self._samples) / n
+        mean_y = sum(y for _, y in self._samples) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in self._samples)
+        if var_x == 0:
+            # All chunks had the same size: keep the prior split but rescale it to
+            # match the observed total so the ratio still adapts
+            predicted = startup + per_item * mean_x
+            if predicted <= 0:
+                return startup, per_item
+            scale = mean_y / predicted
+            return startup * scale, per_item * scale
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in self._samples) / var_x
+        intercept = mean_y - slope * mean_x
+        # Noisy fits can go negative; clamp to small positive costs
+        return max(intercept, 1e-3), max(slope, 1e-4)
+
+    def chunk_size(self, remaining: int, workers: int) -> int:
+        """Pick the size of the next chunk given the UUIDs left and available workers."""
+        if remaining <= 0:
+            return 0
+        startup, per_item = self.estimate()
+        # Smallest chunk where startup is at most TARGET_STARTUP_SHARE of the runtime
+        efficient = math.ceil(startup * (1 - TARGET_STARTUP_SHARE) / (TARGET_STARTUP_SHARE * per_item))
+        # Do not make chunks so large that some workers sit idle
+        balanced = math.ceil(remaining / max(workers, 1))
+        return max(1, min(efficient, balanced, MAX_CHUNK_SIZE, remaining))
@@ -0,0 +1,163 @@
+"""Planning and bookkeeping for sharded `export_photos` runs.
+
+A sharded export resolves the matching photos once, splits them into shards of about
+equal work and runs one `osxphotos export` per shard, each with its own
+``--uuid-from-file`` and its own export database. Work is mostly bytes copied plus a
+fixed cost per photo (database lookups, sidecars, exiftool), so shards are balanced on
+that rather than on photo count. All shards write into the same directory, so photos
+whose file names could collide (same name stem, ignoring case) go to the same shard,
+where osxphotos gives them distinct names as a single export would.
+
+osxphotos keeps the state `--update` relies on in the export database, so the shard
+databases are merged back into the one the export would have used. Every shard starts
+from a copy of that database (if it exists), so a row a shard left unchanged is the
+original's row and is dropped in favour of the shard that did change it.
+"""
+import heapq
+import os
+import sqlite3
+import tempfile
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Name osxphotos gives the export database inside the export directory
+EXPORT_DB_NAME = ".osxphotos_export.db"
+
+# Fixed work per photo, in bytes of copying it is worth when balancing shards
+PER_PHOTO_COST = 1024 * 1024
+
+
+class Shard(NamedTuple):
+    uuids: List[str]
+    # Sum of the photos' original file sizes
+    size: int
+
+
+def _name_key(filename: Optional[str]) -> Optional[str]:
+    # IMG_0001.HEIC, img_0001.jpg and their edited or converted versions may collide
+    return os.path.splitext(filename)[0].casefold() if filename else None
+
+
+def plan_shards(photos: Sequence[Tuple[Any, ...]], count: int) -> List[Shard]:
+    """Split `photos` into at most `count` shards of similar work.
+
+    `photos` are (uuid, size) or (uuid, size, filename) tuples; photos whose filenames
+    share a case-folded stem are kept in one shard. Greedy longest-processing-time: the
+    heaviest group goes to the lightest shard. Each shard keeps the photos in their
+    original order; empty shards are dropped.
+    """
+    groups: Dict[Any, List[int]] = {}
+    for index, photo in enumerate(photos):
+        key = _name_key(photo[2]) if len(photo) > 2 else None
+        groups.setdefault(key if key is not None else ("", index), []).append(index)
+    weights = {key: sum(photos[i][1] for i in indexes) for key, indexes in groups.items()}
+    count = max(1, min(count, len(groups)))
+    heap = [(0, i) for i in range(count)]
+    members: List[List[int]] = [[] for _ in range(count)]
+    sizes = [0] * count
+    for key in sorted(groups, key=lambda k: weights[k], reverse=True):
+        weight, shard = heapq.heappop(heap)
+        members[shard].extend(groups[key])
+        sizes[shard] += weights[key]
+        heapq.heappush(heap, (weight + weights[key] + PER_PHOTO_COST * len(groups[key]), shard))
+    return [
+        Shard([photos[i][0] for i in sorted(indexes)], size)
+        for indexes, size in zip(members, sizes)
+        if indexes
+    ]
+
+
+def seed_database(source: str, target: str) -> None:
+    """Copy export database `source` to `target` (consistently, even while in WAL mode)."""
+    remove_database(target)
+    src = sqlite3.connect(source)
+    try:
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def remove_database(path: str) -> None:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _columns(db: sqlite3.Connection, schema: str, table: str) -> Tuple[List[str], Optional[str]]:
+    """Column names of `schema.table` and its INTEGER PRIMARY KEY (rowid alias), if any."""
+    info = db.execute(f'PRAGMA {schema}.table_info("{table}")').fetchall()
+    keys = [row for row in info if row[5]]
+    rowid = keys[0][1] if len(keys) == 1 and keys[0][2].upper() == "INTEGER" else None
+    return [row[1] for row in info], rowid
+
+
+def _tables(db: sqlite3.Connection, schema: str) -> Dict[str, str]:
+    rows = db.execute(
+        f"SELECT name, sql FROM {schema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )
+    return {name: sql for name, sql in rows}
+
+
+def merge_export_dbs(target: str, shards: Sequence[str]) -> None:
+    """Merge the shard export databases into `target` and delete them.
+
+    `target`, if it exists, is the database every shard was seeded from. Rows a shard
+    added or changed are copied over (replacing rows with the same unique key); rows
+    still equal to the seed's are skipped, so they cannot undo another shard's update.
+    Rowid keys are renumbered. Missing shard databases (a shard that never started)
+    are ignored.
+    """
+    shards = [path for path in shards if os.path.exists(path)]
+    if not shards:
+        return
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, merged = tempfile.mkstemp(prefix=".osxphotos_export.merge-", suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        seed_database(shards[0], merged)
+        db = sqlite3.connect(merged, isolation_level=None)
+        try:
+            seeded = os.path.exists(target)
+            if seeded:
+                db.execute("ATTACH DATABASE ? AS seed", (target,))
+            seed_tables = _tables(db, "seed") if seeded else {}
+            for path in shards[1:]:
+                db.execute("ATTACH DATABASE ? AS shard", (path,))
+                db.execute("BEGIN")
+                for table, sql in _tables(db, "shard").items():
+                    if table not in _tables(db, "main"):
+                        db.execute(sql)
+                    shard_cols, rowid = _columns(db, "shard", table)
+                    main_cols = set(_columns(db, "main", table)[0])
+                    cols = [c for c in shard_cols if c in main_cols and c != rowid]
+                    if not cols:
+                        continue
+                    names = ", ".join(f'"{c}"' for c in cols)
+                    # Rows the shard still has as seeded, matched on rowid too, are not its changes
+                    keyed = [rowid, *cols] if rowid else cols
+                    seed_cols = set(_columns(db, "seed", table)[0]) if table in seed_tables else set()
+                    if seed_cols.issuperset(keyed):
+                        keys = ", ".join(f'"{c}"' for c in keyed)
+                        source = (
+                            f'(SELECT {keys} FROM shard."{table}" EXCEPT SELECT {keys} FROM seed."{table}")'
+                        )
+                    else:
+                        source = f'shard."{table}"'
+                    select = f'SELECT {names} FROM {source} EXCEPT SELECT {names} FROM main."{table}"'
+                    db.execute(f'INSERT OR REPLACE INTO main."{table}" ({names}) {select}')
+                db.execute("COMMIT")
+                db.execute("DETACH DATABASE shard")
+            if seeded:
+                db.execute("DETACH DATABASE seed")
+        finally:
+            db.close()
+        seed_database(merged, target)
+    finally:
+        remove_database(merged)
+    for path in shards:
+        remove_database(path)
@@ -0,0 +1,122 @@
+"""Grouped counts and sizes of ``osxphotos query --json`` results for `photo_facets`.
+
+A query result is parsed once, as it streams in, into one small `FacetRow` per photo
+(`facet_row`), holding only the attributes photos can be grouped by (repeated strings
+interned), and the server caches those rows, so further breakdowns of the same query do
+not run osxphotos or parse its output again. `aggregate` is a hash group-by over the
+rows: a photo with several keywords, persons, albums or labels counts once in each of
+their groups.
+"""
+import itertools
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Dimensions photos can be grouped by
+DIMENSIONS = ("year", "month", "keyword", "person", "album", "label", "uti", "camera")
+
+# Rough bytes a row takes in memory besides its strings, for the result cache's size limit
+_ROW_OVERHEAD = 200
+
+
+class FacetRow(NamedTuple):
+    year: Optional[str]
+    month: Optional[str]
+    keyword: Tuple[str, ...]
+    person: Tuple[str, ...]
+    album: Tuple[str, ...]
+    label: Tuple[str, ...]
+    uti: Optional[str]
+    camera: Optional[str]
+    size: int
+
+
+def _names(values: Any) -> Tuple[str, ...]:
+    return tuple(sys.intern(str(v)) for v in dict.fromkeys(values or []) if v)
+
+
+def _camera(exif: Any) -> Optional[str]:
+    if not isinstance(exif, dict):
+        return None
+    make = (exif.get("camera_make") or "").strip()
+    model = (exif.get("camera_model") or "").strip()
+    # Models usually repeat the make ("Canon EOS R5"), Apple's do not ("iPhone 15 Pro")
+    name = model if make and model.lower().startswith(make.lower()) else f"{make} {model}".strip()
+    return sys.intern(name) if name else None
+
+
+def facet_row(photo: Dict[str, Any]) -> FacetRow:
+    # The date keeps the time zone it was taken in, so its text gives the local year and month
+    date = photo.get("date") or ""
+    uti = photo.get("uti_original") or photo.get("uti")
+    return FacetRow(
+        sys.intern(date[:4]) if len(date) >= 7 else None,
+        sys.intern(date[:7]) if len(date) >= 7 else None,
+        _names(photo.get("keywords")),
+        _names(photo.get("persons")),
+        _names(photo.get("albums")),
+        _names(photo.get("labels")),
+        sys.intern(uti) if uti else None,
+        _camera(photo.get("exif_info")),
+        int(photo.get("original_filesize") or 0),
+    )
+
+
+def rows_size(rows: Sequence[FacetRow]) -> int:
+    """Estimated memory taken by `rows`, in bytes."""
+    return len(rows) * _ROW_OVERHEAD
+
+
+def _values(row: FacetRow, dimension: str) -> Iterable[Optional[str]]:
+    value = getattr(row, dimension)
+    if isinstance(value, tuple):
+        return value or (None,)
+    return (value,)
+
+
+def _sort_key(key: Tuple[Optional[str], ...]) -> Tuple[Tuple[bool, str], ...]:
+    # null sorts after every value
+    return tuple((value is None, value or "") for value in key)
+
+
+def aggregate(rows: Iterable[FacetRow], by: Sequence[str], limit: int = 50) -> Dict[str, Any]:
+    """Count photos and sum their original sizes per combination of the `by` dimensions.
+
+    Photos without a value for a dimension are grouped under null. Groups are ordered by
+    count, largest first, except when grouping only by year and/or month, which are
+    ordered by date; only the first `limit` are returned, the rest are summed in "other".
+    """
+    unknown = [name for name in by if name not in DIMENSIONS]
+    if unknown or not by:
+        raise ValueError(f"by must be one or more of: {', '.join(DIMENSIONS)}")
+    by = list(dict.fromkeys(by))
+    groups: Dict[Tuple[Optional[str], ...], List[int]] = {}
+    photos = size = 0
+    for row in rows:
+        photos += 1
+        size += row.size
+        for key in itertools.product(*(_values(row, name) for name in by)):
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [1, row.size]
+            else:
+                group[0] += 1
+                group[1] += row.size
+    if set(by) <= {"year", "month"}:
+        ordered = sorted(groups.items(), key=lambda item: _sort_key(item[0]))
+    else:
+        ordered = sorted(groups.items(), key=lambda item: (-item[1][0], _sort_key(item[0])))
+    shown = ordered[:max(0, limit)]
+    result: Dict[str, Any] = {
+        "photos": photos,
+        "bytes": size,
+        "by": by,
+        "groups": [dict(zip(by, key), count=count, bytes=total) for key, (count, total) in shown],
+    }
+    if len(ordered) > len(shown):
+        rest = ordered[len(shown):]
+        result["other"] = {
+            "groups": len(rest),
+            "count": sum(count for _, (count, _) in rest),
+            "bytes": sum(total for _, (_, total) in rest),
+        }
+    return result
@@ -0,0 +1,147 @@
+"""On-disk cache of osxphotos help text and the options parsed from it.
+
+Help output only changes when osxphotos does, so it is stored per *namespace*: a
+digest of the resolved binary path, its mtime and the ``osxphotos --version`` string.
+The version for a given (path, mtime) is remembered too, so a warm start needs no
+subprocess at all. Two kinds of text are stored per subcommand:
+
+- ``help``: what ``osxphotos help [COMMAND]`` prints (served by the help tool);
+- ``options``: ``osxphotos COMMAND --help``, click's standard format, parsed into the
+  set of option names the installed osxphotos accepts.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+# An option definition line: indented, starts with a dash ("  -V, --verbose  Print...")
+_OPTION_LINE_RE = re.compile(r"^\s+(-\S.*?)(?:\s{2,}|$)")
+_OPTION_NAME_RE = re.compile(r"(?<![\w-])(--?[A-Za-z0-9][\w-]*)")
+_SECTION_RE = re.compile(r"^(\S[^:]*):\s*$")
+_COMMAND_LINE_RE = re.compile(r"^\s{2,}([a-z][\w-]*)(?:\s{2,}|$)")
+# rich-click draws panels with box characters; strip them before parsing
+_BOX_CHARS = " │|╭╮╰╯─┃"
+
+
+def parse_options(help_text: str) -> FrozenSet[str]:
+    """Return every option name defined in click-style `--help` output."""
+    names = set()
+    for line in help_text.splitlines():
+        match = _OPTION_LINE_RE.match(" " + line.strip(_BOX_CHARS))
+        if match:
+            names.update(_OPTION_NAME_RE.findall(match.group(1)))
+    return frozenset(names)
+
+
+def parse_commands(help_text: str) -> List[str]:
+    """Return the subcommand names listed under the "Commands:" section of a help text."""
+    commands: List[str] = []
+    in_commands = False
+    for line in help_text.splitlines():
+        if _SECTION_RE.match(line):
+            in_commands = line.strip().lower().endswith("commands:")
+            continue
+        match = _COMMAND_LINE_RE.match(line) if in_commands else None
+        if match:
+            commands.append(match.group(1))
+    return commands
+
+
+def binary_key(bin_path: str) -> Optional[Tuple[str, int]]:
+    """(realpath, mtime_ns) of the osxphotos executable, or None if it cannot be stat'ed."""
+    try:
+        real = os.path.realpath(bin_path)
+        return real, os.stat(real).st_mtime_ns
+    except OSError:
+        return None
+
+
+class HelpCache:
+    """Help text per (binary, version) namespace, in memory and under `directory`."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._versions: Optional[Dict[str, str]] = None
+        self._text: Dict[Tuple[str, str, str], str] = {}
+        self._options: Dict[Tuple[str, str], FrozenSet[str]] = {}
+        # Texts found missing on disk, so a miss does not open the file again
+        self._missing: Set[Tuple[str, str, str]] = set()
+
+    # ---- versions ----
+    def _versions_path(self) -> str:
+        return os.path.join(self.directory, "versions.json")
+
+    def version(self, key: Tuple[str, int]) -> Optional[str]:
+        if self._versions is None:
+            try:
+                with open(self._versions_path(), "r", encoding="utf-8") as fh:
+                    self._versions = dict(json.load(fh))
+            except (OSError, ValueError, TypeError):
+                self._versions = {}
+        return self._versions.get(f"{key[0]}|{key[1]}")
+
+    def set_version(self, key: Tuple[str, int], version: str) -> None:
+        self.version(key)
+        assert self._versions is not None
+        self._versions[f"{key[0]}|{key[1]}"] = version
+        self._write(self._versions_path(), json.dumps(self._versions, indent=1))
+
+    @staticmethod
+    def namespace(key: Tuple[str, int], version: str) -> str:
+        return hashlib.sha256(f"{key[0]}\0{key[1]}\0{version}".encode()).hexdigest()[:16]
+
+    # ---- help text ----
+    def _path(self, namespace: str, kind: str, command: Optional[str]) -> str:
+        return os.path.join(self.directory, namespace, f"{kind}-{command or '_root'}.txt")
+
+    def get(self, namespace: str, kind: str, command: Optional[str]) -> Optional[str]:
+        mem_key = (namespace, kind, command or "")
+        text = self._text.get(mem_key)
+        if text is None:
+            if mem_key in self._missing:
+                return None
+            try:
+                with open(self._path(namespace, kind, command), "r", encoding="utf-8") as fh:
+                    text = fh.read()
+            except OSError:
+                self._missing.add(mem_key)
+                return None
+            self._text[mem_key] = text
+        return text
+
+    def put(self, namespace: str, kind: str, command: Optional[str], text: str) -> None:
+        self._text[(namespace, kind, command or "")] = text
+        self._missing.discard((namespace, kind, command or ""))
+        self._options.pop((namespace, command or ""), None)
+        self._write(self._path(namespace, kind, command), text)
+
+    def options(self, namespace: str, command: str) -> Optional[FrozenSet[str]]:
+        """Options accepted by `command`, or None when its help is not cached (or unparseable)."""
+        cached = self._options.get((namespace, command))
+        if cached is not None:
+            return cached or None
+        text = self.get(namespace, "options", command)
+        if text is None:
+            return None
+        names = parse_options(text)
+        self._options[(namespace, command)] = names
+        return names or None
+
+    def _write(self, path: str, text: str) -> None:
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".help-")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(text)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
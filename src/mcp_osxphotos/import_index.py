@@ -0,0 +1,239 @@
+"""Content-hash index of imported files, used to pre-scan `import_photos` sources.
+
+`osxphotos import` examines every file it is given, so importing the same camera card
+or folder again costs as much as the first time. The pre-scan walks the sources the
+way osxphotos would (top level of each directory, or the whole tree with `walk`, and
+only names matching `glob`), hashes the files in a thread pool and looks the hashes up
+in a SQLite index of files previously imported into the same library. Only files that
+are not in the index are passed on to osxphotos, and their hashes are recorded once
+the import succeeds.
+
+Hashes are cached by path, size and mtime, so an unchanged file is only read once.
+Files sharing a name stem in one directory (a Live Photo's image and video, RAW+JPEG
+pairs) are kept together: if any of them is new, all of them are imported.
+"""
+import fnmatch
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# Metadata files osxphotos reads next to the media (or ignores); never imported on their own
+SIDECAR_SUFFIXES = frozenset({".aae", ".json", ".xmp"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imported (
+    library TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    imported REAL NOT NULL,
+    PRIMARY KEY (library, digest)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Rows per SQL statement when looking up many digests or paths
+_BATCH = 500
+
+
+class PreScan(NamedTuple):
+    """Result of `ImportIndex.scan`."""
+
+    # Every candidate file, the ones to import, and digest per file
+    files: List[str]
+    new: List[str]
+    digests: Dict[str, str]
+    # Files read and hashed in this scan (the rest reused a cached hash)
+    hashed: int
+    seconds: float
+
+    @property
+    def known(self) -> int:
+        return len(self.files) - len(self.new)
+
+
+def _candidate(name: str, globs: Optional[List[str]]) -> bool:
+    if name.startswith(".") or os.path.splitext(name)[1].lower() in SIDECAR_SUFFIXES:
+        return False
+    return not globs or any(fnmatch.fnmatch(name, pattern) for pattern in globs)
+
+
+def _list_directory(path: str, globs: Optional[List[str]]) -> Tuple[List[str], List[str]]:
+    """Candidate files and subdirectories directly inside `path`."""
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            dirs.append(entry.path)
+                    elif entry.is_file() and _candidate(entry.name, globs):
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def collect_files(
+    files_or_dirs: Iterable[str], walk: bool, globs: Optional[List[str]], pool: ThreadPoolExecutor
+) -> List[str]:
+    """Files osxphotos would import from `files_or_dirs`, listing directories in parallel.
+
+    Files named explicitly are always included; `globs` only filter directory contents,
+    as with osxphotos' --glob. Hidden files and sidecars are skipped.
+    """
+    files: List[str] = []
+    pending: Set["Future[Tuple[List[str], List[str]]]"] = set()
+    for item in files_or_dirs:
+        path = os.path.abspath(os.path.expanduser(item))
+        if os.path.isdir(path):
+            pending.add(pool.submit(_list_directory, path, globs))
+        elif os.path.isfile(path):
+            files.append(path)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            found, subdirs = future.result()
+            files.extend(found)
+            if walk:
+                pending.update(pool.submit(_list_directory, d, globs) for d in subdirs)
+    return sorted(set(files))
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha256").hexdigest()
+
+
+def _stem_key(path: str) -> Tuple[str, str]:
+    directory, name = os.path.split(path)
+    return directory, os.path.splitext(name)[0].lower()
+
+
+class ImportIndex:
+    """SQLite index of content hashes per library, plus a path/size/mtime hash cache."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        # The scan runs in a worker thread while the server thread may record
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _cached_hashes(self, paths: List[str]) -> Dict[str, Tuple[int, int, str]]:
+        cached: Dict[str, Tuple[int, int, str]] = {}
+        with self._lock:
+            db = self._conn()
+            for i in range(0, len(paths), _BATCH):
+                batch = paths[i:i + _BATCH]
+                rows = db.execute(
+                    f"SELECT path, size, mtime_ns, digest FROM hashes WHERE path IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for path, size, mtime_ns, digest in rows:
+                    cached[path] = (size, mtime_ns, digest)
+        return cached
+
+    def _imported(self, library: str, digests: Iterable[str]) -> Set[str]:
+        wanted = list(set(digests))
+        found: Set[str] = set()
+        with self._lock:
+            db = self._conn()
+            for i in range(0, len(wanted), _BATCH):
+                batch = wanted[i:i + _BATCH]
+                rows = db.execute(
+                    f"SELECT digest FROM imported WHERE library = ? AND digest IN ({','.join('?' * len(batch))})",
+                    [library, *batch],
+                )
+                found.update(digest for (digest,) in rows)
+        return found
+
+    def scan(
+        self, library: str, files_or_dirs: Iterable[str], walk: bool = False,
+        globs: Optional[List[str]] = None, workers: int = 4,
+    ) -> PreScan:
+        """Find the files under `files_or_dirs` that were not yet imported into `library`."""
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="import-scan") as pool:
+            files = collect_files(files_or_dirs, walk, globs, pool)
+            stats = dict(zip(files, pool.map(_stat, files)))
+            cached = self._cached_hashes(files)
+            digests: Dict[str, str] = {}
+            to_hash = []
+            for path in files:
+                st = stats[path]
+                if st is None:
+                    continue
+                hit = cached.get(path)
+                if hit is not None and hit[:2] == st:
+                    digests[path] = hit[2]
+                else:
+                    to_hash.append(path)
+            fresh: List[Tuple[str, int, int, str]] = []
+            for path, digest in zip(to_hash, pool.map(_digest_or_none, to_hash)):
+                if digest is not None:
+                    digests[path] = digest
+                    size, mtime_ns = stats[path]  # type: ignore[misc]
+                    fresh.append((path, size, mtime_ns, digest))
+        if fresh:
+            with self._lock:
+                self._conn().executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)", fresh)
+        imported = self._imported(library, digests.values())
+        # Unreadable files are passed on so osxphotos reports them
+        new_stems = {_stem_key(p) for p in files if digests.get(p) not in imported}
+        new = [p for p in files if _stem_key(p) in new_stems]
+        return PreScan(files, new, digests, len(fresh), time.monotonic() - started)
+
+    def record(self, library: str, digests: Dict[str, str]) -> None:
+        """Remember `digests` (path -> digest) as imported into `library`."""
+        now = time.time()
+        rows = []
+        for path, digest in digests.items():
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            rows.append((library, digest, size, path, now))
+        with self._lock:
+            self._conn().executemany("INSERT OR REPLACE INTO imported VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _digest_or_none(path: str) -> Optional[str]:
+    try:
+        return file_digest(path)
+    except OSError:
+        return None
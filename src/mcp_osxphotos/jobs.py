@@ -0,0 +1,484 @@
+"""Background jobs for long-running tools.
+
+Exports, imports, sync and exiftool runs can take hours, longer than a client will
+wait for a tool call. `JobManager` runs a tool in an asyncio task and returns a job id
+right away. While the task runs, `current_job` is set and the command runner reports
+each osxphotos process it spawns and every output line to the job. The job tracks:
+
+- progress, parsed with `ProgressTracker`;
+- a ring buffer of the latest log lines;
+- the exit code of the last process;
+- the peak RSS, sampled while the process runs.
+
+Job state is written to a SQLite file so ``job_status`` still answers after a restart.
+osxphotos processes run in their own session, so they outlive a server that crashed.
+Their pids are recorded together with a start-time token, so a reused pid is not
+mistaken for the original. On the next start such orphans are either reaped
+(SIGTERM to the process group, then SIGKILL) or reattached and watched until they exit.
+
+Several servers (one per MCP client session) share the SQLite file, so each job also
+records the pid and start-time token of the server that runs it. Only jobs whose server
+is gone are treated as orphans; those of another live server are left alone.
+"""
+import asyncio
+import json
+import os
+import secrets
+import signal
+import sqlite3
+import subprocess
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp_osxphotos.progress import ProgressTracker
+
+QUEUED = "queued"
+RUNNING = "running"
+REATTACHED = "reattached"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+# A reattached job whose processes are gone; their exit status cannot be known
+EXITED = "exited"
+ACTIVE_STATES = (QUEUED, RUNNING, REATTACHED)
+
+# Set while a job's tool runs; read by the command runner
+current_job: "ContextVar[Optional[Job]]" = ContextVar("mcp_osxphotos_current_job", default=None)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    exit_code INTEGER,
+    error TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT,
+    peak_rss INTEGER NOT NULL DEFAULT 0,
+    lines_seen INTEGER NOT NULL DEFAULT 0,
+    log TEXT NOT NULL DEFAULT '[]',
+    pids TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    owner_pid INTEGER,
+    owner_token TEXT
+)
+"""
+_COLUMNS = (
+    "id", "tool", "arguments", "state", "created", "started", "finished", "exit_code", "error",
+    "completed", "total", "message", "peak_rss", "lines_seen", "log", "pids", "result",
+    "owner_pid", "owner_token",
+)
+# Columns added after the first release, with their SQL types, for older job files
+_ADDED_COLUMNS = {"owner_pid": "INTEGER", "owner_token": "TEXT"}
+
+
+class JobError(ValueError):
+    """Unknown job id or an operation the job's state does not allow."""
+
+
+def process_token(pid: int) -> Optional[str]:
+    """Start-time token of a live process, or None if it is gone (or a zombie).
+
+    Comparing tokens tells a recorded process apart from an unrelated one that reused
+    its pid.
+    """
+    if os.path.isdir("/proc/self"):
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as fh:
+                fields = fh.read().rsplit(b")", 1)[1].split()
+        except OSError:
+            return None
+        # fields[0] is the state (field 3 of stat), fields[19] the start time (field 22)
+        return None if fields[0] == b"Z" else fields[19].decode()
+    try:
+        out = subprocess.run(
+            ["ps", "-o", "stat=,lstart=", "-p", str(pid)], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if not out or out.startswith("Z"):
+        return None
+    return out.split(None, 1)[1] if " " in out else out
+
+
+def process_rss(pid: int) -> int:
+    """Peak (Linux) or current (macOS) resident set size of `pid` in bytes; 0 if unknown."""
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii", errors="replace") as fh:
+            status = dict(line.split(":", 1) for line in fh if ":" in line)
+        value = status.get("VmHWM") or status.get("VmRSS") or "0 kB"
+        return int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True, timeout=5).stdout
+        return int(out.strip() or 0) * 1024
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return 0
+
+
+def _signal_group(pid: int, sig: int) -> None:
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _still_ours(pid: int, token: str) -> bool:
+    """Whether process group `pid` is still the recorded one, so it is safe to signal.
+
+    True while the leader has the recorded start token. Once no process has the pid any
+    more, a group with that id can only hold the leader's leftover children: a pid is
+    not reused while a process group of that id exists. A process that reused the pid
+    is never ours.
+    """
+    if process_token(pid) == token:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+class Job:
+    """State of one background job; persisted by `JobManager`."""
+
+    def __init__(self, job_id: str, tool: str, arguments: Dict[str, Any], log_lines: int) -> None:
+        self.id = job_id
+        self.tool = tool
+        self.arguments = arguments
+        self.state = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.exit_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.result: Optional[str] = None
+        self.completed = 0
+        self.total: Optional[int] = None
+        self.message: Optional[str] = None
+        self.peak_rss = 0
+        self.lines_seen = 0
+        self.log: "deque[Tuple[str, str]]" = deque(maxlen=log_lines)
+        # pid -> start-time token of the osxphotos processes currently running
+        self.pids: Dict[int, str] = {}
+        # pid and start-time token of the server running the job; None for older rows
+        self.owner_pid: Optional[int] = None
+        self.owner_token: Optional[str] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.tracker = ProgressTracker()
+        self.saved = 0.0
+        self._manager: Optional["JobManager"] = None
+
+    # ---- called by the command runner ----
+    def attach(self, pid: int) -> None:
+        """Record a process spawned for this job (it leads its own process group)."""
+        self.pids[pid] = process_token(pid) or ""
+        if self._manager is not None:
+            self._manager.save(self)
+
+    def detach(self, pid: int, returncode: Optional[int]) -> None:
+        self.pids.pop(pid, None)
+        if returncode is not None:
+            self.exit_code = returncode
+        if self._manager is not None:
+            self._manager.save(self)
+
+    def add_line(self, stream: str, line: str) -> None:
+        self.lines_seen += 1
+        self.log.append((stream, line))
+        if self.tracker.feed(line):
+            self.completed, self.total = self.tracker.completed, self.tracker.total
+            self.message = self.tracker.message()
+        if self._manager is not None:
+            self._manager.touch(self)
+
+    # ---- views ----
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    @property
+    def owner_alive(self) -> bool:
+        """Whether the server that started the job is still running."""
+        return bool(self.owner_pid and self.owner_token) and process_token(self.owner_pid) == self.owner_token
+
+    def status(self) -> Dict[str, Any]:
+        end = self.finished or time.time()
+        return {
+            "job_id": self.id,
+            "tool": self.tool,
+            "arguments": self.arguments,
+            "state": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed_seconds": round(end - self.started, 3) if self.started else None,
+            "progress": {"completed": self.completed, "total": self.total, "message": self.message},
+            "exit_code": self.exit_code,
+            "peak_rss_bytes": self.peak_rss,
+            "pids": sorted(self.pids),
+            "log_lines": self.lines_seen,
+            "error": self.error,
+        }
+
+    def output(self, since: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Log lines numbered from `since` on; lines that left the ring buffer are counted as dropped."""
+        first = self.lines_seen - len(self.log)
+        start = max(since, first)
+        lines = list(self.log)[start - first:]
+        if limit is not None:
+            lines = lines[:max(0, limit)]
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "first_line": start,
+            "next": start + len(lines),
+            "dropped": max(0, start - since),
+            "lines": [line if stream == "stdout" else f"[{stream}] {line}" for stream, line in lines],
+            "result": self.result if not self.active else None,
+        }
+
+    # ---- persistence ----
+    def row(self) -> Tuple[Any, ...]:
+        return (
+            self.id, self.tool, json.dumps(self.arguments), self.state, self.created, self.started,
+            self.finished, self.exit_code, self.error, self.completed, self.total, self.message,
+            self.peak_rss, self.lines_seen, json.dumps(list(self.log)),
+            json.dumps({str(pid): token for pid, token in self.pids.items()}), self.result,
+            self.owner_pid, self.owner_token,
+        )
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row, log_lines: int) -> "Job":
+        job = cls(row["id"], row["tool"], json.loads(row["arguments"]), log_lines)
+        job.state = row["state"]
+        job.created, job.started, job.finished = row["created"], row["started"], row["finished"]
+        job.exit_code, job.error, job.result = row["exit_code"], row["error"], row["result"]
+        job.completed, job.total, job.message = row["completed"], row["total"], row["message"]
+        job.peak_rss, job.lines_seen = row["peak_rss"], row["lines_seen"]
+        job.log.extend((stream, line) for stream, line in json.loads(row["log"]))
+        job.pids = {int(pid): token for pid, token in json.loads(row["pids"]).items()}
+        job.owner_pid, job.owner_token = row["owner_pid"], row["owner_token"]
+        return job
+
+
+class JobManager:
+    """Starts, tracks and persists background jobs.
+
+    `orphans` decides what happens on startup to processes left running by a previous
+    server: "reap" terminates them, "reattach" watches them until they exit (their
+    output went to the dead server, so only the persisted log is available).
+    """
+
+    # Seconds between progress writes to SQLite and between RSS samples
+    flush_interval = 1.0
+    sample_interval = 1.0
+
+    def __init__(self, path: str, log_lines: int = 1000, history: int = 100,
+                 orphans: str = "reap", kill_grace: float = 5.0) -> None:
+        self.path = path
+        self.log_lines = log_lines
+        self.history = history
+        self.orphans = orphans
+        self.kill_grace = kill_grace
+        self._db: Optional[sqlite3.Connection] = None
+        self._jobs: Dict[str, Job] = {}
+
+    # ---- storage ----
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+            existing = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in existing:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+            for row in db.execute("SELECT * FROM jobs ORDER BY created"):
+                job = Job.from_row(row, self.log_lines)
+                job._manager = self
+                self._jobs[job.id] = job
+            self._db = db
+        return self._db
+
+    def save(self, job: Job) -> None:
+        db = self._conn()
+        db.execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            job.row(),
+        )
+        job.saved = time.monotonic()
+
+    def touch(self, job: Job) -> None:
+        """Save progress and log changes at most every `flush_interval` seconds."""
+        if time.monotonic() - job.saved >= self.flush_interval:
+            self.save(job)
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if not job.active]
+        finished.sort(key=lambda job: job.created)
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+            self._conn().execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            self._jobs.clear()
+
+    # ---- queries ----
+    def get(self, job_id: str) -> Job:
+        self._conn()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobError(f"Unknown job id: {job_id!r}")
+        return job
+
+    def list(self) -> List[Job]:
+        self._conn()
+        return sorted(self._jobs.values(), key=lambda job: job.created)
+
+    # ---- lifecycle ----
+    def start(self, tool: str, arguments: Dict[str, Any], run: Callable[[], Awaitable[str]]) -> Job:
+        """Create a job and run `run()` for it in the background."""
+        self._conn()
+        job = Job(secrets.token_hex(8), tool, arguments, self.log_lines)
+        job.owner_pid = os.getpid()
+        job.owner_token = process_token(job.owner_pid)
+        job._manager = self
+        self._jobs[job.id] = job
+        self.save(job)
+        self._prune()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, run))
+        job.task.add_done_callback(lambda _task: self._never_started(job))
+        return job
+
+    def _never_started(self, job: Job) -> None:
+        # A task cancelled before its first step never runs _run's cleanup
+        if job.state == QUEUED:
+            job.state, job.finished = INTERRUPTED, time.time()
+            self.save(job)
+
+    async def _run(self, job: Job, run: Callable[[], Awaitable[str]]) -> None:
+        current_job.set(job)
+        job.state, job.started = RUNNING, time.time()
+        self.save(job)
+        sampler = asyncio.get_running_loop().create_task(self._sample(job))
+        try:
+            result = await run()
+        except asyncio.CancelledError:
+            if job.state == RUNNING:
+                job.state = CANCELLED
+            raise
+        except Exception as e:
+            job.state, job.error = FAILED, str(e)
+        else:
+            job.result = result
+            failed = isinstance(result, str) and result.startswith("Error:")
+            job.state = FAILED if failed else SUCCEEDED
+            if failed:
+                job.error = result.splitlines()[0]
+        finally:
+            sampler.cancel()
+            job.finished = time.time()
+            self.save(job)
+
+    async def _sample(self, job: Job) -> None:
+        while True:
+            for pid in list(job.pids):
+                job.peak_rss = max(job.peak_rss, await asyncio.to_thread(process_rss, pid))
+            await asyncio.sleep(self.sample_interval)
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if not job.active:
+            raise JobError(f"Job {job_id} already {job.state}")
+        if job.task is not None and not job.task.done():
+            # The command runner terminates the job's process group on cancellation
+            job.task.cancel()
+        else:
+            for pid, token in job.pids.items():
+                if process_token(pid) == token:
+                    _signal_group(pid, signal.SIGTERM)
+            asyncio.get_running_loop().create_task(self._reap(dict(job.pids)))
+        job.state = CANCELLED
+        self.save(job)
+        return job
+
+    async def recover(self) -> List[Job]:
+        """Deal with jobs a stopped server left active; returns the jobs it changed.
+
+        Jobs of another server that is still running are not touched.
+        """
+        changed = []
+        for job in self.list():
+            if not job.active or job.task is not None or job.owner_alive:
+                continue
+            alive = {pid: token for pid, token in job.pids.items() if token and process_token(pid) == token}
+            job.pids = alive
+            changed.append(job)
+            if not alive:
+                job.state, job.finished = INTERRUPTED, time.time()
+                job.error = "server stopped while the job was running"
+            elif self.orphans == "reattach":
+                job.state = REATTACHED
+                job.task = asyncio.get_running_loop().create_task(self._watch(job))
+            else:
+                for pid in alive:
+                    _signal_group(pid, signal.SIGTERM)
+                job.state, job.finished = INTERRUPTED, time.time()
+                job.error = "server restarted; orphaned processes were terminated"
+                asyncio.get_running_loop().create_task(self._reap(dict(alive)))
+                job.pids = {}
+            self.save(job)
+        return changed
+
+    async def _reap(self, pids: Dict[int, str]) -> None:
+        deadline = time.monotonic() + self.kill_grace
+        while time.monotonic() < deadline and any(process_token(pid) == token for pid, token in pids.items()):
+            await asyncio.sleep(0.1)
+        for pid, token in pids.items():
+            if _still_ours(pid, token):
+                _signal_group(pid, signal.SIGKILL)
+
+    async def _watch(self, job: Job) -> None:
+        """Follow reattached processes until they exit; their exit status is not available."""
+        while True:
+            for pid, token in list(job.pids.items()):
+                if process_token(pid) != token:
+                    del job.pids[pid]
+                else:
+                    job.peak_rss = max(job.peak_rss, process_rss(pid))
+            if not job.pids:
+                break
+            await asyncio.sleep(self.sample_interval)
+        if job.state == REATTACHED:
+            job.state = EXITED
+            job.error = "reattached after a restart; exit status unknown"
+        job.finished = time.time()
+        self.save(job)
+
+    async def shutdown(self) -> None:
+        """Stop running jobs (and their processes) when the server exits."""
+        tasks = []
+        for job in self.list():
+            if job.active and job.task is not None and not job.task.done():
+                job.state, job.error = INTERRUPTED, "server shut down"
+                job.task.cancel()
+                tasks.append(job.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
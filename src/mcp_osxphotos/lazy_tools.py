@@ -0,0 +1,181 @@
+"""Lazy tool registration for faster server startup.
+
+Building a FastMCP tool creates a pydantic model of its signature, which for ~30 tools
+with very large signatures dominates the import time of the server module. With
+MCP_OSXPHOTOS_LAZY_TOOLS set, `LazyFastMCP` only records tools at import.
+``tools/list`` is answered from an on-disk schema cache keyed by the tool source files
+and the mcp/pydantic versions, and each tool is built the first time it is called. A
+stale cache is rebuilt on the first ``tools/list`` and saved for the next start. Without
+a cache file deferring only adds work (every tool is built for the first ``tools/list``
+anyway), so tools are registered eagerly and the cache is written in a background thread
+after that first ``tools/list``; ``mcp-osxphotos --build-schema-cache`` prebuilds it.
+
+`tool_wrapper`, if given, wraps every tool function before it is built (the server uses
+it for metrics and tracing); the schema cache key is computed from the unwrapped
+functions. `call_context`, if given, is entered around every ``tools/call`` with the
+tool name.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+import pydantic
+from mcp.server.fastmcp import FastMCP
+import mcp.server.fastmcp.server as fastmcp_server
+from mcp.server.fastmcp.tools import Tool
+from mcp.types import Tool as MCPTool
+
+from mcp_osxphotos import startup
+from mcp_osxphotos.cache import cache_directory
+
+_Registration = Tuple[Callable[..., Any], Dict[str, Any]]
+
+
+def lazy_tools_enabled() -> bool:
+    return startup.env_flag("MCP_OSXPHOTOS_LAZY_TOOLS")
+
+
+def default_schema_cache_path() -> str:
+    override = os.environ.get("MCP_OSXPHOTOS_SCHEMA_CACHE")
+    if override:
+        return os.path.expanduser(override)
+    return os.path.join(cache_directory(), "tool-schemas.json")
+
+
+def _file_signature(path: str) -> List[Any]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return [path, None]
+    return [path, st.st_mtime_ns, st.st_size]
+
+
+class LazyFastMCP(FastMCP):
+    """FastMCP that, when `lazy`, builds tools only when they are listed or called."""
+
+    def __init__(self, name: Optional[str] = None, *, lazy: bool = False,
+                 schema_cache: Optional[str] = None,
+                 tool_wrapper: Optional[Callable[[Callable[..., Any]], Callable[..., Any]]] = None,
+                 call_context: Optional[Callable[[str], ContextManager[Any]]] = None,
+                 **settings: Any) -> None:
+        super().__init__(name, **settings)
+        self.tool_wrapper = tool_wrapper
+        self.call_context = call_context
+        self.schema_cache = schema_cache or default_schema_cache_path()
+        # Without a cache file, register eagerly and write the cache for the next start
+        self.lazy = lazy and os.path.exists(self.schema_cache)
+        self._cache_pending = lazy and not self.lazy
+        self._cache_writer: Optional["asyncio.Future[None]"] = None
+        # Every registered tool (input to the cache key) and those not built yet
+        self._registered: Dict[str, _Registration] = {}
+        self._deferred: Dict[str, _Registration] = {}
+        self._cached_tools: Optional[List[MCPTool]] = None
+
+    def add_tool(self, fn: Callable[..., Any], name: Optional[str] = None, **kwargs: Any) -> None:
+        entry = (fn, dict(kwargs, name=name))
+        self._registered[name or fn.__name__] = entry
+        if not self.lazy:
+            super().add_tool(self._wrap(fn), name=name, **kwargs)
+            return
+        self._deferred[name or fn.__name__] = entry
+        self._cached_tools = None
+
+    def _materialize(self, name: str) -> None:
+        deferred = self._deferred.pop(name, None)
+        if deferred is not None:
+            fn, kwargs = deferred
+            super().add_tool(self._wrap(fn), **kwargs)
+
+    def _wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        return self.tool_wrapper(fn) if self.tool_wrapper is not None else fn
+
+    def materialize_all(self) -> None:
+        for name in list(self._deferred):
+            self._materialize(name)
+
+    def schema_cache_key(self) -> str:
+        """Digest of everything the tool schemas depend on."""
+        sources = sorted({fn.__code__.co_filename for fn, _ in self._registered.values() if hasattr(fn, "__code__")})
+        parts = [
+            pydantic.VERSION,
+            _file_signature(fastmcp_server.__file__),
+            [_file_signature(path) for path in sources],
+            sorted((name, repr(sorted(kwargs.items()))) for name, (_, kwargs) in self._registered.items()),
+        ]
+        return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def _load_schema_cache(self, key: str) -> Optional[List[MCPTool]]:
+        try:
+            with open(self.schema_cache, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("key") != key:
+                return None
+            return [MCPTool.model_validate(tool) for tool in data["tools"]]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # pydantic.ValidationError is a ValueError
+            return None
+
+    def _save_schema_cache(self, key: str, tools: List[MCPTool]) -> None:
+        payload = {"key": key, "tools": [t.model_dump(mode="json", by_alias=True, exclude_none=True) for t in tools]}
+        directory = os.path.dirname(self.schema_cache) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tool-schemas-")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh)
+            os.replace(tmp, self.schema_cache)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def build_schema_cache(self) -> str:
+        """Build every tool and write the schema cache; returns its path."""
+        key = self.schema_cache_key()
+        self.materialize_all()
+        self._save_schema_cache(key, asyncio.run(super().list_tools()))
+        return self.schema_cache
+
+    def _write_schema_cache(self, tools: List[MCPTool]) -> None:
+        self._save_schema_cache(self.schema_cache_key(), tools)
+
+    async def list_tools(self) -> List[MCPTool]:
+        if not self._deferred:
+            tools = await super().list_tools()
+            if self._cache_pending:
+                self._cache_pending = False
+                self._cache_writer = asyncio.ensure_future(asyncio.to_thread(self._write_schema_cache, tools))
+        elif self._cached_tools is not None:
+            tools = self._cached_tools
+        else:
+            key = self.schema_cache_key()
+            cached = self._load_schema_cache(key)
+            if cached is None:
+                self.materialize_all()
+                cached = await super().list_tools()
+                self._save_schema_cache(key, cached)
+            tools = self._cached_tools = cached
+        startup.first_list_tools()
+        return tools
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        self._materialize(name)
+        if self.call_context is None:
+            return await super().call_tool(name, arguments)
+        with self.call_context(name):
+            return await super().call_tool(name, arguments)
+
+    def get_tool(self, name: str) -> Optional[Tool]:
+        """The tool called `name`, built first if it was deferred; None if there is none."""
+        self._materialize(name)
+        return self._tool_manager.get_tool(name)
+
+    def tool_names(self) -> List[str]:
+        return sorted(set(self._tool_manager._tools) | set(self._deferred))
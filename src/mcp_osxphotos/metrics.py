@@ -0,0 +1,312 @@
+"""In-process metrics for tools and osxphotos commands.
+
+`ServerMetrics` counts calls and errors and keeps latency histograms for every MCP tool
+(`instrument` wraps the tool function at registration) and for every osxphotos process
+the server runs: wall time, time from spawn to the first byte of output, stdout/stderr
+byte counts and whether it ran on a warm worker or as a fresh subprocess. Cache hit
+counters come from the caches themselves through `add_cache`.
+
+Everything is kept in memory for the lifetime of the process and is exposed as a JSON
+snapshot (the ``server_metrics`` tool) or in the Prometheus text exposition format,
+which `write_prometheus` can write to a file for the node_exporter textfile collector.
+"""
+import functools
+import inspect
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets; a +Inf bucket is implied
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 1800.0, 3600.0,
+)
+
+_PREFIX = "mcp_osxphotos"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style, plus the largest value seen."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the `q` quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = self.bounds[i] if i < len(self.bounds) else self.max
+            if n and seen + n >= rank:
+                estimate = lower + (upper - lower) * (rank - seen) / n
+                return min(estimate, self.max)
+            seen += n
+            lower = upper
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 6)
+
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": rounded(self.sum / self.count if self.count else None),
+            "p50": rounded(self.quantile(0.5)),
+            "p90": rounded(self.quantile(0.9)),
+            "p99": rounded(self.quantile(0.99)),
+            "max": round(self.max, 6),
+        }
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for i, n in enumerate(self.counts):
+            total += n
+            pairs.append((f"{self.bounds[i]:g}" if i < len(self.bounds) else "+Inf", total))
+        return pairs
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class _CommandStats:
+    __slots__ = ("calls", "errors", "runners", "duration", "first_byte", "stdout_bytes", "stderr_bytes")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.runners: Dict[str, int] = {}
+        self.duration = Histogram()
+        self.first_byte = Histogram()
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+
+
+class CommandRun:
+    """What one osxphotos run did, filled in while it runs and recorded when it ends."""
+
+    __slots__ = ("runner", "started", "first_byte", "bytes", "error")
+
+    def __init__(self) -> None:
+        # "worker" or "subprocess" once the command has started, None until then
+        self.runner: Optional[str] = None
+        self.started = 0.0
+        self.first_byte: Optional[float] = None
+        self.bytes = {"stdout": 0, "stderr": 0}
+        # Failure kind: "exit", "timeout", "cancelled", "not_found" or "exception"
+        self.error: Optional[str] = None
+
+    def start(self, runner: str) -> None:
+        self.runner = runner
+        self.started = time.monotonic()
+
+    def feed(self, stream: str, size: int) -> None:
+        """Count `size` bytes of output on `stream`."""
+        if size and self.first_byte is None:
+            self.first_byte = time.monotonic() - self.started
+        self.bytes[stream] += size
+
+
+def _labels(**labels: str) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class ServerMetrics:
+    """Counters and histograms for tools, osxphotos commands and caches."""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._commands: Dict[str, _CommandStats] = {}
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+    def add_cache(self, name: str, counts: Callable[[], Tuple[int, int]]) -> None:
+        """Report cache `name` with `counts`, a callable returning (hits, misses)."""
+        self._caches[name] = counts
+
+    def record_tool(self, name: str, seconds: float, error: bool) -> None:
+        stats = self._tools.get(name)
+        if stats is None:
+            stats = self._tools[name] = _ToolStats()
+        stats.calls += 1
+        stats.errors += int(error)
+        stats.latency.observe(seconds)
+
+    def record_command(self, command: str, run: CommandRun) -> None:
+        """Record a finished run of osxphotos `command` (the subcommand name)."""
+        if run.runner is None:
+            return
+        stats = self._commands.get(command)
+        if stats is None:
+            stats = self._commands[command] = _CommandStats()
+        stats.calls += 1
+        stats.runners[run.runner] = stats.runners.get(run.runner, 0) + 1
+        if run.error is not None:
+            stats.errors[run.error] = stats.errors.get(run.error, 0) + 1
+        stats.duration.observe(time.monotonic() - run.started)
+        if run.first_byte is not None:
+            stats.first_byte.observe(run.first_byte)
+        stats.stdout_bytes += run.bytes["stdout"]
+        stats.stderr_bytes += run.bytes["stderr"]
+
+    def instrument(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap tool function `fn` so each call is recorded under its name.
+
+        A call fails when it raises or returns a string starting with "Error:". The
+        wrapper keeps the signature and annotations, so the tool schema is unchanged.
+        """
+        name = fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.monotonic()
+                error = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    error = isinstance(result, str) and result.startswith("Error:")
+                    return result
+                finally:
+                    self.record_tool(name, time.monotonic() - started, error)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+                error = isinstance(result, str) and result.startswith("Error:")
+                return result
+            finally:
+                self.record_tool(name, time.monotonic() - started, error)
+        return wrapper
+
+    def snapshot(self) -> Dict[str, Any]:
+        caches = {}
+        for name, counts in self._caches.items():
+            hits, misses = counts()
+            caches[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "tools": {
+                name: {"calls": s.calls, "errors": s.errors, "latency_seconds": s.latency.summary()}
+                for name, s in sorted(self._tools.items())
+            },
+            "commands": {
+                name: {
+                    "calls": s.calls,
+                    "errors": dict(sorted(s.errors.items())),
+                    "runners": dict(sorted(s.runners.items())),
+                    "duration_seconds": s.duration.summary(),
+                    "first_byte_seconds": s.first_byte.summary(),
+                    "stdout_bytes": s.stdout_bytes,
+                    "stderr_bytes": s.stderr_bytes,
+                }
+                for name, s in sorted(self._commands.items())
+            },
+            "caches": caches,
+        }
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            full = f"{_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        def histogram(full: str, hist: Histogram, **labels: str) -> None:
+            for le, count in hist.cumulative():
+                lines.append(f"{full}_bucket{_labels(**labels, le=le)} {count}")
+            lines.append(f"{full}_sum{_labels(**labels)} {hist.sum:.6f}")
+            lines.append(f"{full}_count{_labels(**labels)} {hist.count}")
+
+        def samples(full: str, rows: Iterable[Tuple[Dict[str, str], float]]) -> None:
+            for labels, value in rows:
+                lines.append(f"{full}{_labels(**labels)} {value:g}")
+
+        tools = sorted(self._tools.items())
+        commands = sorted(self._commands.items())
+        samples(family("uptime_seconds", "gauge", "Seconds since the server started."),
+                [({}, round(time.time() - self.started, 3))])
+        samples(family("tool_calls_total", "counter", "MCP tool calls."),
+                (({"tool": name}, s.calls) for name, s in tools))
+        samples(family("tool_errors_total", "counter", "MCP tool calls that raised or returned an error."),
+                (({"tool": name}, s.errors) for name, s in tools))
+        full = family("tool_duration_seconds", "histogram", "MCP tool call latency.")
+        for name, s in tools:
+            histogram(full, s.latency, tool=name)
+        samples(family("command_runs_total", "counter", "osxphotos processes run, by runner."),
+                (({"command": name, "runner": runner}, n) for name, s in commands for runner, n in sorted(s.runners.items())))
+        samples(family("command_errors_total", "counter", "osxphotos runs that failed, by reason."),
+                (({"command": name, "reason": reason}, n) for name, s in commands for reason, n in sorted(s.errors.items())))
+        full = family("command_duration_seconds", "histogram", "osxphotos run time including spawn.")
+        for name, s in commands:
+            histogram(full, s.duration, command=name)
+        full = family("command_first_byte_seconds", "histogram", "Time from spawn to the first byte of output.")
+        for name, s in commands:
+            histogram(full, s.first_byte, command=name)
+        samples(family("command_output_bytes_total", "counter", "Bytes osxphotos wrote, by stream."),
+                (({"command": name, "stream": stream}, n) for name, s in commands
+                 for stream, n in (("stdout", s.stdout_bytes), ("stderr", s.stderr_bytes))))
+        counts = [(name, counts()) for name, counts in sorted(self._caches.items())]
+        samples(family("cache_hits_total", "counter", "Requests answered from a cache."),
+                (({"cache": name}, hits) for name, (hits, _) in counts))
+        samples(family("cache_misses_total", "counter", "Requests a cache could not answer."),
+                (({"cache": name}, misses) for name, (_, misses) in counts))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically replace `path` with the current metrics."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(self.prometheus())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,107 @@
+"""Long-lived osxphotos worker process.
+
+This file is executed as a script by the Python interpreter that osxphotos is installed
+into (which is usually not the interpreter running the MCP server), so it must only use
+the standard library, click and osxphotos itself.
+
+Protocol (JSON lines):
+- On startup the worker writes ``{"ready": true, "version": ..., "pid": ...}``, or
+  ``{"ready": false, "error": ...}`` if osxphotos cannot be imported, then exits.
+- Each request line ``{"id": N, "argv": ["query", "--json", ...]}`` runs the osxphotos
+  CLI in-process with `argv` (without the leading "osxphotos") and answers with
+  ``{"id": N, "returncode": RC, "stdout": ..., "stderr": ..., "max_rss": BYTES}``.
+- EOF on stdin shuts the worker down.
+
+Commands run with an empty stdin, as the server's subprocesses do, so a command that
+prompts for confirmation aborts at once instead of waiting on the protocol pipe.
+"""
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import traceback
+
+
+def _max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _run(cli_main, argv):
+    import click
+
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    returncode = 0
+    saved_stdin = sys.stdin
+    sys.stdin = io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            result = cli_main.main(args=list(argv), prog_name="osxphotos", standalone_mode=False)
+            if isinstance(result, int):
+                returncode = result
+        except click.exceptions.Exit as e:
+            returncode = e.exit_code
+        except click.ClickException as e:
+            e.show(file=stderr)
+            returncode = e.exit_code
+        except click.Abort:
+            stderr.write("Aborted!\n")
+            returncode = 1
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                returncode = e.code
+            elif e.code is not None:
+                stderr.write(f"{e.code}\n")
+                returncode = 1
+        except Exception:
+            traceback.print_exc(file=stderr)
+            returncode = 1
+        finally:
+            sys.stdin = saved_stdin
+    return returncode, stdout.getvalue(), stderr.getvalue()
+
+
+def main() -> None:
+    # Keep the protocol on a private copy of stdout; anything osxphotos writes to fd 1
+    # directly (e.g. from C extensions or child processes) is diverted to stderr.
+    proto = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    # Requests are read from a private copy of stdin too; fd 0 becomes /dev/null so
+    # nothing a command runs can read (or wait on) the protocol pipe.
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+
+    def send(message) -> None:
+        proto.write(json.dumps(message) + "\n")
+        proto.flush()
+
+    try:
+        import osxphotos
+        from osxphotos.cli import cli_main
+    except Exception as e:
+        send({"ready": False, "error": f"{type(e).__name__}: {e}"})
+        return
+    send({"ready": True, "version": getattr(osxphotos, "__version__", None), "pid": os.getpid()})
+
+    for line in requests:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        returncode, out, err = _run(cli_main, request.get("argv") or [])
+        send({
+            "id": request.get("id"),
+            "returncode": returncode,
+            "stdout": out,
+            "stderr": err,
+            "max_rss": _max_rss_bytes(),
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Compressed, content-addressed on-disk store for large tool outputs.
+
+Tools whose output can run to tens of megabytes (dump, query_photos, exportdb,
+orphans) store it here instead of returning it inline, and return a summary with a
+resource URI the client reads in byte or line ranges.
+
+An output is named by the SHA-256 of its bytes, so repeated calls with the same result
+share one copy. It is written as independent zlib blocks of `BLOCK_SIZE` uncompressed
+bytes; a SQLite catalog records where each block starts, in the output and in the
+file, and how many newlines precede it, so a range read decompresses only the blocks
+it touches. The catalog also records when each output was last read; once the files
+take more than `max_bytes` on disk the least recently used outputs are deleted.
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+# Uncompressed bytes per block: the most a range read decompresses beyond what it returns
+BLOCK_SIZE = 256 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    stored INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_accessed ON outputs (accessed);
+CREATE TABLE IF NOT EXISTS blocks (
+    digest TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (digest, n)
+) WITHOUT ROWID;
+"""
+
+
+class StoredOutput(NamedTuple):
+    digest: str
+    # Uncompressed size in bytes
+    size: int
+    # Number of lines (a last line without a newline counts)
+    lines: int
+    # Compressed size on disk
+    stored: int
+
+
+class _Block(NamedTuple):
+    # Offset of the block in the output, newlines before it, and its place in the file
+    start: int
+    line: int
+    offset: int
+    length: int
+
+
+class OutputStore:
+    """Outputs on disk under `directory`, at most `max_bytes` of compressed files in total."""
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            db = sqlite3.connect(
+                os.path.join(self.directory, "catalog.sqlite3"), check_same_thread=False, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.z")
+
+    def put(self, data: bytes) -> StoredOutput:
+        """Store `data` (or find it already stored) and evict old outputs over the size cap."""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            db = self._conn()
+            found = self._get(digest)
+            if found is not None:
+                db.execute("UPDATE outputs SET accessed = ? WHERE digest = ?", (time.time(), digest))
+                return found
+            path = self._path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            blocks: List[_Block] = []
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".output-")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    line = 0
+                    for start in range(0, len(data), BLOCK_SIZE):
+                        chunk = data[start:start + BLOCK_SIZE]
+                        packed = zlib.compress(chunk, 6)
+                        blocks.append(_Block(start, line, fh.tell(), len(packed)))
+                        fh.write(packed)
+                        line += chunk.count(b"\n")
+                    stored = fh.tell()
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+            lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+            now = time.time()
+            db.execute("BEGIN")
+            try:
+                db.execute(
+                    "INSERT INTO outputs (digest, size, lines, stored, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, len(data), lines, stored, now, now),
+                )
+                db.executemany(
+                    "INSERT INTO blocks (digest, n, start, line, offset, length) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(digest, n, *block) for n, block in enumerate(blocks)],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._evict(keep=digest)
+            return StoredOutput(digest, len(data), lines, stored)
+
+    def get(self, digest: str) -> Optional[StoredOutput]:
+        with self._lock:
+            return self._get(digest)
+
+    def _get(self, digest: str) -> Optional[StoredOutput]:
+        row = self._conn().execute(
+            "SELECT digest, size, lines, stored FROM outputs WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None or not os.path.exists(self._path(digest)):
+            return None
+        return StoredOutput(*row)
+
+    def usage(self) -> Tuple[int, int]:
+        """(number of outputs, bytes on disk)."""
+        with self._lock:
+            count, stored = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(stored), 0) FROM outputs").fetchone()
+        return count, stored
+
+    def _evict(self, keep: str) -> None:
+        """Delete least recently read outputs until the total is under the cap; never `keep`."""
+        db = self._conn()
+        total = db.execute("SELECT COALESCE(SUM(stored), 0) FROM outputs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, stored in db.execute(
+            "SELECT digest, stored FROM outputs WHERE digest != ? ORDER BY accessed", (keep,)
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove(digest)
+            total -= stored
+
+    def _remove(self, digest: str) -> None:
+        db = self._conn()
+        db.execute("DELETE FROM blocks WHERE digest = ?", (digest,))
+        db.execute("DELETE FROM outputs WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _open(self, digest: str) -> Tuple[StoredOutput, List[_Block]]:
+        """Catalog entry and blocks of `digest`, marking it used; KeyError if unknown."""
+        found = self._get(digest)
+        if found is None:
+            raise KeyError(digest)
+        db = self._conn()
+        db.execute("UPDATE outputs SET accessed = ? WHERE digest = ?", (time.time(), digest))
+        rows = db.execute(
+            "SELECT start, line, offset, length FROM blocks WHERE digest = ? ORDER BY n", (digest,)
+        ).fetchall()
+        return found, [_Block(*row) for row in rows]
+
+    def _chunks(self, digest: str, blocks: List[_Block]) -> Iterator[Tuple[_Block, bytes]]:
+        with open(self._path(digest), "rb") as fh:
+            for block in blocks:
+                fh.seek(block.offset)
+                yield block, zlib.decompress(fh.read(block.length))
+
+    def read(self, digest: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Bytes `offset` to `offset + length` (to the end without `length`) of an output."""
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("offset and length must not be negative")
+        with self._lock:
+            found, blocks = self._open(digest)
+            end = found.size if length is None else min(found.size, offset + length)
+            wanted = [b for b in blocks if b.start < end and b.start + BLOCK_SIZE > offset]
+            parts = [data for _, data in self._chunks(digest, wanted)]
+        if not wanted:
+            return b""
+        joined = b"".join(parts)
+        first = wanted[0].start
+        return joined[offset - first:end - first]
+
+    def read_lines(self, digest: str, start: int = 0, count: Optional[int] = None) -> bytes:
+        """Lines `start` to `start + count` (0-based; to the end without `count`), with their newlines."""
+        if start < 0 or (count is not None and count < 0):
+            raise ValueError("start and count must not be negative")
+        with self._lock:
+            found, blocks = self._open(digest)
+            if count == 0 or start >= found.lines:
+                return b""
+            # The block holding the newline that ends line `start - 1`, i.e. where line `start` begins
+            first = 0
+            for n, block in enumerate(blocks):
+                if block.line < start:
+                    first = n
+            out = bytearray()
+            seen = blocks[first].line if blocks else 0
+            collecting = start == 0
+            taken = 0
+            for _block, data in self._chunks(digest, blocks[first:]):
+                pos = 0
+                if not collecting:
+                    while seen < start:
+                        newline = data.find(b"\n", pos)
+                        if newline < 0:
+                            break
+                        seen += 1
+                        pos = newline + 1
+                    if seen < start:
+                        continue
+                    collecting = True
+                while pos < len(data):
+                    if count is not None and taken >= count:
+                        return bytes(out)
+                    newline = data.find(b"\n", pos)
+                    if newline < 0:
+                        out += data[pos:]
+                        break
+                    out += data[pos:newline + 1]
+                    taken += 1
+                    pos = newline + 1
+                if count is not None and taken >= count:
+                    break
+            return bytes(out)
@@ -0,0 +1,121 @@
+"""Cursor pagination over spilled query results.
+
+A query is run once; its parsed results are written to a JSON-lines file in a private
+temporary directory, and pages are read back by seeking to recorded line offsets, so
+later pages never re-run osxphotos. Cursors are opaque tokens naming the spill and the
+next offset. Spills expire after a TTL of inactivity and are garbage-collected whenever
+the store is used.
+"""
+import base64
+import binascii
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class CursorError(ValueError):
+    """The cursor is malformed, unknown or expired."""
+
+
+class _Spill:
+    __slots__ = ("path", "offsets", "expires")
+
+    def __init__(self, path: str, offsets: List[int], expires: float) -> None:
+        self.path = path
+        self.offsets = offsets
+        self.expires = expires
+
+
+def encode_cursor(spill_id: str, offset: int, page_size: int) -> str:
+    raw = json.dumps({"s": spill_id, "o": offset, "n": page_size}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(data["s"]), int(data["o"]), int(data["n"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise CursorError(f"Malformed cursor: {cursor!r}") from e
+
+
+class CursorStore:
+    """Temporary on-disk store of result lists addressed by cursors; safe to use from threads."""
+
+    def __init__(self, ttl: float = 900.0, directory: Optional[str] = None) -> None:
+        self.ttl = ttl
+        self._directory = directory
+        self._spills: Dict[str, _Spill] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self) -> str:
+        if self._directory is None or not os.path.isdir(self._directory):
+            self._directory = tempfile.mkdtemp(prefix="mcp-osxphotos-pages-")
+        return self._directory
+
+    def spill(self, items: Iterable[Any]) -> str:
+        """Write `items` to disk as they come and return the spill id."""
+        self.gc()
+        spill_id = secrets.token_hex(16)
+        with self._lock:
+            path = os.path.join(self._dir(), f"{spill_id}.jsonl")
+        offsets: List[int] = []
+        try:
+            with open(path, "wb") as fh:
+                for item in items:
+                    offsets.append(fh.tell())
+                    fh.write(json.dumps(item).encode() + b"\n")
+        except BaseException:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._spills[spill_id] = _Spill(path, offsets, time.monotonic() + self.ttl)
+        return spill_id
+
+    def page(self, spill_id: str, offset: int, page_size: int) -> Tuple[List[Any], Optional[str], int]:
+        """Return (items, next_cursor, total) for one page of a spill."""
+        self.gc()
+        with self._lock:
+            spill = self._spills.get(spill_id)
+            if spill is None:
+                raise CursorError("Cursor expired or unknown; run the query again without a cursor")
+            spill.expires = time.monotonic() + self.ttl
+        total = len(spill.offsets)
+        offset = max(0, offset)
+        end = min(total, offset + max(1, page_size))
+        items: List[Any] = []
+        if offset < end:
+            with open(spill.path, "rb") as fh:
+                fh.seek(spill.offsets[offset])
+                for _ in range(end - offset):
+                    items.append(json.loads(fh.readline()))
+        next_cursor = encode_cursor(spill_id, end, page_size) if end < total else None
+        return items, next_cursor, total
+
+    def gc(self) -> int:
+        """Delete expired spills; returns how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [self._spills.pop(sid) for sid, spill in list(self._spills.items()) if spill.expires <= now]
+        for spill in expired:
+            try:
+                os.remove(spill.path)
+            except OSError:
+                pass
+        return len(expired)
+
+    def close(self) -> None:
+        with self._lock:
+            self._spills.clear()
+            if self._directory is not None:
+                shutil.rmtree(self._directory, ignore_errors=True)
+                self._directory = None
@@ -0,0 +1,552 @@
+"""Local SQLite index of photo metadata for answering `query_photos` in-process.
+
+Each `osxphotos query` loads the whole Photos database, which takes tens of seconds on
+large libraries even for a query matching a handful of photos. The index stores the
+``osxphotos query --json`` record of every photo of a library, with the attributes the
+common filters use as indexed columns and keywords, persons, albums and labels in
+many-to-many tables, so a query on those filters is a few SQL lookups.
+
+The index is filled from ``osxphotos query --json`` by the server: a full build the
+first time, then only photos added since the newest ``date_added`` seen (osxphotos'
+``--added-after``) whenever the library fingerprint changes. Edits to photos already
+indexed and deletions are only picked up by a full rebuild, which happens once the
+build is older than the configured maximum age or after `invalidate` (the server calls
+it when one of its own commands modifies the library).
+
+`search` is full-text search (SQLite FTS5) over each photo's title, description,
+keywords, persons, album names, place names and labels, ranked with BM25.
+
+`query` mirrors the matching rules of osxphotos' query: several keywords, persons,
+albums, labels, titles, descriptions, names or years match any of them; albums are
+matched on their full "Folder/Album" path; `ignore_case` folds case; dates without a
+time zone are local time.
+"""
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS libraries (
+    library TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    built REAL NOT NULL,
+    refreshed REAL NOT NULL,
+    stale INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS photos (
+    id INTEGER PRIMARY KEY,
+    library TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    date REAL,
+    year INTEGER,
+    date_added REAL,
+    title TEXT,
+    description TEXT,
+    original_filename TEXT,
+    uti_original TEXT,
+    original_filesize INTEGER,
+    flags INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (library, uuid)
+);
+CREATE INDEX IF NOT EXISTS photos_date ON photos (library, date);
+CREATE INDEX IF NOT EXISTS photos_date_added ON photos (library, date_added);
+CREATE INDEX IF NOT EXISTS photos_year ON photos (library, year);
+"""
+
+# Many-to-many attributes: filter parameter -> (table, JSON key)
+_NAMED = {
+    "keyword": ("keyword", "keywords"),
+    "person": ("person", "persons"),
+    "album": ("album", "albums"),
+    "label": ("label", "labels"),
+}
+
+_NAME_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {t} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, folded TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS {t}_folded ON {t} (folded);
+CREATE TABLE IF NOT EXISTS photo_{t} (
+    {t}_id INTEGER NOT NULL,
+    photo_id INTEGER NOT NULL,
+    PRIMARY KEY ({t}_id, photo_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS photo_{t}_photo ON photo_{t} (photo_id);
+"""
+
+# Full-text columns (with their BM25 weights) and the JSON values they are made of
+_TEXT_COLUMNS = {
+    "title": 3.0, "description": 1.0, "keywords": 2.0, "persons": 2.0, "albums": 1.5, "places": 1.0, "labels": 1.0,
+}
+_TEXT_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS photo_text USING fts5(
+    {", ".join(_TEXT_COLUMNS)}, tokenize = "unicode61 remove_diacritics 2", prefix = "2 3"
+);
+"""
+
+# Records fetched per batch by `PhotoIndex.query`; the lock is only held while fetching
+_QUERY_BATCH = 500
+
+# Bumped when the layout changes; an index with another version is dropped and rebuilt
+_SCHEMA_VERSION = 2
+
+# Boolean attributes, stored as bits of `photos.flags`: name -> test on the JSON record
+_FLAG_TESTS = {
+    "hasadjustments": lambda p: p.get("hasadjustments"),
+    "external_edit": lambda p: p.get("external_edit"),
+    "favorite": lambda p: p.get("favorite"),
+    "hidden": lambda p: p.get("hidden"),
+    "missing": lambda p: not p.get("path"),
+    "shared": lambda p: p.get("shared"),
+    "burst": lambda p: p.get("burst"),
+    "live_photo": lambda p: p.get("live_photo"),
+    "portrait": lambda p: p.get("portrait"),
+    "screenshot": lambda p: p.get("screenshot"),
+    "screen_recording": lambda p: p.get("screen_recording"),
+    "slow_mo": lambda p: p.get("slow_mo"),
+    "time_lapse": lambda p: p.get("time_lapse"),
+    "hdr": lambda p: p.get("hdr"),
+    "selfie": lambda p: p.get("selfie"),
+    "panorama": lambda p: p.get("panorama"),
+    "iscloudasset": lambda p: p.get("iscloudasset"),
+    # osxphotos' --incloud and --not-incloud both leave out shared photos
+    "incloud": lambda p: p.get("incloud") and not p.get("shared"),
+    "not_incloud": lambda p: not p.get("incloud") and not p.get("shared"),
+    "has_raw": lambda p: p.get("has_raw"),
+    "isreference": lambda p: p.get("isreference"),
+    "isphoto": lambda p: p.get("isphoto"),
+    "ismovie": lambda p: p.get("ismovie"),
+    "in_album": lambda p: p.get("albums"),
+    "location": lambda p: p.get("latitude") is not None and p.get("longitude") is not None,
+    "comments": lambda p: p.get("comments"),
+    "likes": lambda p: p.get("likes"),
+    "keywords": lambda p: p.get("keywords"),
+}
+_FLAG_BITS = {name: 1 << bit for bit, name in enumerate(_FLAG_TESTS)}
+
+# Flag filters: (parameter, its negation or None, flag). As in osxphotos, the parameter
+# wins when both are given.
+_FLAG_FILTERS: List[Tuple[str, Optional[str], str]] = [
+    ("edited", "not_edited", "hasadjustments"),
+    ("external_edit", None, "external_edit"),
+    ("favorite", "not_favorite", "favorite"),
+    ("hidden", "not_hidden", "hidden"),
+    ("missing", "not_missing", "missing"),
+    ("shared", "not_shared", "shared"),
+    ("burst", "not_burst", "burst"),
+    ("live", "not_live", "live_photo"),
+    ("portrait", "not_portrait", "portrait"),
+    ("screenshot", "not_screenshot", "screenshot"),
+    ("screen_recording", "not_screen_recording", "screen_recording"),
+    ("slow_mo", "not_slow_mo", "slow_mo"),
+    ("time_lapse", "not_time_lapse", "time_lapse"),
+    ("hdr", "not_hdr", "hdr"),
+    ("selfie", "not_selfie", "selfie"),
+    ("panorama", "not_panorama", "panorama"),
+    ("cloudasset", "not_cloudasset", "iscloudasset"),
+    ("incloud", None, "incloud"),
+    ("not_incloud", None, "not_incloud"),
+    ("has_raw", None, "has_raw"),
+    ("has_comment", "no_comment", "comments"),
+    ("has_likes", "no_likes", "likes"),
+    ("is_reference", "not_reference", "isreference"),
+    ("in_album", "not_in_album", "in_album"),
+    ("location", "no_location", "location"),
+    ("only_photos", None, "isphoto"),
+    ("only_movies", None, "ismovie"),
+]
+
+# Substring filters on text columns: parameter -> (column, "no_" parameter or None)
+_TEXT_FILTERS = {
+    "title": ("title", "no_title"),
+    "description": ("description", "no_description"),
+    # osxphotos matches --name against the original filename (Photos 5 and later)
+    "name": ("original_filename", None),
+}
+
+# Parameters `query` understands; anything else must go to osxphotos
+SUPPORTED_FILTERS = frozenset(
+    {"library", "ignore_case", "uuid", "no_keyword", "from_date", "to_date", "year", "added_before", "added_after",
+     "uti", "no_title", "no_description"}
+    | set(_NAMED)
+    | set(_TEXT_FILTERS)
+    | {param for param, _, _ in _FLAG_FILTERS}
+    | {negated for _, negated, _ in _FLAG_FILTERS if negated}
+)
+
+
+class IndexState(NamedTuple):
+    """What the index holds for one library."""
+
+    fingerprint: Optional[str]
+    # time.time() of the last full build and of the last refresh
+    built: float
+    refreshed: float
+    # A command of the server modified the library: rebuild before use
+    stale: bool
+    photos: int
+    # Newest `date_added` indexed, as an ISO 8601 string
+    last_added: Optional[str]
+
+
+def encode_fingerprint(fingerprint: Any) -> Optional[str]:
+    return None if fingerprint is None else json.dumps(fingerprint)
+
+
+def parse_datetime(value: Any) -> Optional[datetime.datetime]:
+    """An ISO 8601 date or datetime as an aware datetime; naive values are local time."""
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo is not None else parsed.astimezone()
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    parsed = parse_datetime(value)
+    return parsed.timestamp() if parsed is not None else None
+
+
+def _nfc(value: str) -> str:
+    return unicodedata.normalize("NFC", value)
+
+
+def _album_paths(photo: Dict[str, Any]) -> List[str]:
+    """Full "Folder/Sub/Album" paths of the photo's albums, "/" in names escaped as "//"."""
+    folders = photo.get("folders") or {}
+    paths = []
+    for title in photo.get("albums") or []:
+        parts = [*(folders.get(title) or []), title]
+        paths.append("/".join(str(part).replace("/", "//") for part in parts))
+    return paths
+
+
+def _place_names(place: Any) -> List[str]:
+    if not isinstance(place, dict):
+        return []
+    names = [place.get("name")]
+    for values in (place.get("names") or {}).values():
+        names.extend(values or [])
+    return [str(name) for name in dict.fromkeys(names) if name]
+
+
+def _text_values(photo: Dict[str, Any]) -> List[str]:
+    """Values of the full-text columns for `photo`, in `_TEXT_COLUMNS` order."""
+    def joined(values: Any) -> str:
+        return "\n".join(str(v) for v in values or [] if v)
+
+    return [
+        photo.get("title") or "",
+        photo.get("description") or "",
+        joined(photo.get("keywords")),
+        joined(photo.get("persons")),
+        joined(photo.get("albums")),
+        joined(_place_names(photo.get("place"))),
+        joined(photo.get("labels")),
+    ]
+
+
+def match_expression(text: str, match: str = "all") -> str:
+    """FTS5 query for free text: "quoted phrases" match as phrases, other words as prefixes.
+
+    With match="all" every term must occur (in any of the columns), with "any" one is enough.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\w+)', text):
+        if phrase.strip():
+            terms.append('"' + phrase.strip().replace('"', '""') + '"')
+        elif word:
+            terms.append(f'"{word}"*')
+    if not terms:
+        raise ValueError("The search text must contain at least one word")
+    return (" OR " if match == "any" else " AND ").join(terms)
+
+
+def _album_key(path: str) -> str:
+    """Normalize an album path given as a filter the way osxphotos splits it."""
+    placeholder = "\x00"
+    parts = [part.replace(placeholder, "/") for part in path.replace("//", placeholder).split("/")]
+    return "/".join(part.replace("/", "//") for part in parts)
+
+
+class PhotoIndex:
+    """SQLite index of `osxphotos query --json` records per library."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        # Refreshes run in worker threads while queries may run in others
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                # The index only caches osxphotos output: start over rather than migrate
+                # (virtual tables first: dropping one drops its shadow tables)
+                tables = db.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+                    " ORDER BY sql LIKE 'CREATE VIRTUAL%' DESC"
+                )
+                for (table,) in tables.fetchall():
+                    db.execute(f'DROP TABLE IF EXISTS "{table}"')
+                db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            db.executescript(
+                _SCHEMA + "".join(_NAME_SCHEMA.format(t=t) for t, _ in _NAMED.values()) + _TEXT_SCHEMA
+            )
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @staticmethod
+    def supports(values: Dict[str, Any]) -> bool:
+        """Whether every filter set in `values` (query_photos parameters) can be answered by `query`."""
+        return all(name in SUPPORTED_FILTERS for name, value in values.items() if value)
+
+    # ---- state ----
+    def state(self, library: str) -> Optional[IndexState]:
+        with self._lock:
+            db = self._conn()
+            row = db.execute(
+                "SELECT fingerprint, built, refreshed, stale FROM libraries WHERE library = ?", (library,)
+            ).fetchone()
+            if row is None:
+                return None
+            count, last = db.execute(
+                "SELECT COUNT(*), MAX(date_added) FROM photos WHERE library = ?", (library,)
+            ).fetchone()
+        last_added = None
+        if last is not None:
+            last_added = datetime.datetime.fromtimestamp(last, datetime.timezone.utc).isoformat()
+        return IndexState(row[0], row[1], row[2], bool(row[3]), count, last_added)
+
+    def invalidate(self, library: str) -> None:
+        """Have the next refresh of `library` rebuild it from scratch."""
+        if self._db is None and not os.path.exists(self.path):
+            return
+        with self._lock:
+            self._conn().execute("UPDATE libraries SET stale = 1 WHERE library = ?", (library,))
+
+    # ---- loading ----
+    def rebuild(self, library: str, photos: Iterable[Dict[str, Any]], fingerprint: Any) -> int:
+        """Replace everything indexed for `library` with `photos`; returns the number indexed."""
+        return self._load(library, photos, fingerprint, replace=True)
+
+    def update(self, library: str, photos: Iterable[Dict[str, Any]], fingerprint: Any) -> int:
+        """Add or replace `photos` (for example those added since the last refresh)."""
+        return self._load(library, photos, fingerprint, replace=False)
+
+    def _load(self, library: str, photos: Iterable[Dict[str, Any]], fingerprint: Any, replace: bool) -> int:
+        now = time.time()
+        count = 0
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN")
+            try:
+                if replace:
+                    self._delete(db, library)
+                for photo in photos:
+                    if isinstance(photo, dict) and photo.get("uuid"):
+                        self._insert(db, library, photo)
+                        count += 1
+                if replace:
+                    db.execute(
+                        "INSERT OR REPLACE INTO libraries VALUES (?, ?, ?, ?, 0)",
+                        (library, encode_fingerprint(fingerprint), now, now),
+                    )
+                else:
+                    db.execute(
+                        "UPDATE libraries SET fingerprint = ?, refreshed = ? WHERE library = ?",
+                        (encode_fingerprint(fingerprint), now, library),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return count
+
+    @staticmethod
+    def _delete(db: sqlite3.Connection, library: str) -> None:
+        for table, _ in _NAMED.values():
+            db.execute(
+                f"DELETE FROM photo_{table} WHERE photo_id IN (SELECT id FROM photos WHERE library = ?)", (library,)
+            )
+        db.execute("DELETE FROM photo_text WHERE rowid IN (SELECT id FROM photos WHERE library = ?)", (library,))
+        db.execute("DELETE FROM photos WHERE library = ?", (library,))
+
+    @staticmethod
+    def _insert(db: sqlite3.Connection, library: str, photo: Dict[str, Any]) -> None:
+        uuid = photo["uuid"]
+        old = db.execute("SELECT id FROM photos WHERE library = ? AND uuid = ?", (library, uuid)).fetchone()
+        if old is not None:
+            for table, _ in _NAMED.values():
+                db.execute(f"DELETE FROM photo_{table} WHERE photo_id = ?", old)
+            db.execute("DELETE FROM photo_text WHERE rowid = ?", old)
+            db.execute("DELETE FROM photos WHERE id = ?", old)
+        date = parse_datetime(photo.get("date"))
+        flags = sum(bit for name, bit in _FLAG_BITS.items() if _FLAG_TESTS[name](photo))
+        photo_id = db.execute(
+            "INSERT INTO photos (library, uuid, date, year, date_added, title, description, original_filename,"
+            " uti_original, original_filesize, flags, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                library, uuid, date.timestamp() if date else None, date.year if date else None,
+                _timestamp(photo.get("date_added")), photo.get("title"), photo.get("description"),
+                photo.get("original_filename"), photo.get("uti_original"), photo.get("original_filesize"),
+                flags, json.dumps(photo),
+            ),
+        ).lastrowid
+        for param, (table, key) in _NAMED.items():
+            names = _album_paths(photo) if param == "album" else photo.get(key) or []
+            for name in set(names):
+                name = str(name)
+                db.execute(f"INSERT OR IGNORE INTO {table} (name, folded) VALUES (?, ?)", (name, name.lower()))
+                db.execute(
+                    f"INSERT OR IGNORE INTO photo_{table} SELECT id, ? FROM {table} WHERE name = ?", (photo_id, name)
+                )
+        db.execute(
+            f"INSERT INTO photo_text (rowid, {', '.join(_TEXT_COLUMNS)}) VALUES (?{', ?' * len(_TEXT_COLUMNS)})",
+            (photo_id, *_text_values(photo)),
+        )
+
+    # ---- querying ----
+    def _where(self, library: str, values: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        clauses = ["p.library = ?"]
+        args: List[Any] = [library]
+        fold = bool(values.get("ignore_case"))
+
+        for param, (table, _) in _NAMED.items():
+            wanted = [_nfc(str(v)) for v in values.get(param) or []]
+            if param == "album":
+                wanted = [_album_key(v) for v in wanted]
+            if wanted:
+                column = "folded" if fold else "name"
+                wanted = [v.lower() for v in wanted] if fold else wanted
+                clauses.append(
+                    f"p.id IN (SELECT l.photo_id FROM photo_{table} l JOIN {table} n ON n.id = l.{table}_id"
+                    f" WHERE n.{column} IN ({','.join('?' * len(wanted))}))"
+                )
+                args.extend(wanted)
+            elif param == "keyword" and values.get("no_keyword"):
+                clauses.append(f"p.flags & {_FLAG_BITS['keywords']} = 0")
+
+        if values.get("uuid"):
+            uuids = list(values["uuid"])
+            clauses.append(f"p.uuid IN ({','.join('?' * len(uuids))})")
+            args.extend(uuids)
+
+        for param, (column, negated) in _TEXT_FILTERS.items():
+            wanted = values.get(param) or []
+            # query_photos takes one title or description, and a list of names
+            needles = [_nfc(str(v)) for v in ([wanted] if isinstance(wanted, str) else wanted)]
+            if needles:
+                target = f"lower(p.{column})" if fold else f"p.{column}"
+                tests = [f"instr({target}, ?) > 0" for _ in needles]
+                clauses.append(f"(p.{column} IS NOT NULL AND ({' OR '.join(tests)}))")
+                args.extend(n.lower() if fold else n for n in needles)
+            elif negated and values.get(negated):
+                clauses.append(f"(p.{column} IS NULL OR p.{column} = '')")
+
+        if values.get("uti"):
+            clauses.append("instr(p.uti_original, ?) > 0")
+            args.append(values["uti"])
+
+        for param, op, column in (
+            ("from_date", ">=", "date"), ("to_date", "<", "date"),
+            ("added_after", ">", "date_added"), ("added_before", "<", "date_added"),
+        ):
+            if values.get(param):
+                ts = _timestamp(values[param])
+                if ts is None:
+                    raise ValueError(f"Invalid {param}: {values[param]!r} (expected ISO 8601, e.g. 2024-05-01)")
+                clauses.append(f"p.{column} {op} ?")
+                args.append(ts)
+
+        if values.get("year"):
+            years = [int(y) for y in values["year"]]
+            clauses.append(f"p.year IN ({','.join('?' * len(years))})")
+            args.extend(years)
+
+        for param, negated, flag in _FLAG_FILTERS:
+            if values.get(param):
+                clauses.append(f"p.flags & {_FLAG_BITS[flag]} != 0")
+            elif negated and values.get(negated):
+                clauses.append(f"p.flags & {_FLAG_BITS[flag]} = 0")
+        return " AND ".join(clauses), args
+
+    def query(self, library: str, values: Dict[str, Any]) -> Iterator[str]:
+        """JSON records (as stored) of the photos of `library` matching the filters in `values`.
+
+        Records are read in batches, taking the lock per batch, so a large result does not
+        hold up refreshes and other queries while the caller works through it.
+        """
+        where, args = self._where(library, values)
+        with self._lock:
+            db = self._conn()
+            rows = db.execute(f"SELECT p.data FROM photos p WHERE {where} ORDER BY p.id", args)
+        return self._records(db, rows)
+
+    def _records(self, db: sqlite3.Connection, rows: sqlite3.Cursor) -> Iterator[str]:
+        try:
+            while True:
+                with self._lock:
+                    batch = rows.fetchmany(_QUERY_BATCH)
+                if not batch:
+                    return
+                for (data,) in batch:
+                    yield data
+        finally:
+            with self._lock:
+                # Unless close() closed the connection (and the cursor with it) meanwhile
+                if self._db is db:
+                    rows.close()
+
+    def count(self, library: str, values: Dict[str, Any]) -> int:
+        where, args = self._where(library, values)
+        with self._lock:
+            return self._conn().execute(f"SELECT COUNT(*) FROM photos p WHERE {where}", args).fetchone()[0]
+
+    def search(self, library: str, text: str, limit: int = 50, match: str = "all") -> Tuple[int, List[Dict[str, Any]]]:
+        """Photos of `library` matching `text`, best first: (total matches, top `limit` hits).
+
+        Each hit has the photo's uuid, its relevance score (higher is better), title,
+        date and original filename.
+        """
+        expression = match_expression(text, match)
+        weights = ", ".join(str(w) for w in _TEXT_COLUMNS.values())
+        with self._lock:
+            db = self._conn()
+            total = db.execute(
+                "SELECT COUNT(*) FROM photo_text t JOIN photos p ON p.id = t.rowid"
+                " WHERE photo_text MATCH ? AND p.library = ?",
+                (expression, library),
+            ).fetchone()[0]
+            rows = db.execute(
+                f"SELECT p.uuid, bm25(photo_text, {weights}) AS rank, p.title, p.date, p.original_filename"
+                " FROM photo_text t JOIN photos p ON p.id = t.rowid"
+                " WHERE photo_text MATCH ? AND p.library = ? ORDER BY rank LIMIT ?",
+                (expression, library, max(0, limit)),
+            ).fetchall()
+        hits = []
+        for uuid, rank, title, date, filename in rows:
+            taken = datetime.datetime.fromtimestamp(date).astimezone().isoformat() if date is not None else None
+            hits.append({
+                "uuid": uuid, "score": round(-rank, 4), "title": title, "date": taken, "original_filename": filename,
+            })
+        return total, hits
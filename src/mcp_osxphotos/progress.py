@@ -0,0 +1,132 @@
+"""Progress parsing for long-running osxphotos commands (export, import).
+
+`ProgressTracker` consumes output lines as they arrive and derives completed and total
+counts from the lines osxphotos prints: "Exporting 120 photos to ...", per-file
+"Exported ..." / "Imported ..." lines and "(12/120)" or "12/120" counters from verbose
+output and progress bars. From those it computes a rate and an ETA for MCP progress
+notifications.
+
+`ProgressGroup` adds up the trackers of several commands that make up one operation
+(the runs of a sharded export or of a chunked import) into a single progress report.
+"""
+import re
+import time
+from typing import List, Optional
+
+_TOTAL_RE = re.compile(
+    r"^\s*(?:Exporting|Importing|Processing|Found)\s+(\d[\d,]*)\s+(?:photos?|files?|items?|assets?|videos?)\b",
+    re.IGNORECASE,
+)
+_DONE_RE = re.compile(r"^\s*(?:Exported|Imported|Skipped|Skipping|Updated|Error exporting|Error importing)\b")
+# Counters stand alone ("12/120", "(12/120)") so path segments like "/2020/1/12" do not match
+_FRACTION_RE = re.compile(r"(?:^|[\s(])(\d[\d,]*)\s*/\s*(\d[\d,]*)(?=$|[\s)])")
+
+
+def _int(text: str) -> int:
+    return int(text.replace(",", ""))
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
+
+
+class ProgressTracker:
+    """Accumulate progress from osxphotos output lines."""
+
+    def __init__(self) -> None:
+        self.completed = 0
+        self.total: Optional[int] = None
+        self.started = time.monotonic()
+
+    def feed(self, line: str) -> bool:
+        """Parse one output line; returns True if completed or total changed."""
+        # Progress bars redraw with carriage returns; only the last frame matters
+        line = line.rsplit("\r", 1)[-1]
+        before = (self.completed, self.total)
+        match = _TOTAL_RE.match(line)
+        if match:
+            self.total = _int(match.group(1))
+            return (self.completed, self.total) != before
+        fraction = _FRACTION_RE.search(line)
+        if fraction:
+            done, total = _int(fraction.group(1)), _int(fraction.group(2))
+            if 0 < total and done <= total:
+                self.total = total
+                self.completed = max(self.completed, done)
+                return (self.completed, self.total) != before
+        if _DONE_RE.match(line):
+            self.completed += 1
+            if self.total is not None and self.completed > self.total:
+                self.total = self.completed
+        return (self.completed, self.total) != before
+
+    @property
+    def rate(self) -> float:
+        """Completed items per second since tracking started."""
+        elapsed = time.monotonic() - self.started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds remaining, or None when unknown."""
+        if self.total is None or self.rate <= 0:
+            return None
+        return max(self.total - self.completed, 0) / self.rate
+
+    def message(self) -> str:
+        total = "?" if self.total is None else str(self.total)
+        text = f"{self.completed}/{total} files, {self.rate:.1f} files/s"
+        eta = self.eta
+        if eta is not None:
+            text += f", ETA {_format_duration(eta)}"
+        return text
+
+
+class ProgressGroup:
+    """Combined progress of several `ProgressTracker`s, one per command."""
+
+    def __init__(self) -> None:
+        self.trackers: List[ProgressTracker] = []
+        self.started = time.monotonic()
+        self.last_report = 0.0
+
+    def tracker(self) -> ProgressTracker:
+        tracker = ProgressTracker()
+        self.trackers.append(tracker)
+        return tracker
+
+    @property
+    def completed(self) -> int:
+        return sum(t.completed for t in self.trackers)
+
+    @property
+    def total(self) -> Optional[int]:
+        """Sum of the totals, or None until every tracker knows its own."""
+        totals = [t.total for t in self.trackers]
+        if not totals or any(total is None for total in totals):
+            return None
+        return sum(totals)  # type: ignore[arg-type]
+
+    def due(self, interval: float) -> bool:
+        """Whether at least `interval` seconds passed since the last report; if so, start a new one."""
+        now = time.monotonic()
+        if now - self.last_report < interval:
+            return False
+        self.last_report = now
+        return True
+
+    def message(self) -> str:
+        elapsed = time.monotonic() - self.started
+        completed, total = self.completed, self.total
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        text = f"{completed}/{'?' if total is None else total} files, {rate:.1f} files/s"
+        if total is not None and rate > 0:
+            text += f", ETA {_format_duration(max(total - completed, 0) / rate)}"
+        return text
@@ -0,0 +1,197 @@
+"""Streaming parse, field projection and columnar encoding of ``osxphotos query --json`` output.
+
+osxphotos prints a query result as one JSON array, a single line that runs to
+gigabytes on large libraries. `JsonArrayParser` is fed that output chunk by chunk as
+the child writes it and hands over each photo as soon as it is complete, so a caller
+that keeps only some fields of each photo never holds the whole document.
+
+`project` picks fields from a photo record; dotted names reach into nested objects
+("exif_info.camera_model", "place.name"). `ColumnarBuilder` collects projected rows
+for the compact format: column names once, then one array per photo, with string
+columns that repeat values (keywords, albums, cameras, ...) dictionary-encoded.
+"""
+import codecs
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+_WHITESPACE = " \t\r\n"
+
+
+class JsonArrayParser:
+    """Incremental parser of a top-level JSON array, calling `on_item` with each element.
+
+    `feed` never raises: the first syntax error is kept and raised by `close`, which
+    also fails when the array was not terminated. Empty input is an empty array.
+    """
+
+    def __init__(self, on_item: Callable[[Any], None]) -> None:
+        self.on_item = on_item
+        self.items = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        # "start" (before "["), "item" (an element or "]" expected), "next" ("," or "]"), "end"
+        self._state = "start"
+        self._error: Optional[ValueError] = None
+
+    def feed(self, data: bytes) -> None:
+        if self._error is not None:
+            return
+        self._buffer += self._decoder.decode(data)
+        try:
+            self._scan()
+        except ValueError as e:
+            self._error = e
+            self._buffer = ""
+
+    def close(self) -> None:
+        self.feed(b"")
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._error is None:
+            self._scan(final=True)
+        if self._error is not None:
+            raise self._error
+        if self._state not in ("start", "end") or self._buffer.strip(_WHITESPACE):
+            raise ValueError("osxphotos JSON output ended before the end of the array")
+
+    def _scan(self, final: bool = False) -> None:
+        buffer, pos = self._buffer, 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError(f"osxphotos output is not a JSON array (starts with {buffer[pos:pos + 20]!r})")
+                self._state, pos = "item", pos + 1
+            elif self._state == "next":
+                if char not in ",]":
+                    raise ValueError(f"expected ',' or ']' in osxphotos JSON output, got {char!r}")
+                self._state, pos = ("item" if char == "," else "end"), pos + 1
+            elif self._state == "item":
+                if char == "]" and self.items == 0:
+                    self._state, pos = "end", pos + 1
+                    continue
+                try:
+                    item, end = self._json.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    # Most likely an element cut by the chunk boundary: wait for more
+                    break
+                if end == len(buffer) and not final and not isinstance(item, (dict, list)):
+                    # A number at the end of the buffer may continue in the next chunk
+                    break
+                self.items += 1
+                self.on_item(item)
+                self._state, pos = "next", end
+            else:
+                raise ValueError("unexpected data after the end of osxphotos JSON output")
+        self._buffer = buffer[pos:]
+
+
+def lookup(record: Any, field: str) -> Any:
+    """Value of `field` in `record`, following dots into nested objects; None if absent."""
+    value = record
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def project(record: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: lookup(record, field) for field in fields}
+
+
+class ColumnarBuilder:
+    """Rows of `fields` values, encoded as {"columns", "dictionaries", "rows"}.
+
+    A column whose values are all strings (or lists of strings, or null) and repeat is
+    dictionary-encoded: its strings are listed once under "dictionaries" and cells hold
+    their indexes. Other columns keep their values. Equal strings are stored once while
+    rows are collected.
+    """
+
+    def __init__(self, fields: Optional[Sequence[str]] = None) -> None:
+        # Without fields, the columns are the keys of the first record
+        self.fields = list(fields) if fields else []
+        self.rows: List[List[Any]] = []
+        self._strings: Dict[str, str] = {}
+
+    def add(self, record: Any) -> None:
+        if not self.fields and not self.rows and isinstance(record, dict):
+            self.fields = list(record)
+        self.rows.append([self._share(lookup(record, field)) for field in self.fields])
+
+    def _share(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        if isinstance(value, list):
+            return [self._share(v) for v in value]
+        return value
+
+    def result(self) -> Dict[str, Any]:
+        dictionaries: Dict[str, List[str]] = {}
+        codes: Dict[int, Dict[str, int]] = {}
+        for column, field in enumerate(self.fields):
+            index = _dictionary([row[column] for row in self.rows])
+            if index is not None:
+                codes[column] = index
+                dictionaries[field] = list(index)
+        rows = self.rows
+        if codes:
+            rows = [
+                [_encode(cell, codes[column]) if column in codes else cell for column, cell in enumerate(row)]
+                for row in self.rows
+            ]
+        return {"columns": self.fields, "dictionaries": dictionaries, "rows": rows}
+
+
+def _dictionary(cells: List[Any]) -> Optional[Dict[str, int]]:
+    """String -> index for a column worth encoding (only strings, some repeated), else None."""
+    index: Dict[str, int] = {}
+    count = 0
+    for cell in cells:
+        for value in (cell if isinstance(cell, list) else [cell]):
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                return None
+            count += 1
+            index.setdefault(value, len(index))
+    return index if len(index) < count else None
+
+
+def _encode(cell: Any, index: Dict[str, int]) -> Any:
+    if isinstance(cell, list):
+        return [index[v] if v is not None else None for v in cell]
+    return index[cell] if cell is not None else None
+
+
+class QueryResult:
+    """Photos of a query result as they come from the parser, reshaped for the response.
+
+    Keeps the `fields` of each photo (all of it without `fields`) as a list of objects,
+    or with `columnar` in a `ColumnarBuilder`.
+    """
+
+    def __init__(self, fields: Optional[Sequence[str]] = None, columnar: bool = False) -> None:
+        self.fields = list(fields) if fields else None
+        self.items: List[Any] = []
+        self.columns = ColumnarBuilder(self.fields) if columnar else None
+
+    def add(self, record: Any) -> None:
+        if self.columns is not None:
+            self.columns.add(record)
+        elif self.fields is not None:
+            self.items.append(project(record, self.fields))
+        else:
+            self.items.append(record)
+
+    def text(self) -> str:
+        if self.columns is not None:
+            return json.dumps(self.columns.result(), separators=(",", ":")) + "\n"
+        return json.dumps(self.items) + "\n"
@@ -0,0 +1,227 @@
+"""Reader/writer scheduling of osxphotos commands per Photos library.
+
+Commands that only read a library run in parallel; commands that modify it (batch-edit,
+push-exif, timewarp, import, sync, add-locations, or exports that add photos to albums)
+hold that library exclusively. The lock is keyed by the resolved library path, so
+commands against different libraries never wait for each other. Waiters are served in
+arrival order: readers that arrive after a waiting writer queue behind it, so a steady
+stream of queries cannot starve an import.
+
+A tool that coordinates several processes on one library (batch_edit_by_uuid runs
+push-exif chunks on disjoint UUIDs in parallel) takes the write lock once with `hold`;
+commands started inside it see the lock in a context variable and do not wait for it again.
+
+`SingleFlight` goes one step further for read-only commands: identical calls that
+arrive while one is running wait for that run instead of starting their own.
+"""
+import asyncio
+import contextvars
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# (library path, write) pairs a command needs
+Access = Tuple[str, bool]
+
+# Locks held by the current task and the tasks it started
+_held: "ContextVar[FrozenSet[Access]]" = ContextVar("mcp_osxphotos_library_locks", default=frozenset())
+
+
+class RWLock:
+    """FIFO reader/writer lock for asyncio; release is synchronous so it is safe in cleanup."""
+
+    def __init__(self) -> None:
+        self.readers = 0
+        self.writer = False
+        self._waiters: "deque[Tuple[bool, asyncio.Future[None]]]" = deque()
+
+    @property
+    def idle(self) -> bool:
+        return not self.readers and not self.writer and not self._waiters
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, fut in self._waiters if not fut.done())
+
+    def _available(self, write: bool) -> bool:
+        return not self.writer and (not write or self.readers == 0)
+
+    def _grant(self, write: bool) -> None:
+        if write:
+            self.writer = True
+        else:
+            self.readers += 1
+
+    async def acquire(self, write: bool) -> None:
+        if not self._waiters and self._available(write):
+            self._grant(write)
+            return
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        entry = (write, fut)
+        self._waiters.append(entry)
+        try:
+            await fut
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                # Granted just as the waiter was cancelled: hand it on
+                self.release(write)
+            else:
+                try:
+                    self._waiters.remove(entry)
+                except ValueError:
+                    pass
+                self._wake()
+            raise
+
+    def release(self, write: bool) -> None:
+        if write:
+            self.writer = False
+        else:
+            self.readers -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            write, fut = self._waiters[0]
+            if fut.done():
+                self._waiters.popleft()
+                continue
+            if not self._available(write):
+                return
+            self._waiters.popleft()
+            self._grant(write)
+            fut.set_result(None)
+
+
+class LibraryLocks:
+    """One `RWLock` per resolved library path and event loop."""
+
+    def __init__(self) -> None:
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, RWLock]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _table(self) -> Dict[str, RWLock]:
+        loop = asyncio.get_running_loop()
+        table = self._locks.get(loop)
+        if table is None:
+            table = self._locks[loop] = {}
+        return table
+
+    @asynccontextmanager
+    async def hold(self, accesses: Iterable[Access]) -> AsyncIterator[None]:
+        """Acquire every (library, write) lock not already held by this task tree.
+
+        Locks are taken in path order so two multi-library commands cannot deadlock.
+        Upgrading a held read lock to a write lock is not supported.
+        """
+        held = _held.get()
+        wanted: Dict[str, bool] = {}
+        for library, write in accesses:
+            wanted[library] = wanted.get(library, False) or write
+        needed = [
+            (library, write) for library, write in sorted(wanted.items())
+            if (library, True) not in held and (library, write) not in held
+        ]
+        table = self._table()
+        acquired = []
+        lock = None
+        try:
+            for library, write in needed:
+                lock = table.get(library)
+                if lock is None:
+                    lock = table[library] = RWLock()
+                await lock.acquire(write)
+                acquired.append((library, write, lock))
+                lock = None
+            token = _held.set(held | frozenset(needed))
+            try:
+                yield
+            finally:
+                _held.reset(token)
+        finally:
+            for library, write, held_lock in reversed(acquired):
+                held_lock.release(write)
+                if held_lock.idle and table.get(library) is held_lock:
+                    del table[library]
+            # A cancelled wait may leave an unused lock behind
+            if lock is not None and lock.idle:
+                for library, candidate in list(table.items()):
+                    if candidate is lock:
+                        del table[library]
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        """Readers, writer and waiters per library with a held or awaited lock."""
+        try:
+            table = self._table()
+        except RuntimeError:
+            return {}
+        return {
+            library: {"readers": lock.readers, "writer": int(lock.writer), "waiting": lock.waiting}
+            for library, lock in table.items()
+        }
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one run.
+
+    The first caller starts the run in its own task; later callers with the same key
+    await that task. The task does not inherit the first caller's library locks: it
+    serves callers that hold none, and may outlive the first caller, so the command
+    takes its own. Each caller can be cancelled on its own: the run is only cancelled
+    once every caller waiting for it is gone. Finished runs are forgotten immediately,
+    so results are never reused after the fact (that is the result cache's job).
+    """
+
+    def __init__(self) -> None:
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.runs = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        table = self._flights.get(loop)
+        if table is None:
+            table = self._flights[loop] = {}
+        flight = table.get(key)
+        if flight is None:
+            context = contextvars.copy_context()
+            context.run(_held.set, frozenset())
+            flight = table[key] = _Flight(loop.create_task(fn(), context=context))
+            self.runs += 1
+
+            def forget(_task: "asyncio.Task[Any]", flight: _Flight = flight) -> None:
+                if table.get(key) is flight:
+                    del table[key]
+
+            flight.task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        try:
+            in_flight = len(self._flights.get(asyncio.get_running_loop()) or ())
+        except RuntimeError:
+            in_flight = 0
+        return {"runs": self.runs, "coalesced": self.coalesced, "in_flight": in_flight}
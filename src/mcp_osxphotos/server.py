@@ -1,10 +1,26 @@
 # batch_edit_by_uuid definition moved below MCP initialization
+import asyncio
+import atexit
+import datetime
+import difflib
+import functools
+import inspect
 import os
 import sys
 import shutil
-import subprocess
+import signal
 import json
-from typing import List, Optional, Literal, Tuple, Dict, Any, Union, Annotated
+import queue
+import tempfile
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    List, Optional, Literal, Tuple, Dict, Any, Union, Annotated, AsyncIterator, Awaitable, Callable, NamedTuple,
+    Iterable, Iterator, get_args, get_origin, get_type_hints,
+)
 
 # Make python-dotenv optional so missing dev deps don't crash discovery in GUI clients
 try:
@@ -12,12 +28,106 @@ try:
 except Exception:
     def load_dotenv(*_args, **_kwargs):  # type: ignore
         return False
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context
+
+if not __package__:
+    # Allow `python src/mcp_osxphotos/server.py` without installing the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_osxphotos.cache import ResultCache, cache_directory, library_fingerprint, resolve_library
+from mcp_osxphotos.chunking import ChunkCostModel
+from mcp_osxphotos.export_shards import EXPORT_DB_NAME, merge_export_dbs, plan_shards, remove_database, seed_database
+from mcp_osxphotos.facets import FacetRow, aggregate, facet_row, rows_size
+from mcp_osxphotos.help_cache import HelpCache, binary_key, parse_commands
+from mcp_osxphotos.import_index import ImportIndex
+from mcp_osxphotos.jobs import Job, JobError, JobManager, current_job
+from mcp_osxphotos.lazy_tools import LazyFastMCP, lazy_tools_enabled
+from mcp_osxphotos.metrics import CommandRun, ServerMetrics
+from mcp_osxphotos.output_store import OutputStore
+from mcp_osxphotos.pagination import CursorError, CursorStore, decode_cursor
+from mcp_osxphotos.photo_index import PhotoIndex, encode_fingerprint, match_expression, parse_datetime
+from mcp_osxphotos.progress import ProgressGroup
+from mcp_osxphotos.projection import JsonArrayParser, QueryResult, project
+from mcp_osxphotos.scheduler import Access, LibraryLocks, SingleFlight
+from mcp_osxphotos.tracing import Tracer
+from mcp_osxphotos.workers import WorkerPool, osxphotos_python
 
 # Load environment variables from .env if present (e.g., OSXPHOTOS_BIN)
 load_dotenv()
 
-mcp = FastMCP("mcp-osxphotos")
+
+
+@asynccontextmanager
+async def _server_lifespan(_server: Any) -> AsyncIterator[None]:
+    """Prewarm the osxphotos help cache in the background while the server runs.
+
+    Jobs a previous server left running are reaped or reattached at startup, and running
+    jobs and warm osxphotos workers are stopped on exit. With MCP_OSXPHOTOS_METRICS_FILE set, metrics are written
+    there periodically and once more on exit.
+    """
+    task = None
+    if _env_int("MCP_OSXPHOTOS_HELP_PREWARM", 1) > 0:
+        task = asyncio.create_task(_prewarm_help())
+        # A failed prewarm only means help is fetched on demand
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    metrics_file = os.environ.get("MCP_OSXPHOTOS_METRICS_FILE")
+    metrics_task = None
+    if metrics_file:
+        metrics_file = os.path.expanduser(metrics_file)
+        metrics_task = asyncio.create_task(_write_metrics_periodically(metrics_file))
+    try:
+        await _jobs.recover()
+    except Exception as e:
+        sys.stderr.write(f"mcp-osxphotos: could not recover background jobs: {e}\n")
+    try:
+        yield
+    finally:
+        if task is not None:
+            task.cancel()
+        await _jobs.shutdown()
+        pool = _worker_pools.get(asyncio.get_running_loop())
+        if pool is not None:
+            await pool.close()
+        if metrics_task is not None:
+            metrics_task.cancel()
+            _write_metrics_file(metrics_file)
+
+
+# Per-tool and per-command counters and histograms (see metrics.py and server_metrics)
+_metrics = ServerMetrics()
+
+# Chrome trace-event spans of tool calls, written only with MCP_OSXPHOTOS_TRACE_FILE set
+_tracer = Tracer(os.environ.get("MCP_OSXPHOTOS_TRACE_FILE"))
+atexit.register(_tracer.close)
+
+
+def _instrument_tool(fn: Callable[..., Any]) -> Callable[..., Any]:
+    return _metrics.instrument(_tracer.instrument(fn))
+
+
+def _write_metrics_file(path: str) -> None:
+    try:
+        _metrics.write_prometheus(path)
+    except OSError as e:
+        sys.stderr.write(f"mcp-osxphotos: could not write metrics to {path}: {e}\n")
+
+
+async def _write_metrics_periodically(path: str) -> None:
+    """Rewrite the Prometheus text file every MCP_OSXPHOTOS_METRICS_INTERVAL seconds."""
+    interval = max(1.0, _env_float("MCP_OSXPHOTOS_METRICS_INTERVAL", 15.0))
+    while True:
+        _write_metrics_file(path)
+        await asyncio.sleep(interval)
+
+
+# With MCP_OSXPHOTOS_LAZY_TOOLS set, tools are built on first use (see lazy_tools.py)
+mcp = LazyFastMCP(
+    "mcp-osxphotos",
+    lazy=lazy_tools_enabled(),
+    lifespan=_server_lifespan,
+    tool_wrapper=_instrument_tool,
+    call_context=_tracer.call,
+)
 
 _resolved_osxphotos_path: Optional[str] = None
 
@@ -55,23 +165,726 @@ def resolve_osxphotos_path() -> str:
         "Could not find 'osxphotos'. Set OSXPHOTOS_BIN to the executable path or add it to PATH."
     )
 
-def run_osxphotos_command(command: List[str]) -> str:
-    """Helper function to run an osxphotos command and return the output."""
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, ""))
+    except ValueError:
+        return default
+
+
+def _max_concurrency() -> int:
+    """Return the global limit on concurrently running osxphotos processes.
+
+    Read from MCP_OSXPHOTOS_MAX_CONCURRENCY; defaults to the number of CPUs.
+    """
+    value = _env_int("MCP_OSXPHOTOS_MAX_CONCURRENCY", 0)
+    return value if value > 0 else os.cpu_count() or 4
+
+
+# One semaphore per event loop; asyncio primitives must not be shared across loops
+_run_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _run_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _run_semaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(_max_concurrency())
+        _run_semaphores[loop] = sem
+    return sem
+
+
+def _default_max_workers() -> int:
+    """Default fan-out for tools that run one osxphotos process per item."""
+    return os.cpu_count() or 4
+
+
+# Commands that install software or run arbitrary code are always spawned fresh
+_WORKER_EXCLUDED_COMMANDS = {"install", "uninstall", "update", "run"}
+
+# Warm worker pools, one per event loop (None when disabled or unavailable)
+_worker_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Optional[WorkerPool]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _worker_pool() -> Optional[WorkerPool]:
+    """Return the warm worker pool, or None if MCP_OSXPHOTOS_WORKERS is not set.
+
+    Workers need the Python interpreter osxphotos is installed into; when it cannot be
+    determined the pool is disabled and commands run as plain subprocesses.
+    """
+    loop = asyncio.get_running_loop()
+    if loop in _worker_pools:
+        return _worker_pools[loop]
+    pool: Optional[WorkerPool] = None
+    size = _env_int("MCP_OSXPHOTOS_WORKERS", 0)
+    if size > 0:
+        try:
+            python = osxphotos_python(resolve_osxphotos_path())
+        except FileNotFoundError:
+            python = None
+        if python:
+            pool = WorkerPool(
+                python,
+                size=size,
+                max_jobs=max(1, _env_int("MCP_OSXPHOTOS_WORKER_MAX_JOBS", 100)),
+                max_rss=max(1, _env_int("MCP_OSXPHOTOS_WORKER_MAX_RSS_MB", 1024)) * 1024 * 1024,
+            )
+    _worker_pools[loop] = pool
+    return pool
+
+
+# Callback receiving ("stdout" | "stderr", line) for each line a streamed command prints
+LineCallback = Callable[[str, str], Awaitable[None]]
+ChunkCallback = Callable[[bytes], Awaitable[None]]
+
+# Longest single output line accepted when streaming (progress bars can be long)
+_STREAM_LINE_LIMIT = 16 * 1024 * 1024
+
+
+def _log_tail_lines() -> int:
+    return max(1, _env_int("MCP_OSXPHOTOS_LOG_TAIL_LINES", 500))
+
+
+async def _pump_lines(
+    stream: asyncio.StreamReader, name: str, tail: "deque[str]", on_line: LineCallback, run: CommandRun
+) -> int:
+    """Forward each line of `stream` to `on_line`, keeping a bounded tail; returns lines dropped."""
+    dropped = 0
+    while True:
+        raw = await stream.readline()
+        if not raw:
+            return dropped
+        run.feed(name, len(raw))
+        line = raw.decode(errors="replace").rstrip("\r\n")
+        if len(tail) == tail.maxlen:
+            dropped += 1
+        tail.append(line)
+        await on_line(name, line)
+
+
+def _join_tail(tail: "deque[str]", dropped: int) -> str:
+    text = "\n".join(tail)
+    if dropped:
+        text = f"[... {dropped} earlier lines omitted ...]\n" + text
+    return text + "\n" if tail else text
+
+
+# Timeout categories; each default can be changed with MCP_OSXPHOTOS_TIMEOUT_<CATEGORY>
+# (seconds, 0 = no limit) and overridden per call with the tools' `timeout` parameter
+_TIMEOUT_DEFAULTS: Dict[str, float] = {
+    "listing": 300.0,
+    "query": 1800.0,
+    "mutation": 3600.0,
+    # Exports and imports copy files and can legitimately run for hours
+    "export": 0.0,
+}
+_EXPORT_COMMANDS = {"export", "exiftool", "import"}
+_QUERY_COMMANDS = {"compare", "dump", "exportdb", "orphans", "query"}
+_MUTATION_COMMANDS = {"add-locations", "batch-edit", "push-exif", "sync", "timewarp", "install", "uninstall", "update", "run"}
+
+# Seconds between SIGTERM and SIGKILL when stopping a command's process group
+_KILL_GRACE = 5.0
+
+
+def _timeout_category(command: List[str]) -> str:
+    subcommand = command[1] if len(command) > 1 and command[0] == "osxphotos" else ""
+    if subcommand in _EXPORT_COMMANDS:
+        return "export"
+    if subcommand in _MUTATION_COMMANDS:
+        return "mutation"
+    if subcommand in _QUERY_COMMANDS:
+        return "query"
+    return "listing"
+
+
+def _command_timeout(command: List[str], timeout: Optional[float] = None) -> Optional[float]:
+    """Seconds `command` may run, or None for no limit; `timeout` overrides the category default."""
+    if timeout is None:
+        category = _timeout_category(command)
+        timeout = _env_float(f"MCP_OSXPHOTOS_TIMEOUT_{category.upper()}", _TIMEOUT_DEFAULTS[category])
+    return timeout if timeout > 0 else None
+
+
+def _signal_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    """Send `sig` to the process group led by `proc` (its own session, see start_new_session)."""
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _reap_group(proc: asyncio.subprocess.Process) -> None:
+    """SIGKILL the group if it outlives the grace period, then reap the child."""
+    try:
+        await asyncio.wait_for(proc.wait(), _KILL_GRACE)
+    except asyncio.TimeoutError:
+        _signal_group(proc, signal.SIGKILL)
+        await proc.wait()
+    # Grandchildren (e.g. exiftool) may ignore SIGTERM after their parent died
+    _signal_group(proc, signal.SIGKILL)
+
+
+def _terminate_group(proc: asyncio.subprocess.Process) -> "asyncio.Task[None]":
+    """Stop `proc` and everything it started; returns the task that finishes the job.
+
+    SIGTERM goes out synchronously because this also runs while the request is being
+    cancelled, when the caller cannot await anything; the escalation to SIGKILL and the
+    reaping happen in a separate task.
+    """
+    _signal_group(proc, signal.SIGTERM)
+    return asyncio.get_running_loop().create_task(_reap_group(proc))
+
+
+def _text_tail(data: bytes) -> str:
+    """Last MCP_OSXPHOTOS_LOG_TAIL_LINES lines of `data`, decoded."""
+    lines = data.decode(errors="replace").splitlines()
+    tail: "deque[str]" = deque(lines, maxlen=_log_tail_lines())
+    return _join_tail(tail, len(lines) - len(tail))
+
+
+def _timeout_result(command: List[str], limit: float, elapsed: float, stdout_tail: str, stderr_tail: str) -> str:
+    """Partial result of a command stopped at its time limit.
+
+    Starts with "Error:" like every failed command; the JSON after the first line keeps
+    what the command printed before it was stopped.
+    """
+    partial = {
+        "error": "timeout",
+        "command": command,
+        "timeout_seconds": limit,
+        "elapsed_seconds": round(elapsed, 3),
+        "stdout_tail": stdout_tail,
+        "stderr_tail": stderr_tail,
+    }
+    return f"Error: osxphotos timed out after {limit:g}s and was terminated\n{json.dumps(partial, indent=2)}"
+
+
+async def _read_all(stream: asyncio.StreamReader, name: str, buf: bytearray, run: CommandRun) -> None:
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return
+        run.feed(name, len(chunk))
+        buf.extend(chunk)
+
+
+async def _feed_all(stream: asyncio.StreamReader, name: str, on_chunk: ChunkCallback, run: CommandRun) -> int:
+    """Hand `stream` over to `on_chunk` as it is read; returns 0 lines dropped, like `_pump_lines`."""
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return 0
+        run.feed(name, len(chunk))
+        await on_chunk(chunk)
+
+
+# osxphotos subcommands that read UUIDs from a file (--uuid-from-file) as well as from --uuid
+_UUID_FILE_COMMANDS = {"add-locations", "batch-edit", "export", "push-exif", "query", "sync", "timewarp"}
+
+
+def _uuid_file_threshold() -> int:
+    """Number of --uuid values above which they are passed in a file; 0 never does."""
+    return _env_int("MCP_OSXPHOTOS_UUID_FILE_THRESHOLD", 500)
+
+
+def _move_uuids_to_file(command: List[str]) -> Tuple[List[str], Optional[str]]:
+    """Pass a long --uuid list of `command` with --uuid-from-file: (argv to run, file to delete after).
+
+    Tens of thousands of ``--uuid X`` pairs can exceed the OS argument size limit and
+    are slow for osxphotos to parse. The UUIDs go to a temporary file instead, together
+    with those of a --uuid-from-file the caller gave (osxphotos takes only one). The
+    argv is returned unchanged, with no file, below the threshold or when that file
+    cannot be read.
+    """
+    limit = _uuid_file_threshold()
+    if limit <= 0 or len(command) < 2 or command[1] not in _UUID_FILE_COMMANDS:
+        return command, None
+    uuids: List[str] = []
+    rest: List[str] = []
+    given: Optional[str] = None
+    i = 0
+    while i < len(command):
+        token = command[i]
+        if token in ("--uuid", "--uuid-from-file") and i + 1 < len(command):
+            if token == "--uuid":
+                uuids.append(command[i + 1])
+            else:
+                given = command[i + 1]
+            i += 2
+            continue
+        rest.append(token)
+        i += 1
+    if len(uuids) <= limit:
+        return command, None
+    if given is not None:
+        try:
+            with open(os.path.expanduser(given), encoding="utf-8") as fh:
+                uuids.extend(line.strip() for line in fh if line.strip() and not line.startswith("#"))
+        except OSError:
+            return command, None
+    fd, path = tempfile.mkstemp(prefix="mcp-osxphotos-uuids-", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(uuids) + "\n")
+    return [*rest, "--uuid-from-file", path], path
+
+
+async def run_osxphotos_command(
+    command: List[str],
+    on_line: Optional[LineCallback] = None,
+    timeout: Optional[float] = None,
+    on_stdout: Optional[ChunkCallback] = None,
+) -> str:
+    """Helper function to run an osxphotos command and return the output.
+
+    The process is spawned with asyncio so a long-running command does not block
+    the event loop; at most `_max_concurrency()` commands run at the same time.
+    When MCP_OSXPHOTOS_WORKERS is set, commands run on warm worker processes instead
+    and fall back to a fresh subprocess if no worker is available. Commands that modify
+    a library drop that library's cached listings once they finish.
+
+    With `on_line`, stdout and stderr are read line by line as the child writes them and
+    only the last MCP_OSXPHOTOS_LOG_TAIL_LINES lines of each are kept and returned.
+    With `on_stdout`, stdout is handed over in chunks as it arrives instead (a worker's
+    output in one piece) and is not part of the returned output.
+
+    Each command runs in its own process group. When it exceeds its time limit (see
+    `_command_timeout`) the whole group, including exiftool children, is terminated and
+    an "Error:" result with the stdout/stderr tails is returned; when the request is
+    cancelled the group is terminated and the cancellation propagates.
+
+    Commands are scheduled per library (see scheduler.py): readers share a library,
+    writers hold it exclusively. Time spent waiting for the library does not count
+    against the time limit.
+
+    Inside a background job (see jobs.py) commands always run as a subprocess: the job
+    records its pid and receives every output line for its log and progress.
+
+    Identical read-only commands issued while one of them is running share its process
+    and result instead of starting their own (see `_coalescable`).
+
+    Every run is recorded in `_metrics`: its duration from spawn (lock and concurrency
+    waits excluded), time to the first byte of output, bytes written and how it failed.
+    """
+    limit = _command_timeout(command, timeout)
+    if on_line is None and on_stdout is None and current_job.get() is None and _coalescable(command):
+        return await _single_flight.run((tuple(command), limit), lambda: _execute_command(command, None, limit))
+    return await _execute_command(command, on_line, limit, on_stdout)
+
+
+async def _execute_command(
+    command: List[str], on_line: Optional[LineCallback], limit: Optional[float],
+    on_stdout: Optional[ChunkCallback] = None,
+) -> str:
+    run = CommandRun()
+    name = command[1] if len(command) > 1 and command[0] == "osxphotos" else (command[:1] or ["?"])[0]
+    try:
+        with _tracer.span(f"osxphotos {name}", "command", argv=command):
+            return await _spawn_command(command, on_line, limit, run, on_stdout)
+    except asyncio.CancelledError:
+        run.error = "cancelled"
+        raise
+    except BaseException:
+        run.error = "exception"
+        raise
+    finally:
+        _metrics.record_command(name, run)
+
+
+async def _spawn_command(
+    command: List[str], on_line: Optional[LineCallback], limit: Optional[float], run: CommandRun,
+    on_stdout: Optional[ChunkCallback] = None,
+) -> str:
+    started = time.monotonic()
+    job = current_job.get()
+    uuid_file: Optional[str] = None
     try:
         # Replace the binary name with the resolved absolute path when needed
         bin_path = resolve_osxphotos_path()
-        cmd = list(command)
+        cmd, uuid_file = _move_uuids_to_file(list(command))
         if cmd and cmd[0] == "osxphotos":
             cmd[0] = bin_path
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return result.stdout
+        queued = _tracer.now()
+        async with _library_locks.hold(_library_access(command)), _run_semaphore():
+            _tracer.complete("queue_wait", queued, _tracer.now(), "scheduler")
+            outcome = None
+            if (
+                on_line is None
+                and job is None
+                and command
+                and command[0] == "osxphotos"
+                and command[1:2]
+                and command[1] not in _WORKER_EXCLUDED_COMMANDS
+            ):
+                pool = _worker_pool()
+                if pool is not None:
+                    run.start("worker")
+                    try:
+                        with _tracer.span("worker_run", "process"):
+                            outcome = await asyncio.wait_for(pool.run(cmd[1:]), limit)
+                    except asyncio.TimeoutError:
+                        # The pool killed the worker's process group; its output is lost
+                        assert limit is not None
+                        run.error = "timeout"
+                        return _timeout_result(command, limit, time.monotonic() - started, "", "")
+                    if outcome is not None:
+                        # Workers return the whole output at once: no time to first byte
+                        stdout = outcome[1].encode()
+                        run.bytes["stdout"] = len(stdout)
+                        run.bytes["stderr"] = len(outcome[2].encode())
+                        if on_stdout is not None:
+                            await on_stdout(stdout)
+                            outcome = (outcome[0], "", outcome[2])
+            if outcome is None:
+                run.start("subprocess")
+                with _tracer.span("spawn", "process"):
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd,
+                        stdin=asyncio.subprocess.DEVNULL,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                        limit=_STREAM_LINE_LIMIT,
+                        start_new_session=True,
+                    )
+                spawned = _tracer.now()
+                assert proc.stdout is not None and proc.stderr is not None
+                # A job gets every line; without a caller callback the full output is kept
+                keep = None if job is not None and on_line is None else _log_tail_lines()
+                if job is not None:
+                    job.attach(proc.pid)
+                    on_line = _job_line_callback(job, on_line)
+                out_buf, err_buf = bytearray(), bytearray()
+                out_tail: "deque[str]" = deque(maxlen=keep)
+                err_tail: "deque[str]" = deque(maxlen=keep)
+                if on_stdout is not None:
+                    stdout_reader = _feed_all(proc.stdout, "stdout", on_stdout, run)
+                elif on_line is None:
+                    stdout_reader = _read_all(proc.stdout, "stdout", out_buf, run)
+                else:
+                    stdout_reader = _pump_lines(proc.stdout, "stdout", out_tail, on_line, run)
+                if on_line is None:
+                    reading = asyncio.gather(stdout_reader, _read_all(proc.stderr, "stderr", err_buf, run))
+                else:
+                    reading = asyncio.gather(stdout_reader, _pump_lines(proc.stderr, "stderr", err_tail, on_line, run))
+                try:
+                    dropped = await asyncio.wait_for(reading, limit)
+                    returncode = await proc.wait()
+                except asyncio.TimeoutError:
+                    run.error = "timeout"
+                    await _terminate_group(proc)
+                    assert limit is not None
+                    if on_line is None:
+                        return _timeout_result(
+                            command, limit, time.monotonic() - started, _text_tail(out_buf), _text_tail(err_buf)
+                        )
+                    return _timeout_result(
+                        command, limit, time.monotonic() - started, _join_tail(out_tail, 0), _join_tail(err_tail, 0)
+                    )
+                except BaseException:
+                    # Request cancelled (or the server is shutting down): stop the child too
+                    reading.cancel()
+                    if proc.returncode is None:
+                        _terminate_group(proc)
+                    raise
+                finally:
+                    if job is not None:
+                        job.detach(proc.pid, proc.returncode)
+                    _tracer.complete(
+                        "child", spawned, _tracer.now(), "process", pid=proc.pid, returncode=proc.returncode,
+                        stdout_bytes=run.bytes["stdout"], stderr_bytes=run.bytes["stderr"],
+                        first_byte_ms=None if run.first_byte is None else round(run.first_byte * 1000, 3),
+                    )
+                if on_line is None:
+                    with _tracer.span("decode_output", "output", bytes=len(out_buf)):
+                        outcome = (returncode, out_buf.decode(errors="replace"), err_buf.decode(errors="replace"))
+                else:
+                    out_dropped, err_dropped = dropped
+                    outcome = (returncode, _join_tail(out_tail, out_dropped), _join_tail(err_tail, err_dropped))
     except FileNotFoundError as e:
+        run.error = "not_found"
         return (
             "Error: osxphotos executable not found. "
             "Set OSXPHOTOS_BIN or update PATH. Details: " + str(e)
         )
-    except subprocess.CalledProcessError as e:
-        return f"Error: {e.stderr}"
+    finally:
+        if uuid_file is not None:
+            try:
+                os.remove(uuid_file)
+            except OSError:
+                pass
+        if _is_mutating(command):
+            library = resolve_library(_library_from_argv(command))
+            _result_cache.invalidate_library(library)
+            # Imports only add photos, which the next incremental refresh picks up
+            if command[1] != "import":
+                _photo_index.invalidate(library)
+    returncode, out, err = outcome
+    if returncode != 0:
+        run.error = "exit"
+        return f"Error: {err}"
+    return out
+
+
+def _job_line_callback(job: Job, on_line: Optional[LineCallback]) -> LineCallback:
+    async def job_line(stream: str, line: str) -> None:
+        job.add_line(stream, line)
+        if on_line is not None:
+            await on_line(stream, line)
+    return job_line
+
+
+def _request_context() -> Optional[Context]:
+    """Return the MCP request context when called while serving a request, else None.
+
+    Background jobs outlive the request that started them, so they have no context.
+    """
+    if current_job.get() is not None:
+        return None
+    ctx = mcp.get_context()
+    try:
+        ctx.request_context
+    except (LookupError, ValueError):
+        return None
+    return ctx
+
+
+# Minimum seconds between progress notifications for one request
+_PROGRESS_INTERVAL = 0.5
+
+
+async def run_with_progress(
+    command: List[str], timeout: Optional[float] = None, group: Optional[ProgressGroup] = None
+) -> str:
+    """Run a long command, streaming its output into MCP progress notifications.
+
+    Progress (completed/total, files per second, ETA) is parsed from the output with
+    `ProgressTracker` and reported to the client if the request carried a progress token.
+    Commands that share a `group` (concurrent shards, consecutive chunks) report their
+    combined progress.
+    """
+    ctx = _request_context()
+    group = group if group is not None else ProgressGroup()
+    tracker = group.tracker()
+
+    async def report() -> None:
+        if ctx is None:
+            return
+        try:
+            await ctx.report_progress(group.completed, group.total, group.message())
+        except Exception:
+            # A client that went away must not abort the export itself
+            pass
+
+    async def on_line(_stream: str, line: str) -> None:
+        if tracker.feed(line) and group.due(_PROGRESS_INTERVAL):
+            await report()
+
+    output = await run_osxphotos_command(command, on_line=on_line, timeout=timeout)
+    await report()
+    return output
+
+
+# osxphotos subcommands that modify the Photos library
+_MUTATING_COMMANDS = {"add-locations", "batch-edit", "import", "push-exif", "sync", "timewarp"}
+
+# Flags that make an otherwise read-only command add photos to albums
+_MUTATING_FLAGS = {"--add-to-album", "--add-exported-to-album", "--add-skipped-to-album", "--add-missing-to-album"}
+
+# Listing commands whose output only changes when the library does
+_CACHEABLE_COMMANDS = {"albums", "info", "keywords", "labels", "list", "persons", "places"}
+
+_result_cache = ResultCache(
+    ttl=_env_float("MCP_OSXPHOTOS_CACHE_TTL", 300.0),
+    max_entries=_env_int("MCP_OSXPHOTOS_CACHE_MAX_ENTRIES", 256),
+    max_bytes=_env_int("MCP_OSXPHOTOS_CACHE_MAX_MB", 64) * 1024 * 1024,
+)
+
+
+_jobs = JobManager(
+    os.path.expanduser(os.environ.get("MCP_OSXPHOTOS_JOBS_DB") or os.path.join(cache_directory(), "jobs.sqlite3")),
+    log_lines=max(1, _env_int("MCP_OSXPHOTOS_JOB_LOG_LINES", 1000)),
+    history=max(1, _env_int("MCP_OSXPHOTOS_JOB_HISTORY", 100)),
+    orphans=os.environ.get("MCP_OSXPHOTOS_JOB_ORPHANS", "reap").strip().lower(),
+    kill_grace=_KILL_GRACE,
+)
+atexit.register(_jobs.close)
+
+
+def _library_from_argv(command: List[str]) -> Optional[str]:
+    for i, token in enumerate(command[:-1]):
+        if token == "--library":
+            return command[i + 1]
+    return None
+
+
+def _is_mutating(command: List[str]) -> bool:
+    if len(command) < 2:
+        return False
+    return command[1] in _MUTATING_COMMANDS or any(token in _MUTATING_FLAGS for token in command)
+
+
+# osxphotos subcommands that never open a Photos library
+_LIBRARY_FREE_COMMANDS = {"about", "docs", "help", "install", "list", "run", "tutorial", "uninstall", "update", "uuid", "version"}
+
+# Top-level options that print and exit before any subcommand opens a library
+_LIBRARY_FREE_OPTIONS = {"--version", "-v", "--help", "-h"}
+
+_library_locks = LibraryLocks()
+
+_single_flight = SingleFlight()
+
+# Looked up at call time so tests can swap the instances
+_metrics.add_cache("result", lambda: (_result_cache.hits, _result_cache.misses))
+_metrics.add_cache("single_flight", lambda: (_single_flight.coalesced, _single_flight.runs))
+
+
+def _coalescable(command: List[str]) -> bool:
+    """Whether concurrent duplicates of `command` may share one run.
+
+    Only commands that neither modify a library nor write files qualify: listings and
+    queries, not exports, imports or installs. MCP_OSXPHOTOS_COALESCE=0 turns it off.
+    """
+    if len(command) < 2 or command[0] != "osxphotos" or _env_int("MCP_OSXPHOTOS_COALESCE", 1) <= 0:
+        return False
+    return (
+        _timeout_category(command) in ("listing", "query")
+        and command[1] not in _WORKER_EXCLUDED_COMMANDS
+        and not _is_mutating(command)
+    )
+
+
+def _library_access(command: List[str]) -> List[Access]:
+    """Libraries `command` opens, each with whether it writes to it."""
+    if (
+        len(command) < 2
+        or command[0] != "osxphotos"
+        or command[1] in _LIBRARY_FREE_COMMANDS
+        or command[1] in _LIBRARY_FREE_OPTIONS
+        or "--help" in command
+    ):
+        return []
+    write = _is_mutating(command)
+    if command[1] == "compare":
+        return [(resolve_library(path), write) for path in command[2:4]]
+    return [(resolve_library(_library_from_argv(command)), write)]
+
+
+async def run_cached_osxphotos_command(command: List[str], timeout: Optional[float] = None) -> str:
+    """Run a listing command, serving repeated calls from the result cache.
+
+    Cached output is reused while the library fingerprint is unchanged and the entry
+    has not expired. Errors are never cached.
+    """
+    if len(command) < 2 or command[1] not in _CACHEABLE_COMMANDS:
+        return await run_osxphotos_command(command, timeout=timeout)
+    library = None if command[1] == "list" else resolve_library(_library_from_argv(command))
+    fingerprint = library_fingerprint(library) if library else None
+    key = tuple(command)
+    looked_up = _tracer.now()
+    cached = _result_cache.get(key, fingerprint)
+    _tracer.complete("result_cache", looked_up, _tracer.now(), "cache", hit=cached is not None)
+    if cached is not None:
+        return cached
+    output = await run_osxphotos_command(command, timeout=timeout)
+    if not output.startswith("Error:"):
+        _result_cache.put(key, library, fingerprint, output)
+    return output
+
+
+# Large outputs are stored on disk and read back through resources (see output_store.py)
+_OUTPUT_URI = "osxphotos-output://"
+
+_output_store = OutputStore(
+    os.path.expanduser(os.environ.get("MCP_OSXPHOTOS_OUTPUT_STORE") or os.path.join(cache_directory(), "outputs")),
+    max_bytes=max(1, _env_int("MCP_OSXPHOTOS_OUTPUT_STORE_MB", 512)) * 1024 * 1024,
+)
+atexit.register(_output_store.close)
+
+# Lines and characters of a stored output shown in the tool's summary
+_PREVIEW_LINES = 20
+_PREVIEW_CHARS = 2000
+
+
+def _spill_threshold() -> int:
+    """Bytes above which tool output is stored instead of returned; 0 turns storing off."""
+    return _env_int("MCP_OSXPHOTOS_SPILL_BYTES", 1024 * 1024)
+
+
+async def _spill_output(tool: str, output: str) -> str:
+    """Return `output`, or when it is larger than the threshold, store it and return a summary."""
+    limit = _spill_threshold()
+    # A character takes at most 4 bytes in UTF-8
+    if limit <= 0 or output.startswith("Error:") or len(output) * 4 <= limit:
+        return output
+    data = output.encode()
+    if len(data) <= limit:
+        return output
+    with _tracer.span("store_output", "output", bytes=len(data)):
+        stored = await asyncio.to_thread(_output_store.put, data)
+    uri = f"{_OUTPUT_URI}{stored.digest}"
+    preview = "\n".join(output[:_PREVIEW_CHARS].splitlines()[:_PREVIEW_LINES])
+    return (
+        f"Output of {tool} is {stored.size} bytes ({stored.lines} lines), too large to return inline; "
+        f"stored as {uri}.\n"
+        "Read it in ranges with resources/read:\n"
+        f"- {uri}/lines/{{start}}/{{count}}: `count` lines from line `start` (0-based)\n"
+        f"- {uri}/bytes/{{offset}}/{{length}}: `length` bytes from byte `offset`\n"
+        f"Beginning of the output:\n{preview}\n"
+    )
+
+
+def _spills_large_output(fn: Callable[..., Awaitable[str]]) -> Callable[..., Awaitable[str]]:
+    """Store outputs of tool `fn` over MCP_OSXPHOTOS_SPILL_BYTES and return a summary with their URI."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> str:
+        return await _spill_output(fn.__name__, await fn(*args, **kwargs))
+    return wrapper
+
+
+def _unknown_output(digest: str) -> ValueError:
+    return ValueError(f"Unknown output {digest}: it was never stored or has been evicted; run the tool again")
+
+
+@mcp.resource(_OUTPUT_URI + "{digest}", mime_type="application/json")
+async def stored_output_info(digest: str) -> str:
+    """Size and line count of a stored tool output."""
+    stored = await asyncio.to_thread(_output_store.get, digest)
+    if stored is None:
+        raise _unknown_output(digest)
+    return json.dumps({"uri": f"{_OUTPUT_URI}{digest}", "bytes": stored.size, "lines": stored.lines})
+
+
+@mcp.resource(_OUTPUT_URI + "{digest}/bytes/{offset}/{length}")
+async def stored_output_bytes(digest: str, offset: int, length: int) -> str:
+    """`length` bytes of a stored tool output from byte `offset`.
+
+    Characters cut by the range boundaries are replaced with U+FFFD.
+    """
+    try:
+        data = await asyncio.to_thread(_output_store.read, digest, offset, length)
+    except KeyError:
+        raise _unknown_output(digest) from None
+    return data.decode(errors="replace")
+
+
+@mcp.resource(_OUTPUT_URI + "{digest}/lines/{start}/{count}")
+async def stored_output_lines(digest: str, start: int, count: int) -> str:
+    """`count` lines of a stored tool output from line `start` (0-based)."""
+    try:
+        data = await asyncio.to_thread(_output_store.read_lines, digest, start, count)
+    except KeyError:
+        raise _unknown_output(digest) from None
+    return data.decode(errors="replace")
 
 
 # ----- Internal helpers for building CLI args -----
@@ -182,8 +995,293 @@ def _append_multi_arg_group(
         cmd.append(_flag(name))
         cmd.extend([str(obj[k]) for k in keys])
 
+# ----- Declarative option specs -----
+#
+# Each osxphotos-backed tool registers its option spec through the @osxphotos_command
+# decorator. The ArgvBuilder is compiled once, on first use, from the tool's signature:
+# every parameter gets a kind (flag, value, repeated value, pair/group object list,
+# location pair or positional) and a precomputed emitter, so building argv per call is
+# a single pass over the specs with no reflection or string formatting of flag names.
+
+# Tool parameters that configure the server itself and never map to osxphotos flags
+_SERVER_PARAMS = frozenset({
+    "max_workers", "chunk_size", "page_size", "cursor", "timeout", "skip_imported", "shards", "fields", "columnar",
+})
+
+OPTION_FLAG = "flag"
+OPTION_VALUE = "value"
+OPTION_MULTI = "multi"
+OPTION_PAIRS = "pairs"
+OPTION_GROUP = "group"
+OPTION_LOCATION = "location"
+OPTION_POSITIONAL = "positional"
+
+Emitter = Callable[[List[str], Any], None]
+
+
+class OptionSpec(NamedTuple):
+    """How one tool parameter maps onto the osxphotos command line."""
+
+    name: str
+    flag: Optional[str]
+    kind: str
+    arity: int = 1
+
+
+def _option_kind(name: str, annotation: Any) -> Tuple[str, int]:
+    """Derive (kind, arity) for a parameter from its type annotation."""
+    if get_origin(annotation) is Union:
+        annotation = next(a for a in get_args(annotation) if a is not type(None))
+    if annotation is bool:
+        return OPTION_FLAG, 0
+    if get_origin(annotation) is list:
+        inner = get_args(annotation)[0] if get_args(annotation) else Any
+        if get_origin(inner) is dict:
+            if name == "sidecar_template":
+                return OPTION_GROUP, 3
+            return OPTION_PAIRS, 2
+        if name == "location" and inner is float:
+            return OPTION_LOCATION, 2
+        return OPTION_MULTI, 1
+    return OPTION_VALUE, 1
+
+
+def _compile_emitter(spec: OptionSpec) -> Emitter:
+    flag, name = spec.flag, spec.name
+    if spec.kind == OPTION_FLAG:
+        return lambda cmd, _value: cmd.append(flag)  # type: ignore[arg-type]
+    if spec.kind == OPTION_VALUE:
+        return lambda cmd, value: cmd.extend((flag, str(value)))  # type: ignore[arg-type]
+    if spec.kind == OPTION_MULTI:
+        def emit_multi(cmd: List[str], value: Any) -> None:
+            for item in value:
+                cmd.append(flag)  # type: ignore[arg-type]
+                cmd.append(str(item))
+        return emit_multi
+    if spec.kind == OPTION_PAIRS:
+        return lambda cmd, value: _append_multi_arg_pairs(cmd, name, value)
+    if spec.kind == OPTION_GROUP:
+        return lambda cmd, value: _append_multi_arg_group(cmd, name, value, spec.arity)
+    if spec.kind == OPTION_LOCATION:
+        def emit_location(cmd: List[str], value: Any) -> None:
+            _append_location_pair(cmd, name, value)
+        return emit_location
+    if spec.kind == OPTION_POSITIONAL:
+        def emit_positional(cmd: List[str], value: Any) -> None:
+            if isinstance(value, list):
+                cmd.extend(str(item) for item in value)
+            else:
+                cmd.append(str(value))
+        return emit_positional
+    raise ValueError(f"Unknown option kind {spec.kind!r} for {name!r}")
+
+
+class ArgvBuilder:
+    """Precompiled argv builder for one osxphotos subcommand."""
+
+    def __init__(self, command: Tuple[str, ...], specs: Tuple[OptionSpec, ...]) -> None:
+        self.command = command
+        self.specs = specs
+        # Positionals go first, in declaration order, then options in signature order
+        ordered = [s for s in specs if s.kind == OPTION_POSITIONAL] + [s for s in specs if s.kind != OPTION_POSITIONAL]
+        self._emitters: Tuple[Tuple[str, Emitter], ...] = tuple((s.name, _compile_emitter(s)) for s in ordered)
+        self._prefix = ["osxphotos", *command]
+
+    def build(self, values: Dict[str, Any]) -> List[str]:
+        """Return the osxphotos argv for a call; falsy values are omitted."""
+        cmd = list(self._prefix)
+        get = values.get
+        for name, emit in self._emitters:
+            value = get(name)
+            if value:
+                emit(cmd, value)
+        return cmd
+
+
+# Tool name -> registration from @osxphotos_command; compiled into _ARGV_BUILDERS on first
+# use so importing the server (and so startup) does not pay for reading every signature
+_ARGV_REGISTRY: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], Dict[str, str]]] = {}
+_ARGV_BUILDERS: Dict[str, ArgvBuilder] = {}
+
+
+def osxphotos_command(
+    *command: str,
+    positional: Tuple[str, ...] = (),
+    skip: Tuple[str, ...] = (),
+    flags: Optional[Dict[str, str]] = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Register the option spec for a tool that runs `osxphotos <command...>`.
+
+    positional: parameters passed as positional arguments (lists are expanded).
+    skip: parameters the tool handles itself.
+    flags: explicit flag spellings for parameters whose flag is not `--name-with-dashes`.
+    """
+    def register(fn: Callable[..., Any]) -> Callable[..., Any]:
+        _ARGV_REGISTRY[fn.__name__] = (fn, tuple(command), positional, skip, flags or {})
+        return fn
+
+    return register
+
+
+def _argv_builder(tool: str) -> ArgvBuilder:
+    """Return the compiled builder for `tool`, compiling its option spec on first use."""
+    builder = _ARGV_BUILDERS.get(tool)
+    if builder is not None:
+        return builder
+    fn, command, positional, skip, overrides = _ARGV_REGISTRY[tool]
+    hints = get_type_hints(fn)
+    specs: List[OptionSpec] = []
+    for name in inspect.signature(fn).parameters:
+        if name in _SERVER_PARAMS or name in skip:
+            continue
+        if name in positional:
+            specs.append(OptionSpec(name, None, OPTION_POSITIONAL))
+            continue
+        kind, arity = _option_kind(name, hints.get(name, Any))
+        specs.append(OptionSpec(name, overrides.get(name) or _flag(name), kind, arity))
+    builder = _ARGV_BUILDERS[tool] = ArgvBuilder(command, tuple(specs))
+    return builder
+
+
+def build_argv(tool: str, values: Dict[str, Any]) -> List[str]:
+    """Build the osxphotos argv for `tool` from its parameter values.
+
+    Raises ValueError, before anything is spawned, when an option is not accepted by
+    the installed osxphotos (known from its cached help).
+    """
+    with _tracer.span("build_argv", tool=tool):
+        builder = _argv_builder(tool)
+        _check_options(builder, values)
+        return builder.build(values)
+
+
+# ----- osxphotos help cache -----
+# Help text is cached on disk per osxphotos binary and version (see help_cache.py) and
+# prewarmed in the background at startup. The parsed options let build_argv reject
+# flags the installed osxphotos does not know without starting it.
+
+_help_cache = HelpCache(os.path.join(cache_directory(), "help"))
+
+
+# (help cache, resolved osxphotos path, namespace) last looked up; None namespace is a miss
+_help_state: Optional[Tuple[HelpCache, Optional[str], Optional[str]]] = None
+
+
+def _help_namespace_cached() -> Optional[str]:
+    """Cache namespace of the current osxphotos binary, if its version is already known.
+
+    Every argv build asks, so the answer (a miss too) is kept in memory until the
+    resolved path changes or `_refresh_help_namespace` runs.
+    """
+    state = _help_state
+    if state is not None and state[0] is _help_cache and state[1] == _resolved_osxphotos_path:
+        return state[2]
+    return _refresh_help_namespace()
+
+
+def _refresh_help_namespace() -> Optional[str]:
+    """Look the binary and its version up again, e.g. after osxphotos was upgraded in place."""
+    global _help_state
+    cache, namespace = _help_cache, None
+    try:
+        key = binary_key(resolve_osxphotos_path())
+    except FileNotFoundError:
+        key = None
+    version = cache.version(key) if key is not None else None
+    if key is not None and version is not None:
+        namespace = HelpCache.namespace(key, version)
+    _help_state = (cache, _resolved_osxphotos_path, namespace)
+    return namespace
+
+
+async def _help_namespace() -> Optional[str]:
+    """Like _help_namespace_cached, checking the binary again and running `osxphotos --version` when it is new."""
+    namespace = _refresh_help_namespace()
+    if namespace is not None:
+        return namespace
+    try:
+        key = binary_key(resolve_osxphotos_path())
+    except FileNotFoundError:
+        return None
+    if key is None:
+        return None
+    output = await run_osxphotos_command(["osxphotos", "--version"])
+    if output.startswith("Error:") or not output.strip():
+        return None
+    _help_cache.set_version(key, output.strip())
+    return _refresh_help_namespace()
+
+
+async def _cached_help(kind: str, command: Optional[str], argv: List[str], timeout: Optional[float] = None) -> str:
+    """Return help text of `kind` for `command`, running `argv` only on a cache miss."""
+    namespace = await _help_namespace()
+    if namespace is not None:
+        text = _help_cache.get(namespace, kind, command)
+        if text is not None:
+            return text
+    output = await run_osxphotos_command(argv, timeout=timeout)
+    if namespace is not None and not output.startswith("Error:"):
+        _help_cache.put(namespace, kind, command, output)
+    return output
+
+
+def _known_commands() -> Optional[List[str]]:
+    namespace = _help_namespace_cached()
+    text = _help_cache.get(namespace, "options", None) if namespace else None
+    if not text:
+        return None
+    return parse_commands(text) or None
+
+
+def _check_options(builder: "ArgvBuilder", values: Dict[str, Any]) -> None:
+    namespace = _help_namespace_cached()
+    known = _help_cache.options(namespace, builder.command[0]) if namespace else None
+    if known is None:
+        return
+    unknown = [
+        spec.flag for spec in builder.specs
+        if spec.flag is not None and spec.flag not in known and values.get(spec.name)
+    ]
+    if unknown:
+        hints = []
+        for flag in unknown:
+            close = difflib.get_close_matches(flag, sorted(known), n=1)
+            hints.append(f"{flag} (did you mean {close[0]}?)" if close else flag)
+        raise ValueError(
+            f"osxphotos {' '.join(builder.command)} does not accept: {', '.join(hints)}. "
+            "The installed osxphotos may be older than this server expects."
+        )
+
+
+async def _prewarm_help() -> None:
+    """Fill the help cache for every subcommand; one process at a time."""
+    root = await _cached_help("options", None, ["osxphotos", "--help"])
+    if root.startswith("Error:"):
+        return
+    await _cached_help("help", None, ["osxphotos", "help"])
+    for command in parse_commands(root):
+        await _cached_help("options", command, ["osxphotos", command, "--help"])
+        await _cached_help("help", command, ["osxphotos", "help", command])
+
+
+# Learns push-exif startup versus per-UUID cost across batch_edit_by_uuid calls
+_push_exif_cost_model = ChunkCostModel()
+
+
+def _result_for_uuid(output: str, uuid: str, chunk_len: int) -> str:
+    """Extract the part of a chunked invocation's output that concerns one UUID.
+
+    Falls back to the whole output (errors, summaries) when no line mentions the UUID.
+    """
+    if chunk_len == 1 or output.startswith("Error:"):
+        return output
+    lines = [line for line in output.splitlines() if uuid in line]
+    return "\n".join(lines) if lines else output
+
+
 @mcp.tool()
-def batch_edit_by_uuid(
+@osxphotos_command("push-exif", positional=("metadata",), skip=("uuid",))
+async def batch_edit_by_uuid(
     uuid: List[str],
     metadata: str = "all",
     push_edited: bool = True,
@@ -294,12 +1392,19 @@ def batch_edit_by_uuid(
     exif: Optional[Annotated[List[Dict[str, str]], "Each item must include keys: tag, value. Example: [{tag: 'Make', value: 'Apple'}]"]] = None,
     query_eval: Optional[List[str]] = None,
     query_function: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """
     Simulate batch_edit by applying metadata edits to each photo UUID using push-exif.
 
-    This invokes `osxphotos push-exif <metadata> --push-edited --uuid <UUID>` for each UUID provided,
-    adding any supplied push-exif filtering and metadata options.
+    This invokes `osxphotos push-exif <metadata> --push-edited --uuid <UUID> [--uuid <UUID> ...]`,
+    adding any supplied push-exif filtering and metadata options. UUIDs are packed into chunks so
+    each process amortizes its startup cost; the chunk size is tuned from measured startup versus
+    per-item cost unless `chunk_size` is given (1 runs one process per UUID). Up to `max_workers`
+    invocations (default: number of CPUs) run concurrently. Results keep the order of `uuid`;
+    `elapsed_seconds` is the wall time of the invocation divided by the number of UUIDs it handled.
 
     Notes:
     - Strong typing for multi-arg options: provide `regex` and `exif` as list-of-objects only.
@@ -307,31 +1412,56 @@ def batch_edit_by_uuid(
       - exif:  [{tag: EXIF_TAG, value: VALUE}]
     - Intended as a workaround for Photos selection-only batch-edit.
     """
-    results = []
-    for u in uuid:
-        cmd = ["osxphotos", "push-exif", metadata, "--push-edited", "--uuid", u]
-        # Build flags from function parameters (excluding locals we shouldn't process)
-        for key, value in locals().items():
-            if key in {"cmd", "uuid", "u", "results"}:
-                continue
-            if value:
-                if key in {"regex", "exif"}:
-                    _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-                elif isinstance(value, bool):
-                    cmd.append(_flag(key))
-                elif isinstance(value, list):
-                    for item in value:
-                        cmd.extend([_flag(key), str(item)])
-                else:
-                    cmd.extend([_flag(key), str(value)])
-        result = run_osxphotos_command(cmd)
-        results.append({"uuid": u, "result": result})
+    # Arguments shared by every invocation; uuid varies per call
+    base_cmd = build_argv("batch_edit_by_uuid", locals())
+
+    workers = max_workers if max_workers and max_workers > 0 else _default_max_workers()
+    # Workers beyond the global process limit would only queue inside run_osxphotos_command
+    workers = min(workers, _max_concurrency())
+    results: List[Dict[str, Any]] = [{} for _ in uuid]
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(uuid):
+            if chunk_size and chunk_size > 0:
+                size = chunk_size
+            else:
+                size = _push_exif_cost_model.chunk_size(len(uuid) - next_index, workers)
+            first = next_index
+            chunk = uuid[first:first + size]
+            next_index += len(chunk)
+            cmd = list(base_cmd)
+            for u in chunk:
+                cmd.extend(["--uuid", u])
+            start = time.perf_counter()
+            result = await run_osxphotos_command(cmd, timeout=timeout)
+            elapsed = time.perf_counter() - start
+            if not result.startswith("Error:"):
+                # Failed runs exit early and would skew the cost estimate
+                _push_exif_cost_model.record(len(chunk), elapsed)
+            for offset, u in enumerate(chunk):
+                results[first + offset] = {
+                    "uuid": u,
+                    "result": _result_for_uuid(result, u, len(chunk)),
+                    "elapsed_seconds": round(elapsed / len(chunk), 3),
+                }
+
+    # The chunks touch disjoint photos: hold the library once and run them side by side
+    async with _library_locks.hold([(resolve_library(library), True)]):
+        await asyncio.gather(*(worker() for _ in range(min(workers, len(uuid)))))
     return json.dumps(results, indent=2)
 
 @mcp.tool()
-def osxphotos_health() -> str:
+async def osxphotos_health() -> str:
     """Return diagnostic info about how the server finds and runs osxphotos."""
-    info = {"found": False}
+    info: Dict[str, Any] = {
+        "found": False,
+        "max_concurrency": _max_concurrency(),
+        "cache": _result_cache.stats(),
+        "library_locks": _library_locks.status(),
+        "single_flight": _single_flight.stats(),
+    }
     try:
         path = resolve_osxphotos_path()
         info.update({
@@ -341,8 +1471,15 @@ def osxphotos_health() -> str:
             "PATH": os.environ.get("PATH"),
         })
         # Try to get version
-        out = subprocess.run([path, "--version"], capture_output=True, text=True, check=True)
-        info["version"] = out.stdout.strip()
+        proc = await asyncio.create_subprocess_exec(
+            path, "--version", stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(stderr.decode(errors="replace").strip() or f"exit status {proc.returncode}")
+        info["version"] = stdout.decode(errors="replace").strip()
+        pool = _worker_pool()
+        info["workers"] = pool.status() if pool is not None else None
     except Exception as e:
         info["error"] = str(e)
     return json.dumps(info)
@@ -356,12 +1493,94 @@ def python_version() -> str:
     })
 
 @mcp.tool()
-def about() -> str:
+def server_metrics(format: Literal["json", "prometheus"] = "json") -> str:
+    """Return call counts, error counts and latency percentiles since the server started.
+
+    - tools: per MCP tool, calls, errors (raised or returned "Error:") and latency.
+    - commands: per osxphotos subcommand, runs by runner (worker or subprocess), errors
+      by reason (exit, timeout, cancelled, not_found, exception), run time, time from
+      spawn to the first byte of output, and stdout/stderr bytes.
+    - caches: hits and misses of the result cache and of coalesced duplicate calls.
+
+    Percentiles are estimated from histogram buckets. format="prometheus" returns the
+    same data in the Prometheus text format (see MCP_OSXPHOTOS_METRICS_FILE).
+    """
+    if format == "prometheus":
+        return _metrics.prometheus()
+    return json.dumps(_metrics.snapshot(), indent=2)
+
+# Tools that manage jobs cannot themselves run as jobs
+_JOB_TOOLS = {"start_job", "job_status", "job_output", "cancel_job"}
+
+
+@mcp.tool()
+async def start_job(tool: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+    """Run another tool in the background and return its job id immediately.
+
+    Use for calls that can take longer than a client waits, such as export_photos,
+    import_photos, sync or exiftool. `arguments` are the tool's usual arguments. Follow
+    the job with job_status and job_output and stop it with cancel_job. Per-command
+    timeouts still apply; pass "timeout": 0 in `arguments` to lift them.
+    """
+    if tool in _JOB_TOOLS:
+        raise ValueError(f"{tool} cannot run as a background job")
+    target = mcp.get_tool(tool)
+    if target is None:
+        hint = difflib.get_close_matches(tool, mcp.tool_names(), n=3)
+        raise ValueError(f"Unknown tool: {tool!r}" + (f"; did you mean {', '.join(hint)}?" if hint else ""))
+    args = dict(arguments or {})
+    # Reject bad arguments now rather than in a failed job
+    target.fn_metadata.arg_model.model_validate(args)
+    job = _jobs.start(tool, args, lambda: target.run(args))
+    return json.dumps(job.status(), indent=2)
+
+
+@mcp.tool()
+async def job_status(job_id: Optional[str] = None) -> str:
+    """Return state, progress, exit code and peak memory of a job, or of all jobs when no id is given.
+
+    States: queued, running, succeeded, failed, cancelled, interrupted (the server
+    stopped while it ran), reattached (left running by a previous server and watched)
+    and exited (a reattached job that ended; its exit status is unknown).
+    """
+    try:
+        if job_id is None:
+            return json.dumps([job.status() for job in _jobs.list()], indent=2)
+        return json.dumps(_jobs.get(job_id).status(), indent=2)
+    except JobError as e:
+        return f"Error: {e}"
+
+
+@mcp.tool()
+async def job_output(job_id: str, since: int = 0, limit: Optional[int] = None) -> str:
+    """Return a job's log lines from line number `since` on, and its result once finished.
+
+    Only the latest MCP_OSXPHOTOS_JOB_LOG_LINES lines are kept; pass the returned
+    `next` as `since` to read only new lines. Lines from stderr are prefixed "[stderr]".
+    """
+    try:
+        return json.dumps(_jobs.get(job_id).output(since, limit), indent=2)
+    except JobError as e:
+        return f"Error: {e}"
+
+
+@mcp.tool()
+async def cancel_job(job_id: str) -> str:
+    """Cancel a running job and terminate its osxphotos processes."""
+    try:
+        return json.dumps(_jobs.cancel(job_id).status(), indent=2)
+    except JobError as e:
+        return f"Error: {e}"
+
+
+@mcp.tool()
+async def about(timeout: Optional[float] = None) -> str:
     """Print information about osxphotos including license."""
-    return run_osxphotos_command(["osxphotos", "about"])
+    return await run_osxphotos_command(["osxphotos", "about"], timeout=timeout)
 
 @mcp.tool()
-def add_locations(
+@osxphotos_command("add-locations")
+async def add_locations(
     window: Optional[str] = None,
     dry_run: bool = False,
     verbose: bool = False,
@@ -456,6 +1675,7 @@ def add_locations(
     query_eval: Optional[List[str]] = None,
     query_function: Optional[List[str]] = None,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Add missing location data to photos in Photos.app using nearest neighbor.
 
@@ -464,37 +1684,23 @@ def add_locations(
       - regex: [{pattern: REGEX, template: TEMPLATE}]
       - exif:  [{tag: EXIF_TAG, value: VALUE}]
     """
-    cmd = ["osxphotos", "add-locations"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if key in {"regex", "exif"}:
-                _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-            elif isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("add_locations", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def albums(
+@osxphotos_command("albums")
+async def albums(
     library: Optional[str] = None,
     json: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print out albums found in the Photos library."""
-    cmd = ["osxphotos", "albums"]
-    if library:
-        cmd.extend(["--library", library])
-    if json:
-        cmd.append("--json")
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("albums", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def batch_edit(
+@osxphotos_command("batch-edit")
+async def batch_edit(
     title: Optional[str] = None,
     description: Optional[str] = None,
     keyword: Optional[List[str]] = None,
@@ -510,40 +1716,20 @@ def batch_edit(
     library: Optional[str] = None,
     uuid: Optional[List[str]] = None,
     uuid_from_file: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Batch edit photo metadata such as title, description, keywords, etc.
 
     Now supports uuid and uuid_from_file to operate on arbitrary photos, not just the selection.
     """
-    cmd = ["osxphotos", "batch-edit"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if key == "location":
-                handled = _append_location_pair(cmd, key, value)  # type: ignore[arg-type]
-                if handled:
-                    continue
-            if key == "uuid":
-                for item in value:
-                    cmd.extend(["--uuid", str(item)])
-                continue
-            if key == "uuid_from_file":
-                cmd.extend(["--uuid-from-file", str(value)])
-                continue
-            if isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("batch_edit", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
  
 
 @mcp.tool()
-def compare(
+@osxphotos_command("compare", positional=("library_a", "library_b"))
+async def compare(
     library_a: str,
     library_b: str,
     check: bool = False,
@@ -553,34 +1739,28 @@ def compare(
     output: Optional[str] = None,
     signature: Optional[str] = None,
     verbose: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Compare two Photos libraries to find differences."""
-    cmd = ["osxphotos", "compare", library_a, library_b]
-    for key, value in locals().items():
-        if key in ['library_a', 'library_b']:
-            continue
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("compare", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def docs() -> str:
+async def docs(timeout: Optional[float] = None) -> str:
     """Open osxphotos documentation in your browser."""
-    return run_osxphotos_command(["osxphotos", "docs"])
+    return await run_osxphotos_command(["osxphotos", "docs"], timeout=timeout)
 
 @mcp.tool()
-def dump(
+@_spills_large_output
+@osxphotos_command("dump")
+async def dump(
     library: Optional[str] = None,
     json: bool = False,
     deleted_only: bool = False,
     deleted: bool = False,
     field: Optional[Annotated[List[Dict[str, str]], "Each item must include keys: field, template"]] = None,
     print_template: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """DEPRECATED: Print list of all photos & associated info from the Photos library. Use query instead.
 
@@ -590,24 +1770,12 @@ def dump(
       Note: Flat lists like ["uuid"] are invalid and will be rejected by the schema.
     - print_template: maps to --print (not --print-template).
     """
-    cmd = ["osxphotos", "dump"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if key == "field":
-                _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-            elif isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("dump", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def exiftool(
+@osxphotos_command("exiftool", positional=("export_directory",))
+async def exiftool(
     export_directory: str,
     db_config: bool = False,
     load_config: Optional[str] = None,
@@ -630,26 +1798,15 @@ def exiftool(
     dry_run: bool = False,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
     library: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Run exiftool on previously exported files to update metadata."""
-    cmd = ["osxphotos", "exiftool", export_directory]
-    for key, value in locals().items():
-        if key == 'export_directory':
-            continue
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([f"--{key.replace('_', '-')}", str(item)])
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("exiftool", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def export_photos(
+@osxphotos_command("export", positional=("dest",))
+async def export_photos(
     dest: str,
     library: Optional[str] = None,
     verbose: bool = False,
@@ -823,6 +1980,8 @@ def export_photos(
     config_only: bool = False,
     print_template: Optional[List[str]] = None,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
+    shards: Optional[int] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Export photos from the Photos database.
 
@@ -835,30 +1994,153 @@ def export_photos(
             - xattr_template: [{attribute: ATTRIBUTE, template: TEMPLATE}]
             - post_command:   [{category: CATEGORY, command: COMMAND}]
             - sidecar_template: [{mako_template: MAKO_TEMPLATE_FILE, filename_template: SIDECAR_FILENAME_TEMPLATE, options: OPTIONS}]
+    - Output is streamed: progress notifications report exported count, files/s and ETA,
+      and only the last lines of the log are returned.
+    - shards=N (N >= 2) resolves the matching photos once and exports them with N
+      concurrent osxphotos processes, balanced by file size; their export databases are
+      merged afterwards so later update=True runs work as usual.
     """
-    cmd = ["osxphotos", "export", dest]
-    for key, value in locals().items():
-        if key == 'dest':
-            continue
-        if key == "cmd":
-            continue
-        if value:
-            if key in {"xattr_template", "post_command", "regex", "exif"}:
-                _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-            elif key == "sidecar_template":
-                _append_multi_arg_group(cmd, key, value, 3)  # type: ignore[arg-type]
-            else:
-                if isinstance(value, bool):
-                    cmd.append(_flag(key))
-                elif isinstance(value, list):
-                    for item in value:
-                        cmd.extend([_flag(key), str(item)])
+    if shards is not None and shards >= 2:
+        return await _export_sharded(dict(locals()), shards, timeout)
+    cmd = build_argv("export_photos", locals())
+    return await run_with_progress(cmd, timeout=timeout)
+
+
+# export_photos options a sharded export cannot split between its runs
+_SHARD_UNSUPPORTED = (
+    "cleanup", "report", "add_exported_to_album", "add_skipped_to_album", "add_missing_to_album",
+    "load_config", "save_config", "config_only", "alt_db",
+    # Shards export into one directory; a filename template could give photos in different shards the same name
+    "filename",
+)
+# Filters that still apply to photos listed with --uuid-from-file (deleted photos are
+# only found with --deleted or --deleted-only)
+_SHARD_KEPT_FILTERS = frozenset({"library", "deleted", "deleted_only"})
+
+
+async def _resolve_export_photos(values: Dict[str, Any], filters: List[str]) -> Any:
+    """(uuid, original size, file name) of the photos an export with `values` would export, or an "Error:" string."""
+    query = {name: values.get(name) for name in filters}
+    query["json"] = True
+    output = await run_osxphotos_command(build_argv("query_photos", query))
+    if output.startswith("Error:"):
+        return output
+    try:
+        items = json.loads(output) if output.strip() else []
+    except ValueError as e:
+        return f"Error: could not parse osxphotos JSON output to plan the shards: {e}"
+    skip = set(values.get("skip_uuid") or [])
+    if values.get("skip_uuid_from_file"):
+        try:
+            with open(os.path.expanduser(values["skip_uuid_from_file"]), encoding="utf-8") as fh:
+                skip.update(line.strip() for line in fh if line.strip() and not line.startswith("#"))
+        except OSError as e:
+            return f"Error: could not read skip_uuid_from_file: {e}"
+    name_field = "filename" if values.get("current_name") else "original_filename"
+    photos = [
+        (item["uuid"], int(item.get("original_filesize") or 0), item.get(name_field))
+        for item in items
+        if isinstance(item, dict) and item.get("uuid") and item["uuid"] not in skip
+    ]
+    if values.get("limit"):
+        photos = photos[:values["limit"]]
+    return photos
+
+
+async def _merge_shard_dbs(main_db: str, shard_dbs: List[str]) -> None:
+    """Merge the shard databases off the event loop; a cancelled caller does not stop the merge."""
+    with _tracer.span("merge_export_dbs", "export", shards=len(shard_dbs)):
+        await asyncio.shield(asyncio.to_thread(merge_export_dbs, main_db, shard_dbs))
+
+
+async def _export_sharded(values: Dict[str, Any], count: int, timeout: Optional[float]) -> str:
+    """Run an export as `count` concurrent exports of balanced slices of the matching photos.
+
+    Each shard exports its photos with --uuid-from-file and records them in its own
+    export database, seeded from the export's database if there is one; the shard
+    databases are merged into it when every shard has finished, also when one failed
+    or the call was cancelled, so nothing exported is forgotten.
+    """
+    unsupported = [name for name in _SHARD_UNSUPPORTED if values.get(name)]
+    if unsupported:
+        raise ValueError(f"shards cannot be combined with: {', '.join(unsupported)}")
+    # Reject unsupported options before running anything
+    build_argv("export_photos", values)
+    query_params = inspect.signature(query_photos).parameters
+    filters = [
+        name for name in inspect.signature(export_photos).parameters
+        if name in query_params and name not in ("print_template", "timeout")
+    ]
+    with _tracer.span("resolve_shards", "export"):
+        photos = await _resolve_export_photos(values, filters)
+    if isinstance(photos, str):
+        return photos
+    if not photos:
+        return "Sharded export: no photos match"
+    plan = plan_shards(photos, count)
+    total_mb = sum(shard.size for shard in plan) / 1e6
+    summary = (
+        f"Sharded export: {len(photos)} photos ({total_mb:.1f} MB) in {len(plan)} shards of "
+        f"{min(len(s.uuids) for s in plan)}-{max(len(s.uuids) for s in plan)} photos"
+    )
+
+    dest = os.path.abspath(os.path.expanduser(values["dest"]))
+    main_db = os.path.abspath(os.path.expanduser(values.get("exportdb") or os.path.join(dest, EXPORT_DB_NAME)))
+    use_db = not values.get("no_exportdb")
+    shard_dbs = [os.path.join(dest, f".osxphotos_export.shard-{i}.db") for i in range(len(plan))]
+    reset = {name: None for name in filters if name not in _SHARD_KEPT_FILTERS}
+    progress = ProgressGroup()
+    with tempfile.TemporaryDirectory(prefix="mcp-osxphotos-shards-") as tmp:
+        commands = []
+        for index, shard in enumerate(plan):
+            uuid_file = os.path.join(tmp, f"shard-{index}.txt")
+            with open(uuid_file, "w", encoding="utf-8") as fh:
+                fh.write("\n".join(shard.uuids) + "\n")
+            shard_values = {**values, **reset}
+            shard_values.update(uuid_from_file=uuid_file, limit=None, skip_uuid=None, skip_uuid_from_file=None)
+            if use_db:
+                shard_values["exportdb"] = shard_dbs[index]
+            commands.append(build_argv("export_photos", shard_values))
+        if use_db:
+            os.makedirs(dest, exist_ok=True)
+            for path in shard_dbs:
+                if os.path.exists(main_db):
+                    await asyncio.to_thread(seed_database, main_db, path)
                 else:
-                    cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+                    remove_database(path)
+        tasks = [
+            asyncio.ensure_future(run_with_progress(cmd, timeout=timeout, group=progress)) for cmd in commands
+        ]
+        try:
+            outputs = await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other shards and wait until their processes are gone before the
+            # merge reads (and deletes) the shard databases they write
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+            if use_db:
+                try:
+                    await _merge_shard_dbs(main_db, shard_dbs)
+                except Exception:
+                    # Keep the original error; the shard databases are left for inspection
+                    pass
+            raise
+    if use_db:
+        await _merge_shard_dbs(main_db, shard_dbs)
+    failed = [i for i, output in enumerate(outputs) if output.startswith("Error:")]
+    if failed:
+        summary = f"Error: {len(failed)} of {len(plan)} shards failed ({', '.join(map(str, failed))})\n{summary}"
+    sections = [
+        f"[shard {i}: {len(shard.uuids)} photos, {shard.size / 1e6:.1f} MB]\n{output.rstrip()}"
+        for i, (shard, output) in enumerate(zip(plan, outputs))
+    ]
+    return "\n".join([summary, *sections])
 
 @mcp.tool()
-def exportdb(
+@_spills_large_output
+@osxphotos_command("exportdb", positional=("export_database",))
+async def exportdb(
     export_database: str,
     version: bool = False,
     vacuum: bool = False,
@@ -890,34 +2172,31 @@ def exportdb(
     timestamp: bool = False,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
     dry_run: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Utilities for working with the osxphotos export database."""
-    cmd = ["osxphotos", "exportdb", export_database]
-    for key, value in locals().items():
-        if key == 'export_database':
-            continue
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([f"--{key.replace('_', '-')}", str(item)])
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("exportdb", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def help_command(command: Optional[str] = None) -> str:
-    """Print help; for help on commands: help <command>."""
-    cmd = ["osxphotos", "help"]
+@osxphotos_command("help", positional=("command",))
+async def help_command(command: Optional[str] = None, timeout: Optional[float] = None) -> str:
+    """Print help; for help on commands: help <command>.
+
+    Help text is cached on disk per osxphotos version, so repeated calls do not start osxphotos.
+    """
     if command:
-        cmd.append(command)
-    return run_osxphotos_command(cmd)
+        known = _known_commands()
+        if known is not None and command not in known:
+            close = difflib.get_close_matches(command, known, n=3)
+            suggestion = f" Did you mean: {', '.join(close)}?" if close else ""
+            raise ValueError(f"Unknown osxphotos command {command!r}.{suggestion}")
+    cmd = build_argv("help_command", locals())
+    return await _cached_help("help", command, cmd, timeout)
 
 @mcp.tool()
-def import_photos(
+@osxphotos_command("import", positional=("files_or_dirs",))
+async def import_photos(
     files_or_dirs: List[str],
     album: Optional[List[str]] = None,
     title: Optional[str] = None,
@@ -964,146 +2243,176 @@ def import_photos(
     force: bool = False,
     library: Optional[str] = None,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
+    skip_imported: bool = False,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
 ) -> str:
-    """Import photos and videos into Photos."""
-    cmd = ["osxphotos", "import"] + files_or_dirs
-    for key, value in locals().items():
-        if key == 'files_or_dirs':
-            continue
-        if key == "cmd":
-            continue
-        if value:
-            if key == "location":
-                handled = _append_location_pair(cmd, key, value)  # type: ignore[arg-type]
-                if handled:
-                    continue
-            if isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    """Import photos and videos into Photos.
+
+    Output is streamed: progress notifications report imported count, files/s and ETA,
+    and only the last lines of the log are returned.
+
+    With `skip_imported`, the sources are pre-scanned first: files are listed (honoring
+    `walk` and `glob`) and hashed with up to `max_workers` threads, and files whose
+    content was already imported into this library by an earlier skip_imported run are
+    left out. Only new files are passed to osxphotos; a summary line comes first.
+    """
+    if skip_imported:
+        return await _import_new_files(dict(locals()), max_workers, timeout)
+    cmd = build_argv("import_photos", locals())
+    return await run_with_progress(cmd, timeout=timeout)
+
+
+# Content hashes of files imported with skip_imported (see import_index.py)
+_import_index = ImportIndex(
+    os.path.expanduser(
+        os.environ.get("MCP_OSXPHOTOS_IMPORT_INDEX") or os.path.join(cache_directory(), "import-index.sqlite3")
+    )
+)
+atexit.register(_import_index.close)
+
+# Bytes of file paths passed to one osxphotos import after a pre-scan; longer lists are
+# imported in several runs to stay below the OS argument size limit
+_IMPORT_ARGV_BYTES = 128 * 1024
+
+
+def _path_chunks(paths: List[str], limit: int) -> List[List[str]]:
+    chunks: List[List[str]] = [[]]
+    size = 0
+    for path in paths:
+        cost = len(os.fsencode(path)) + 1
+        if chunks[-1] and size + cost > limit:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(path)
+        size += cost
+    return chunks
+
+
+async def _import_new_files(values: Dict[str, Any], max_workers: Optional[int], timeout: Optional[float]) -> str:
+    """Pre-scan `values["files_or_dirs"]` and import only files not imported before.
+
+    Hashes are recorded per run of osxphotos once it succeeds, so a failed or cancelled
+    import is rescanned next time. Dry runs and --check/--check-not record nothing.
+    """
+    # Reject unsupported options before reading any file
+    build_argv("import_photos", values)
+    workers = max_workers if max_workers and max_workers > 0 else _default_max_workers()
+    library = resolve_library(values.get("library"))
+    with _tracer.span("import_prescan", "import"):
+        scan = await asyncio.to_thread(
+            _import_index.scan, library, values["files_or_dirs"], bool(values.get("walk")), values.get("glob"), workers
+        )
+    summary = (
+        f"Pre-scan: {len(scan.files)} files, {scan.known} already imported, {len(scan.new)} to import "
+        f"({scan.hashed} hashed in {scan.seconds:.1f}s)"
+    )
+    if not scan.new:
+        return summary
+    record = not (values.get("dry_run") or values.get("check") or values.get("check_not"))
+    chunks = _path_chunks(scan.new, _IMPORT_ARGV_BYTES)
+    outputs = []
+    progress = ProgressGroup()
+    # One write lock for every run, so no other writer slips in between them
+    async with _library_locks.hold([(library, True)]):
+        for index, chunk in enumerate(chunks):
+            chunk_values = dict(values, files_or_dirs=chunk, walk=False, glob=None)
+            if index and values.get("report"):
+                chunk_values["append"] = True
+            output = await run_with_progress(build_argv("import_photos", chunk_values), timeout=timeout, group=progress)
+            if output.startswith("Error:"):
+                done = sum(len(c) for c in chunks[:index])
+                return f"{output}\n{summary}; stopped after importing {done} of {len(scan.new)} files"
+            outputs.append(output)
+            if record:
+                imported = {path: scan.digests[path] for path in chunk if path in scan.digests}
+                await asyncio.to_thread(_import_index.record, library, imported)
+    return "\n".join([summary, *outputs])
 
 @mcp.tool()
-def info(
+@osxphotos_command("info")
+async def info(
     library: Optional[str] = None,
     json: bool = False,
     verbose: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print out descriptive info of the Photos library database."""
-    cmd = ["osxphotos", "info"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("info", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def keywords(
+@osxphotos_command("keywords")
+async def keywords(
     library: Optional[str] = None,
     json: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print out keywords found in the Photos library."""
-    cmd = ["osxphotos", "keywords"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("keywords", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def labels(
+@osxphotos_command("labels")
+async def labels(
     library: Optional[str] = None,
     json: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print out image classification labels found in the Photos library."""
-    cmd = ["osxphotos", "labels"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("labels", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def list_libraries(
+@osxphotos_command("list")
+async def list_libraries(
     json: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print list of Photos libraries found on the system."""
-    cmd = ["osxphotos", "list"]
-    if json:
-        cmd.append("--json")
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("list_libraries", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def orphans(
+@_spills_large_output
+@osxphotos_command("orphans")
+async def orphans(
     export: Optional[str] = None,
     library: Optional[str] = None,
     verbose: bool = False,
     timestamp: bool = False,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Find orphaned photos in a Photos library."""
-    cmd = ["osxphotos", "orphans"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("orphans", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def persons(
+@osxphotos_command("persons")
+async def persons(
     library: Optional[str] = None,
     json: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print out persons (faces) found in the Photos library."""
-    cmd = ["osxphotos", "persons"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("persons", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def places(
+@osxphotos_command("places")
+async def places(
     library: Optional[str] = None,
     json: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Print out places found in the Photos library."""
-    cmd = ["osxphotos", "places"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("places", locals())
+    return await run_cached_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def push_exif(
+@osxphotos_command("push-exif", positional=("metadata",))
+async def push_exif(
     metadata: str,
     push_edited: bool = False,
     exiftool_path: Optional[str] = None,
@@ -1214,6 +2523,7 @@ def push_exif(
     exif: Optional[Annotated[List[Dict[str, str]], "Each item must include keys: tag, value. Example: [{tag: 'Make', value: 'Apple'}]"]] = None,
     query_eval: Optional[List[str]] = None,
     query_function: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Write photo metadata to original files in the Photos library.
 
@@ -1224,26 +2534,223 @@ def push_exif(
             - regex: [{pattern: REGEX, template: TEMPLATE}]
             - exif:  [{tag: EXIF_TAG, value: VALUE}]
     """
-    cmd = ["osxphotos", "push-exif", metadata]
-    for key, value in locals().items():
-        if key == 'metadata':
-            continue
-        if key == "cmd":
-            continue
-        if value:
-            if key in {"regex", "exif"}:
-                _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-            elif isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("push_exif", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
+
+_cursor_store = CursorStore(ttl=_env_float("MCP_OSXPHOTOS_CURSOR_TTL", 900.0))
+atexit.register(_cursor_store.close)
+
+
+def _page_response(items: List[Any], next_cursor: Optional[str], total: int, offset: int) -> str:
+    return json.dumps({"results": items, "total": total, "offset": offset, "next_cursor": next_cursor})
+
+
+async def _run_shaped_query(
+    cmd: List[str], result: QueryResult, page_size: Optional[int], timeout: Optional[float] = None
+) -> str:
+    """Run a JSON query, parsing its output as it streams in, and return `result` or its first page.
+
+    Only what `result` keeps of each photo is held in memory, never the whole output.
+    """
+    parser = JsonArrayParser(result.add)
+
+    async def feed(chunk: bytes) -> None:
+        await asyncio.to_thread(parser.feed, chunk)
+
+    output = await run_osxphotos_command(cmd, timeout=timeout, on_stdout=feed)
+    if output.startswith("Error:"):
+        return output
+    try:
+        parser.close()
+    except ValueError as e:
+        return f"Error: could not parse osxphotos JSON output: {e}"
+    if page_size:
+        return _first_page(result.items, page_size)
+    with _tracer.span("encode_output", "output", items=parser.items):
+        return await asyncio.to_thread(result.text)
+
+
+def _first_page(items: Iterable[Any], page_size: int) -> str:
+    with _tracer.span("spill_results", "output"):
+        spill_id = _cursor_store.spill(items)
+    page, next_cursor, total = _cursor_store.page(spill_id, 0, page_size)
+    return _page_response(page, next_cursor, total, 0)
+
+
+async def _query_page(cursor: str) -> str:
+    """Serve a later page of a spilled query from its cursor, reading the spill file off the event loop."""
+    try:
+        spill_id, offset, page_size = decode_cursor(cursor)
+        page, next_cursor, total = await asyncio.to_thread(_cursor_store.page, spill_id, offset, page_size)
+    except CursorError as e:
+        return f"Error: {e}"
+    return _page_response(page, next_cursor, total, offset)
+
+
+_photo_index = PhotoIndex(os.path.expanduser(
+    os.environ.get("MCP_OSXPHOTOS_PHOTO_INDEX") or os.path.join(cache_directory(), "photo-index.sqlite3")
+))
+atexit.register(_photo_index.close)
+
+# query_photos parameters that shape the output (or are the server's) rather than filter
+_INDEX_OUTPUT_PARAMS = frozenset({"json", "count", "fields", "columnar", "page_size", "cursor", "timeout"})
+
+
+def _query_index_enabled() -> bool:
+    return _env_int("MCP_OSXPHOTOS_QUERY_INDEX", 0) > 0
+
+
+# Photos parsed but not yet written to the index while a refresh streams in
+_INDEX_LOAD_QUEUE = 256
+
+
+class _LoadAborted(Exception):
+    """The refresh query failed; the index load is rolled back."""
+
+
+async def _load_streamed_photos(
+    cmd: List[str], load: Callable[[Iterable[Any]], int], timeout: Optional[float]
+) -> Optional[str]:
+    """Run the JSON query `cmd` and hand its photos to `load` as they are parsed; returns an error or None.
+
+    `load` runs in a worker thread and consumes the photos from a bounded queue while
+    the parser fills it, so neither the output nor the photo list is held in memory.
+    It starts with the first output, so a long query does not hold the index. A failed
+    query or invalid JSON ends the photos with `_LoadAborted`, rolling the load back.
+    """
+    photos: "queue.Queue[Any]" = queue.Queue(maxsize=_INDEX_LOAD_QUEUE)
+    stopped = threading.Event()
+    end, abort = object(), object()
+
+    def put(item: Any) -> None:
+        # Called in a worker thread; gives up once the loader is gone
+        while not stopped.is_set():
+            try:
+                photos.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def consume() -> Iterator[Any]:
+        while True:
+            item = photos.get()
+            if item is end:
+                return
+            if item is abort:
+                raise _LoadAborted()
+            yield item
+
+    def run_load() -> int:
+        try:
+            return load(consume())
+        finally:
+            stopped.set()
+
+    parser = JsonArrayParser(put)
+    loader: "Optional[asyncio.Future[int]]" = None
+
+    def start() -> None:
+        nonlocal loader
+        if loader is None:
+            loader = asyncio.ensure_future(asyncio.to_thread(run_load))
+
+    async def feed(chunk: bytes) -> None:
+        start()
+        await asyncio.to_thread(parser.feed, chunk)
+
+    error: Optional[str] = "Error: osxphotos query was interrupted"
+    try:
+        output = await run_osxphotos_command(cmd, timeout=timeout, on_stdout=feed)
+        if output.startswith("Error:"):
+            error = output
+        else:
+            # No output at all is an empty library
+            start()
+            try:
+                await asyncio.to_thread(parser.close)
+                error = None
+            except ValueError as e:
+                error = f"Error: osxphotos query returned invalid JSON: {e}"
+    finally:
+        if loader is not None:
+            await asyncio.to_thread(put, abort if error else end)
+            await asyncio.wait([loader])
+            if error is None:
+                loader.result()
+            elif not loader.cancelled():
+                # Rolled back: the query's error is what the caller needs
+                loader.exception()
+    return error
+
+
+async def _refresh_photo_index(
+    library: Optional[str], timeout: Optional[float] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """Bring the photo index of `library` up to date: (resolved library path, None) or (None, error).
+
+    The index is rebuilt from a full ``query --json`` when it is empty, stale or older
+    than MCP_OSXPHOTOS_QUERY_INDEX_MAX_AGE; otherwise, if the library fingerprint
+    changed, only photos added since the newest one indexed are fetched. The index
+    cannot be used when the library database cannot be fingerprinted or the refresh
+    query failed.
+    """
+    path = resolve_library(library)
+    fingerprint = library_fingerprint(path)
+    if fingerprint is None:
+        return None, f"Error: cannot read the Photos database of {path}"
+    state = await asyncio.to_thread(_photo_index.state, path)
+    max_age = _env_float("MCP_OSXPHOTOS_QUERY_INDEX_MAX_AGE", 3600.0)
+    current = state is not None and not state.stale and (max_age <= 0 or time.time() - state.built < max_age)
+    if current and state.fingerprint == encode_fingerprint(fingerprint):
+        return path, None
+    values: Dict[str, Any] = {"library": library, "json": True}
+    last_added = parse_datetime(state.last_added) if current else None
+    if last_added is not None:
+        # --added-after is exclusive; re-fetching a photo just replaces it
+        values["added_after"] = (last_added - datetime.timedelta(seconds=1)).isoformat()
+    load = _photo_index.update if last_added is not None else _photo_index.rebuild
+    with _tracer.span("photo_index_refresh", "index", full=last_added is None):
+        error = await _load_streamed_photos(
+            build_argv("query_photos", values), lambda photos: load(path, photos, fingerprint), timeout
+        )
+    if error is not None:
+        return None, error
+    return path, None
+
+
+async def _query_from_index(values: Dict[str, Any]) -> Optional[str]:
+    """Answer a JSON, count or paginated query_photos call from the photo index.
+
+    Returns None when the index cannot be used and osxphotos has to run the query.
+    """
+    path, _error = await _refresh_photo_index(values.get("library"), values.get("timeout"))
+    if path is None:
+        return None
+    with _tracer.span("photo_index_query", "index"):
+        if values.get("count"):
+            return f"{await asyncio.to_thread(_photo_index.count, path, values)}\n"
+        return await asyncio.to_thread(_index_response, path, values)
+
+
+def _index_response(path: str, values: Dict[str, Any]) -> str:
+    """query_photos output from the index, decoding and projecting one record at a time (in a thread)."""
+    records = _photo_index.query(path, values)
+    fields, page_size = values.get("fields"), values.get("page_size")
+    if page_size:
+        photos = (json.loads(record) for record in records)
+        return _first_page((project(photo, fields) for photo in photos) if fields else photos, page_size)
+    if fields or values.get("columnar"):
+        result = QueryResult(fields, values.get("columnar", False))
+        for record in records:
+            result.add(json.loads(record))
+        return result.text()
+    return f"[{', '.join(records)}]\n"
+
 
 @mcp.tool()
-def query_photos(
+@_spills_large_output
+@osxphotos_command("query")
+async def query_photos(
     library: Optional[str] = None,
     json: bool = False,
     count: bool = False,
@@ -1343,6 +2850,11 @@ def query_photos(
         field: Optional[Annotated[List[Dict[str, str]], "Each item must include keys: field, template. Example: [{field: 'uuid', template: '{uuid}'}]"]] = None,
     print_template: Optional[List[str]] = None,
     mute: bool = False,
+    fields: Optional[List[str]] = None,
+    columnar: bool = False,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Query the Photos database using 1 or more search options.
 
@@ -1354,33 +2866,177 @@ def query_photos(
         - Multi-arg options must be object-form lists:
             - regex: [{pattern: REGEX, template: TEMPLATE}]
             - exif:  [{tag: EXIF_TAG, value: VALUE}]
+        - Pagination: set page_size to run the query once (JSON output is implied) and get
+            {"results": [...], "total": N, "offset": K, "next_cursor": "..."}. Pass next_cursor
+            back as cursor (other parameters are ignored) to fetch the following page without
+            re-running osxphotos. Cursors expire after a period of inactivity.
+        - fields: plain attribute names of the JSON records to keep (JSON output is implied),
+            dotted for nested ones. Example: fields=["uuid", "date", "keywords", "exif_info.camera_model"].
+            Unlike `field` it takes no templates and costs no osxphotos rendering.
+        - columnar: compact JSON {"columns": [...], "dictionaries": {column: [strings]}, "rows": [[...], ...]},
+            one array per photo in column order (all attributes without fields). A column listed in
+            dictionaries holds indexes into its strings. Not combinable with page_size.
+        - With MCP_OSXPHOTOS_QUERY_INDEX=1, JSON, count and paginated queries that only use
+            filters the local photo index supports are answered from it without running osxphotos.
     """
-    cmd = ["osxphotos", "query"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if key in {"field", "regex", "exif"}:
-                _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-            elif isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    if cursor:
+        return await _query_page(cursor)
+    if columnar and page_size:
+        raise ValueError("columnar cannot be combined with page_size")
+    values = dict(locals())
+    shaped = not count and bool(page_size or fields or columnar)
+    if (json or count or shaped) and _query_index_enabled() and PhotoIndex.supports(
+        {name: value for name, value in values.items() if name not in _INDEX_OUTPUT_PARAMS}
+    ):
+        result = await _query_from_index(values)
+        if result is not None:
+            return result
+    cmd = build_argv("query_photos", values)
+    if shaped:
+        if not json:
+            cmd.append("--json")
+        return await _run_shaped_query(cmd, QueryResult(fields, columnar), page_size, timeout)
+    return await run_osxphotos_command(cmd, timeout=timeout)
+
+@mcp.tool()
+async def search_photos(
+    query: str,
+    library: Optional[str] = None,
+    limit: int = 50,
+    match: Literal["all", "any"] = "all",
+    timeout: Optional[float] = None,
+) -> str:
+    """Full-text search of photo metadata, best matches first.
+
+    Searches titles, descriptions, keywords, persons, album names, place names and
+    labels. Words match as prefixes ("lak" finds "Lake"), case and accents are ignored
+    and "quoted words" match as a phrase. With match="all" a photo must match every
+    word (in any field), with match="any" one is enough.
+
+    Returns JSON {"query": ..., "total": N, "results": [{"uuid", "score", "title", "date",
+    "original_filename"}, ...]} with at most `limit` results; pass the uuids to other tools.
+    Runs on the local photo index, which is built by one ``osxphotos query`` on first use
+    and then refreshed with only the photos added since whenever the library changes.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    match_expression(query, match)  # reject empty queries before building the index
+    path, error = await _refresh_photo_index(library, timeout)
+    if path is None:
+        return error
+    with _tracer.span("photo_index_search", "index"):
+        total, results = await asyncio.to_thread(_photo_index.search, path, query, limit, match)
+    return json.dumps({"query": query, "total": total, "results": results}, indent=2)
+
+# query_photos parameters that shape or redirect its output rather than select photos
+_QUERY_OUTPUT_PARAMS = frozenset({
+    "json", "count", "add_to_album", "quiet", "field", "print_template", "mute", "fields", "columnar", "page_size",
+    "cursor", "timeout",
+})
+
+
+def _with_query_filters(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Give `fn(..., **filters)` a signature with query_photos' filter parameters in place of **filters.
+
+    The tool schema then lists every filter, typed and documented as on query_photos.
+    """
+    own = [p for p in inspect.signature(fn).parameters.values() if p.kind is not p.VAR_KEYWORD]
+    filters = [
+        p.replace(kind=p.KEYWORD_ONLY) for name, p in inspect.signature(query_photos).parameters.items()
+        if name not in _QUERY_OUTPUT_PARAMS and name not in {q.name for q in own}
+    ]
+    fn.__signature__ = inspect.signature(fn).replace(parameters=[*own, *filters])
+    return fn
+
+
+def _index_facet_rows(path: str, values: Dict[str, Any], add: Callable[[Any], None]) -> None:
+    for record in _photo_index.query(path, values):
+        add(json.loads(record))
+
+
+async def _facet_rows(filters: Dict[str, Any], timeout: Optional[float]) -> Union[str, List[FacetRow]]:
+    """Parsed rows of the photos matching query_photos `filters`, or an error message.
+
+    Rows are kept in the result cache while the library is unchanged. The photos come
+    from the photo index when MCP_OSXPHOTOS_QUERY_INDEX is set and supports the filters.
+    """
+    values = {**filters, "json": True, "timeout": timeout}
+    cmd = build_argv("query_photos", values)
+    library = resolve_library(filters.get("library"))
+    fingerprint = library_fingerprint(library)
+    key = ("facets", *cmd)
+    cached = _result_cache.get(key, fingerprint)
+    if cached is not None:
+        return cached
+    rows: List[FacetRow] = []
+
+    def add(photo: Any) -> None:
+        if isinstance(photo, dict):
+            rows.append(facet_row(photo))
+
+    # The output is parsed as it streams in: only the rows are kept
+    parser = JsonArrayParser(add)
+
+    async def feed(chunk: bytes) -> None:
+        await asyncio.to_thread(parser.feed, chunk)
+
+    path = None
+    if _query_index_enabled() and PhotoIndex.supports(filters):
+        path, _error = await _refresh_photo_index(filters.get("library"), timeout)
+    if path is not None:
+        with _tracer.span("photo_index_query", "index"):
+            await asyncio.to_thread(_index_facet_rows, path, values, add)
+    else:
+        output = await run_osxphotos_command(cmd, timeout=timeout, on_stdout=feed)
+        if output.startswith("Error:"):
+            return output
+        try:
+            parser.close()
+        except ValueError as e:
+            return f"Error: could not parse osxphotos JSON output: {e}"
+    _result_cache.put(key, library, fingerprint, rows, size=rows_size(rows))
+    return rows
+
+
+@mcp.tool()
+@_with_query_filters
+async def photo_facets(
+    by: List[Literal["year", "month", "keyword", "person", "album", "label", "uti", "camera"]],
+    limit: int = 50,
+    timeout: Optional[float] = None,
+    **filters: Any,
+) -> str:
+    """Count photos and total their original file sizes per year, month, keyword, person, album, label, UTI or camera.
+
+    Takes the filter parameters of query_photos to select the photos. Several `by`
+    dimensions group by their combination (by=["year", "person"]: photos per person
+    per year); a photo with several keywords, persons, albums or labels counts in each
+    of their groups, and photos without one are grouped under null.
+
+    Returns JSON {"photos": N, "bytes": B, "by": [...], "groups": [{<dimension>: value, ...,
+    "count": n, "bytes": b}, ...]} with the `limit` largest groups (year and month alone
+    are in date order) and "other" summing the remaining ones. The parsed query result
+    is cached while the library is unchanged, so breakdowns of the same selection by
+    other dimensions do not run osxphotos again.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    rows = await _facet_rows(filters, timeout)
+    if isinstance(rows, str):
+        return rows
+    with _tracer.span("facet_aggregate", "facets", photos=len(rows)):
+        return json.dumps(await asyncio.to_thread(aggregate, rows, by, limit))
 
 @mcp.tool()
-def show(uuid_or_name: str, library: Optional[str] = None) -> str:
+@osxphotos_command("show", positional=("uuid_or_name",))
+async def show(uuid_or_name: str, library: Optional[str] = None, timeout: Optional[float] = None) -> str:
     """Show photo, album, or folder in Photos from UUID_OR_NAME."""
-    cmd = ["osxphotos", "show", uuid_or_name]
-    if library:
-        cmd.extend(["--library", library])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("show", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def sync(
+@osxphotos_command("sync")
+async def sync(
     export_file: Optional[str] = None,
     import_path: Optional[str] = None,
     set_metadata: Optional[List[str]] = None,
@@ -1480,6 +3136,7 @@ def sync(
     query_function: Optional[List[str]] = None,
     library: Optional[str] = None,
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Sync metadata and albums between Photos libraries.
 
@@ -1490,24 +3147,12 @@ def sync(
             - regex: [{pattern: REGEX, template: TEMPLATE}]
             - exif:  [{tag: EXIF_TAG, value: VALUE}]
     """
-    cmd = ["osxphotos", "sync"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if key in {"regex", "exif"}:
-                _append_multi_arg_pairs(cmd, key, value)  # type: ignore[arg-type]
-            elif isinstance(value, bool):
-                cmd.append(_flag(key))
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([_flag(key), str(item)])
-            else:
-                cmd.extend([_flag(key), str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("sync", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def timewarp(
+@osxphotos_command("timewarp")
+async def timewarp(
     date: Optional[str] = None,
     date_delta: Optional[str] = None,
     time: Optional[str] = None,
@@ -1534,92 +3179,74 @@ def timewarp(
     theme: Optional[Literal['dark', 'light', 'mono', 'plain']] = None,
     plain: bool = False,
     force: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Adjust date/time/timezone of photos in Apple Photos."""
-    cmd = ["osxphotos", "timewarp"]
-    for key, value in locals().items():
-        if key == "cmd":
-            continue
-        if value:
-            if isinstance(value, bool):
-                cmd.append(f"--{key.replace('_', '-')}")
-            elif isinstance(value, list):
-                for item in value:
-                    cmd.extend([f"--{key.replace('_', '-')}", str(item)])
-            else:
-                cmd.extend([f"--{key.replace('_', '-')}", str(value)])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("timewarp", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def tutorial(width: Optional[int] = None) -> str:
+@osxphotos_command("tutorial", positional=("width",))
+async def tutorial(width: Optional[int] = None, timeout: Optional[float] = None) -> str:
     """Display osxphotos tutorial."""
-    cmd = ["osxphotos", "tutorial"]
-    if width:
-        cmd.append(str(width))
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("tutorial", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def update() -> str:
+async def update(timeout: Optional[float] = None) -> str:
     """Update the installation to the latest version."""
-    return run_osxphotos_command(["osxphotos", "update"])
+    return await run_osxphotos_command(["osxphotos", "update"], timeout=timeout)
 
 @mcp.tool()
-def uuid(filename: bool = False) -> str:
+@osxphotos_command("uuid")
+async def uuid(filename: bool = False, timeout: Optional[float] = None) -> str:
     """Print out unique IDs (UUID) of photos selected in Photos."""
-    cmd = ["osxphotos", "uuid"]
-    if filename:
-        cmd.append("--filename")
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("uuid", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 @mcp.tool()
-def version(run: Optional[str] = None) -> str:
+@osxphotos_command("version")
+async def version(run: Optional[str] = None, timeout: Optional[float] = None) -> str:
     """Check for new version of osxphotos."""
-    cmd = ["osxphotos", "version"]
-    if run:
-        cmd.extend(["--run", run])
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("version", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 
 @mcp.tool()
-def install(
+@osxphotos_command("install", positional=("packages",), flags={"requirements_file": "-r"})
+async def install(
     packages: Optional[List[str]] = None,
     upgrade: bool = False,
     requirements_file: Optional[str] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Install Python packages into the same environment as osxphotos."""
-    cmd = ["osxphotos", "install"]
-    if upgrade:
-        cmd.append("--upgrade")
-    if requirements_file:
-        cmd.extend(["-r", requirements_file])
-    if packages:
-        cmd.extend(packages)
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("install", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 
 @mcp.tool()
-def run(
+@osxphotos_command("run", positional=("python_file", "args"))
+async def run(
     python_file: str,
     args: Optional[List[str]] = None,
+    timeout: Optional[float] = None,
 ) -> str:
     """Run a python file using the same environment as osxphotos."""
-    cmd = ["osxphotos", "run", python_file]
-    if args:
-        cmd.extend(args)
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("run", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 
 @mcp.tool()
-def uninstall(
+@osxphotos_command("uninstall", positional=("packages",))
+async def uninstall(
     packages: List[str],
     yes: bool = False,
+    timeout: Optional[float] = None,
 ) -> str:
     """Uninstall Python packages from the osxphotos environment."""
-    cmd = ["osxphotos", "uninstall"]
-    if yes:
-        cmd.append("--yes")
-    cmd.extend(packages)
-    return run_osxphotos_command(cmd)
+    cmd = build_argv("uninstall", locals())
+    return await run_osxphotos_command(cmd, timeout=timeout)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+"""Startup profiling for the MCP server.
+
+When MCP_OSXPHOTOS_PROFILE_STARTUP is set, every module import is timed (self and
+cumulative, in the style of ``python -X importtime``) together with named phases from
+the entrypoint to the first ``tools/list`` response. The report is written to stderr,
+or to the file named by the variable when its value is not a plain "1"/"true".
+
+This module must stay cheap to import and may only use the standard library: it is
+loaded before the server module so the profiler can observe everything else.
+"""
+import os
+import sys
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+_TRUE = {"1", "true", "yes", "on"}
+
+# Imports faster than this are left out of the report to keep it readable
+_REPORT_MIN_US = 1000
+
+
+def env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in _TRUE
+
+
+class _ImportRecord:
+    __slots__ = ("name", "depth", "self_us", "cumulative_us")
+
+    def __init__(self, name: str, depth: int, self_us: int, cumulative_us: int) -> None:
+        self.name = name
+        self.depth = depth
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+
+
+class StartupProfile:
+    """Import timings and named phase marks, reported once after the first tools/list."""
+
+    def __init__(self, destination: str) -> None:
+        self.destination = destination
+        self.started = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+        self.imports: List[_ImportRecord] = []
+        self.reported = False
+        # Child time accumulated for each module currently executing
+        self._stack: List[List[int]] = []
+
+    # ---- import timing ----
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Builtin and frozen importers are shared classes; only per-module loaders are wrapped
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                loader.exec_module = self._timed(fullname, loader.exec_module)
+            return spec
+        return None
+
+    def _timed(self, fullname: str, exec_module: Callable[[Any], None]) -> Callable[[Any], None]:
+        def exec_timed(module: Any) -> None:
+            depth = len(self._stack)
+            self._stack.append([0])
+            start = time.perf_counter_ns()
+            try:
+                exec_module(module)
+            finally:
+                cumulative = (time.perf_counter_ns() - start) // 1000
+                children = self._stack.pop()[0]
+                if self._stack:
+                    self._stack[-1][0] += cumulative
+                self.imports.append(_ImportRecord(fullname, depth, cumulative - children, cumulative))
+        return exec_timed
+
+    # ---- phases ----
+    def mark(self, name: str) -> None:
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self) -> str:
+        lines = ["mcp-osxphotos startup profile"]
+        previous = self.started
+        for name, at in self.marks:
+            lines.append(f"  {name:<28} {1000 * (at - self.started):9.1f} ms  (+{1000 * (at - previous):.1f} ms)")
+            previous = at
+        lines.append("import time:     self [us] |  cumulative | imported package")
+        for rec in self.imports:
+            if rec.cumulative_us < _REPORT_MIN_US:
+                continue
+            lines.append(f"import time: {rec.self_us:>13} | {rec.cumulative_us:>11} | {'  ' * rec.depth}{rec.name}")
+        return "\n".join(lines) + "\n"
+
+    def finish(self) -> None:
+        """Stop timing imports and write the report (once)."""
+        if self.reported:
+            return
+        self.reported = True
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        text = self.report()
+        if self.destination.strip().lower() in _TRUE:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+            return
+        try:
+            with open(os.path.expanduser(self.destination), "w", encoding="utf-8") as fh:
+                fh.write(text)
+        except OSError as e:
+            sys.stderr.write(f"mcp-osxphotos: could not write startup profile: {e}\n{text}")
+
+
+_profile: Optional[StartupProfile] = None
+
+
+def start_profile() -> Optional[StartupProfile]:
+    """Start profiling if MCP_OSXPHOTOS_PROFILE_STARTUP is set; idempotent."""
+    global _profile
+    destination = os.environ.get("MCP_OSXPHOTOS_PROFILE_STARTUP", "").strip()
+    if _profile is None and destination and destination.lower() not in {"0", "false", "no", "off"}:
+        _profile = StartupProfile(destination)
+        sys.meta_path.insert(0, _profile)  # type: ignore[arg-type]
+        _profile.mark("entrypoint")
+    return _profile
+
+
+def mark(name: str) -> None:
+    if _profile is not None and not _profile.reported:
+        _profile.mark(name)
+
+
+def first_list_tools() -> None:
+    """Called after every tools/list response; reports the profile the first time."""
+    if _profile is not None and not _profile.reported:
+        _profile.mark("first tools/list response")
+        _profile.finish()
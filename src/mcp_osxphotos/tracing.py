@@ -0,0 +1,218 @@
+"""Local span tracing in the Chrome trace-event format.
+
+With MCP_OSXPHOTOS_TRACE_FILE set, the server appends one trace event per line to that
+file: a tool call is broken down into argument validation, argv building, the wait for
+a library lock and a concurrency slot, the osxphotos spawn, the child's run time,
+output decoding and parsing, and result serialization. The file is a JSON array whose
+closing bracket is left out, which the trace-event format allows, so it can be
+appended to across server restarts and opened as is in https://ui.perfetto.dev or
+``chrome://tracing``.
+
+Each tool call gets its own track (a trace "thread") named after the tool, so
+concurrent calls show side by side. Nothing is sent anywhere. When tracing is off,
+`span` returns a shared no-op context manager and the tool wrapper adds one attribute
+check per call.
+"""
+import contextlib
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional, TextIO
+
+_NOOP: ContextManager[None] = contextlib.nullcontext()
+
+
+class _Call:
+    """An MCP tools/call request; the tool wrapper fills in when the function ran."""
+
+    __slots__ = ("name", "track", "started", "fn_started", "fn_ended")
+
+    def __init__(self, name: str, track: int) -> None:
+        self.name = name
+        self.track = track
+        self.started = _now()
+        self.fn_started: Optional[float] = None
+        self.fn_ended: Optional[float] = None
+
+
+# Track of the tool call being traced, and the tools/call request it belongs to
+_track: "ContextVar[Optional[int]]" = ContextVar("mcp_osxphotos_trace_track", default=None)
+_call: "ContextVar[Optional[_Call]]" = ContextVar("mcp_osxphotos_trace_call", default=None)
+
+
+def _now() -> float:
+    """Microseconds on the trace clock."""
+    return time.perf_counter_ns() / 1000
+
+
+class Tracer:
+    """Writes complete ("X") events for spans to a trace file, if one is configured."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self.enabled = bool(path)
+        self._fh: Optional[TextIO] = None
+        self._lock = threading.Lock()
+        self._tracks = itertools.count(1)
+        self._pid = os.getpid()
+
+    # ---- recording ----
+    def span(self, name: str, cat: str = "server", **args: Any) -> ContextManager[None]:
+        """Context manager timing its body as span `name`; a no-op when disabled."""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, cat, args)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, cat: str, args: Dict[str, Any]) -> Iterator[None]:
+        started = _now()
+        try:
+            yield
+        finally:
+            self.complete(name, started, _now(), cat, **args)
+
+    def complete(self, name: str, started: float, ended: float, cat: str = "server", **args: Any) -> None:
+        """Record span `name` from `started` to `ended` (values of `now()`) on the current track."""
+        if not self.enabled:
+            return
+        track = _track.get()
+        event = {
+            "name": name, "cat": cat, "ph": "X", "ts": round(started, 3), "dur": round(ended - started, 3),
+            "pid": self._pid, "tid": track if track is not None else 0,
+        }
+        if args:
+            event["args"] = args
+        self._write(event)
+
+    def now(self) -> float:
+        return _now()
+
+    def _new_track(self, label: str) -> int:
+        track = next(self._tracks)
+        self._write({
+            "name": "thread_name", "ph": "M", "pid": self._pid, "tid": track, "args": {"name": f"{label} #{track}"},
+        })
+        return track
+
+    # ---- tool calls ----
+    @contextlib.contextmanager
+    def call(self, name: str) -> Iterator[None]:
+        """Trace an MCP tools/call request for tool `name` on a new track.
+
+        The time before the tool function starts is reported as argument validation and
+        the time after it returns as result serialization.
+        """
+        if not self.enabled:
+            yield
+            return
+        call = _Call(name, self._new_track(name))
+        track_token = _track.set(call.track)
+        call_token = _call.set(call)
+        try:
+            yield
+        finally:
+            ended = _now()
+            if call.fn_started is not None:
+                self.complete("validate_arguments", call.started, call.fn_started, "mcp")
+            if call.fn_ended is not None:
+                self.complete("serialize_result", call.fn_ended, ended, "mcp")
+            self.complete(f"tools/call {name}", call.started, ended, "mcp")
+            _call.reset(call_token)
+            _track.reset(track_token)
+            self.flush()
+
+    def instrument(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap tool function `fn` in a span named after it.
+
+        Inside a traced tools/call request the span shares the request's track; called
+        any other way (a background job, another tool) it starts a track of its own.
+        """
+        name = fn.__name__
+
+        def enter() -> Any:
+            call = _call.get()
+            if call is not None and call.name == name and call.fn_started is None:
+                call.fn_started = _now()
+                return call, None
+            return None, _track.set(self._new_track(name))
+
+        def leave(call: Optional[_Call], token: Any, started: float) -> None:
+            ended = _now()
+            self.complete(f"tool {name}", started, ended, "tool")
+            if call is not None:
+                call.fn_ended = ended
+            else:
+                _track.reset(token)
+                self.flush()
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return await fn(*args, **kwargs)
+                call, token = enter()
+                started = _now()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    leave(call, token, started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            call, token = enter()
+            started = _now()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                leave(call, token, started)
+        return wrapper
+
+    # ---- output ----
+    def _write(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, separators=(",", ":"), default=str) + ",\n"
+        with self._lock:
+            if self._fh is None:
+                if not self._open():
+                    return
+            assert self._fh is not None
+            self._fh.write(line)
+
+    def _open(self) -> bool:
+        assert self.path is not None
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if self._fh.tell() == 0:
+                self._fh.write("[\n")
+        except OSError:
+            # Tracing is a debugging aid: a bad path turns it off instead of failing calls
+            self.enabled = False
+            return False
+        return True
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                try:
+                    self._fh.flush()
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                try:
+                    self._fh.close()
+                except OSError:
+                    pass
+                self._fh = None
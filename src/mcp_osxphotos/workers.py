@@ -0,0 +1,212 @@
+"""Pool of warm osxphotos worker processes.
+
+Each worker runs `osxphotos_worker.py` under the Python interpreter osxphotos is
+installed into, imports osxphotos once and then executes CLI commands in-process,
+exchanging JSON lines over its stdin/stdout pipes. Workers are recycled after a number
+of jobs or once their peak RSS passes a limit. When no worker can be started, the pool
+reports itself unavailable and callers fall back to spawning `osxphotos` directly.
+"""
+import asyncio
+import json
+import os
+import shutil
+import signal
+from typing import List, Optional, Tuple
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "osxphotos_worker.py")
+
+# Responses carry the full command output on a single line
+_STREAM_LIMIT = 256 * 1024 * 1024
+_STARTUP_TIMEOUT = 120.0
+_SHUTDOWN_TIMEOUT = 5.0
+
+
+class WorkerError(Exception):
+    """A worker could not be started or died while running a job."""
+
+
+def osxphotos_python(bin_path: str) -> Optional[str]:
+    """Return the Python interpreter that runs the osxphotos script at `bin_path`.
+
+    MCP_OSXPHOTOS_WORKER_PYTHON overrides discovery. Otherwise the script's shebang is
+    used; returns None for frozen binaries or anything that is not a Python script.
+    """
+    override = os.environ.get("MCP_OSXPHOTOS_WORKER_PYTHON")
+    if override:
+        return override
+    try:
+        with open(bin_path, "rb") as fh:
+            first = fh.readline(1024)
+    except OSError:
+        return None
+    if not first.startswith(b"#!"):
+        return None
+    parts = first[2:].decode(errors="replace").split()
+    if not parts:
+        return None
+    interpreter: Optional[str] = parts[0]
+    if os.path.basename(parts[0]) == "env" and len(parts) > 1:
+        interpreter = shutil.which(parts[1])
+    if not interpreter or "python" not in os.path.basename(interpreter):
+        return None
+    return interpreter
+
+
+class _Worker:
+    def __init__(self, proc: asyncio.subprocess.Process) -> None:
+        self.proc = proc
+        self.jobs = 0
+        self.max_rss = 0
+        self._next_id = 0
+
+    @classmethod
+    async def start(cls, python: str) -> "_Worker":
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                python,
+                WORKER_SCRIPT,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                limit=_STREAM_LIMIT,
+                # Own process group, so exiftool and other children die with the worker
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise WorkerError(f"could not start worker with {python}: {e}") from e
+        worker = cls(proc)
+        try:
+            hello = await asyncio.wait_for(worker._read(), _STARTUP_TIMEOUT)
+        except (asyncio.TimeoutError, WorkerError) as e:
+            await worker.close()
+            raise WorkerError(f"worker did not start: {e}") from e
+        if not hello.get("ready"):
+            await worker.close()
+            raise WorkerError(f"worker could not import osxphotos: {hello.get('error')}")
+        return worker
+
+    async def _read(self) -> dict:
+        assert self.proc.stdout is not None
+        line = await self.proc.stdout.readline()
+        if not line:
+            raise WorkerError(f"worker exited with status {await self.proc.wait()}")
+        return json.loads(line)
+
+    async def run(self, argv: List[str]) -> Tuple[int, str, str]:
+        assert self.proc.stdin is not None
+        self._next_id += 1
+        request = {"id": self._next_id, "argv": argv}
+        try:
+            self.proc.stdin.write((json.dumps(request) + "\n").encode())
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise WorkerError(f"worker pipe closed: {e}") from e
+        response = await self._read()
+        self.jobs += 1
+        self.max_rss = max(self.max_rss, int(response.get("max_rss") or 0))
+        return int(response.get("returncode", 1)), response.get("stdout", ""), response.get("stderr", "")
+
+    def kill(self) -> None:
+        """Kill the worker and every process it started."""
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def close(self) -> None:
+        if self.proc.returncode is not None:
+            return
+        if self.proc.stdin is not None and not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), _SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.kill()
+            await self.proc.wait()
+
+
+class WorkerPool:
+    """Bounded pool of warm workers; `run` returns None when workers are unavailable."""
+
+    def __init__(self, python: str, size: int, max_jobs: int, max_rss: int) -> None:
+        self.python = python
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        self.available = True
+        self.error: Optional[str] = None
+        self._idle: List[_Worker] = []
+        self._count = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+    async def _acquire(self) -> Optional[_Worker]:
+        async with self._cond:
+            while True:
+                if not self.available or self._closed:
+                    return None
+                if self._idle:
+                    return self._idle.pop()
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                await self._cond.wait()
+        try:
+            return await _Worker.start(self.python)
+        except WorkerError as e:
+            async with self._cond:
+                self._count -= 1
+                self.available = False
+                self.error = str(e)
+                self._cond.notify_all()
+            return None
+
+    async def _release(self, worker: _Worker, healthy: bool) -> None:
+        async with self._cond:
+            recycle = not healthy or self._closed or worker.jobs >= self.max_jobs or worker.max_rss > self.max_rss
+            if recycle:
+                self._count -= 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+        if recycle:
+            await worker.close()
+
+    async def run(self, argv: List[str]) -> Optional[Tuple[int, str, str]]:
+        """Run `osxphotos <argv>` on a warm worker; None means use a plain subprocess."""
+        worker = await self._acquire()
+        if worker is None:
+            return None
+        try:
+            result = await worker.run(argv)
+        except WorkerError as e:
+            await self._release(worker, healthy=False)
+            # The job may have partially run, so do not retry it in a subprocess
+            return 1, "", f"osxphotos worker failed: {e}"
+        except BaseException:
+            # Cancelled or timed out mid-job: the worker's state is unknown, replace it
+            worker.kill()
+            # Released from a separate task: a cancelled request cannot await anything
+            asyncio.get_running_loop().create_task(self._release(worker, healthy=False))
+            raise
+        await self._release(worker, healthy=True)
+        return result
+
+    def status(self) -> dict:
+        return {
+            "size": self.size,
+            "running": self._count,
+            "idle": len(self._idle),
+            "available": self.available,
+            "error": self.error,
+            "python": self.python,
+        }
+
+    async def close(self) -> None:
+        """Stop the idle workers; busy ones stop when their job ends, and no new ones start."""
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+        for worker in idle:
+            await worker.close()
@@ -0,0 +1,40 @@
+"""Helpers for tests that need a fake `osxphotos` executable.
+
+The stub is a small Python script written to a temporary directory; tests patch
+`server._resolved_osxphotos_path` so tools spawn it instead of the real CLI.
+"""
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+from unittest import mock
+
+# Default behavior: `sleep SECONDS` sleeps, `fail` exits non-zero, anything else is echoed
+DEFAULT_STUB_BODY = """
+import sys, time
+args = sys.argv[1:]
+if args and args[0] == "sleep":
+    time.sleep(float(args[1]))
+if args and args[0] == "fail":
+    sys.stderr.write("boom\\n")
+    sys.exit(2)
+print(" ".join(args))
+"""
+
+
+def install_stub(testcase, body: str = DEFAULT_STUB_BODY) -> str:
+    """Write a stub osxphotos script and point the server at it for the test's duration."""
+    from mcp_osxphotos import server
+
+    tmp = tempfile.TemporaryDirectory()
+    testcase.addCleanup(tmp.cleanup)
+    path = os.path.join(tmp.name, "osxphotos")
+    with open(path, "w") as fh:
+        fh.write(f"#!{sys.executable}\n")
+        fh.write(textwrap.dedent(body))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    patcher = mock.patch.object(server, "_resolved_osxphotos_path", path)
+    patcher.start()
+    testcase.addCleanup(patcher.stop)
+    return path
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+# Ensure src/ is on sys.path so we can import the package in editable/dev mode
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+
+class TestAsyncRunner(unittest.TestCase):
+    def setUp(self):
+        install_stub(self)
+
+    def test_returns_stdout(self):
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", "albums", "--json"]))
+        self.assertEqual(out.strip(), "albums --json")
+
+    def test_error_returns_stderr(self):
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", "fail"]))
+        self.assertTrue(out.startswith("Error: "))
+        self.assertIn("boom", out)
+
+    def test_fast_call_not_blocked_by_slow_call(self):
+        async def scenario():
+            slow = asyncio.create_task(server.run_osxphotos_command(["osxphotos", "sleep", "2"]))
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            out = await server.run_osxphotos_command(["osxphotos", "keywords"])
+            elapsed = time.monotonic() - start
+            await slow
+            return out, elapsed
+
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_MAX_CONCURRENCY": "2"}):
+            out, elapsed = asyncio.run(scenario())
+        self.assertEqual(out.strip(), "keywords")
+        self.assertLess(elapsed, 1.5)
+
+    def test_concurrency_limit(self):
+        async def scenario():
+            start = time.monotonic()
+            await asyncio.gather(*[
+                server.run_osxphotos_command(["osxphotos", "sleep", "0.3"]) for _ in range(2)
+            ])
+            return time.monotonic() - start
+
+        # Identical commands would otherwise share one process
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_MAX_CONCURRENCY": "1", "MCP_OSXPHOTOS_COALESCE": "0"}):
+            elapsed = asyncio.run(scenario())
+        # Two 0.3s commands serialized by a limit of one
+        self.assertGreaterEqual(elapsed, 0.6)
+
+    def test_tools_are_coroutines(self):
+        self.assertTrue(asyncio.iscoroutinefunction(server.albums))
+        self.assertTrue(asyncio.iscoroutinefunction(server.export_photos))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,54 @@
+import asyncio
 import json
 import os
 import sys
+import tempfile
 import unittest
+from unittest import mock
 
 # Ensure src/ is on sys.path so we can import the package in editable/dev mode
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
 if SRC_DIR not in sys.path:
     sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
 
 from mcp_osxphotos import server  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Sleeps longer for earlier UUIDs so completion order is the reverse of input order
+REVERSE_DELAY_STUB = """
+import sys, time
+args = sys.argv[1:]
+uuid = args[args.index("--uuid") + 1]
+time.sleep(0.3 - 0.1 * int(uuid.split("-")[-1]))
+print(" ".join(args))
+"""
+
+# Appends "start" to $STUB_LOG, waits (at most 10s) until $STUB_EXPECTED processes have
+# started, then appends "end": concurrent runs log every start before any end
+BARRIER_STUB = """
+import os, time
+log, expected = os.environ["STUB_LOG"], int(os.environ["STUB_EXPECTED"])
+def events():
+    with open(log) as fh:
+        return fh.read().split()
+with open(log, "a") as fh:
+    fh.write("start\\n")
+deadline = time.monotonic() + 10
+while events().count("start") < expected and time.monotonic() < deadline:
+    time.sleep(0.01)
+with open(log, "a") as fh:
+    fh.write("end\\n")
+"""
 
 
 class TestBatchEditByUUID(unittest.TestCase):
     def test_smoke_invocation(self):
         # Dry run to avoid real changes; expect JSON array string
-        out = server.batch_edit_by_uuid(uuid=["FAKE-UUID-1", "FAKE-UUID-2"], metadata="all", dry_run=True)
+        out = asyncio.run(server.batch_edit_by_uuid(uuid=["FAKE-UUID-1", "FAKE-UUID-2"], metadata="all", dry_run=True))
         self.assertIsInstance(out, str)
         # Should be valid JSON (list of objects with uuid/result)
         try:
@@ -30,5 +63,39 @@ class TestBatchEditByUUID(unittest.TestCase):
             self.assertIn("result", entry)
 
 
+class TestBatchEditByUUIDParallel(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, REVERSE_DELAY_STUB)
+        # Lift the global process limit so the per-tool max_workers is what bounds fan-out
+        patcher = mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_MAX_CONCURRENCY": "8"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_keep_input_order_with_timing(self):
+        uuids = ["U-0", "U-1", "U-2"]
+        out = asyncio.run(server.batch_edit_by_uuid(uuid=uuids, keyword=["animal"], max_workers=3))
+        data = json.loads(out)
+        self.assertEqual([entry["uuid"] for entry in data], uuids)
+        for entry in data:
+            self.assertIsInstance(entry["elapsed_seconds"], float)
+            self.assertIn("push-exif all", entry["result"])
+            self.assertIn("--keyword animal", entry["result"])
+            self.assertIn(f"--uuid {entry['uuid']}", entry["result"])
+            self.assertNotIn("--max-workers", entry["result"])
+            self.assertNotIn("--metadata", entry["result"])
+
+    def test_runs_concurrently(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        log = os.path.join(tmp.name, "log")
+        install_stub(self, BARRIER_STUB)
+        with mock.patch.dict(os.environ, {"STUB_LOG": log, "STUB_EXPECTED": "3"}):
+            asyncio.run(server.batch_edit_by_uuid(uuid=["U-0", "U-1", "U-2"], max_workers=3, chunk_size=1))
+        with open(log) as fh:
+            events = fh.read().split()
+        # All three were running at once: every process started before any finished
+        self.assertEqual(events, ["start"] * 3 + ["end"] * 3)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Ensure src/ is on sys.path so we can import the package in editable/dev mode
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.cache import ResultCache, library_fingerprint, resolve_library  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Appends each invocation to $STUB_CALLS so tests can count process spawns
+COUNTING_STUB = """
+import os, sys
+with open(os.environ["STUB_CALLS"], "a") as fh:
+    fh.write(" ".join(sys.argv[1:]) + "\\n")
+print(" ".join(sys.argv[1:]))
+"""
+
+
+def make_library(root):
+    library = os.path.join(root, "Test.photoslibrary")
+    os.makedirs(os.path.join(library, "database"))
+    with open(os.path.join(library, "database", "Photos.sqlite"), "w") as fh:
+        fh.write("db")
+    return library
+
+
+class TestResultCache(unittest.TestCase):
+    def test_hit_requires_matching_fingerprint(self):
+        cache = ResultCache()
+        cache.put(("a",), "/lib", ((1, 2),), "out")
+        self.assertEqual(cache.get(("a",), ((1, 2),)), "out")
+        self.assertIsNone(cache.get(("a",), ((1, 3),)))
+        # Stale entry was dropped on the mismatch
+        self.assertIsNone(cache.get(("a",), ((1, 2),)))
+
+    def test_ttl_expiry(self):
+        cache = ResultCache(ttl=0.05)
+        cache.put(("a",), None, None, "out")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(("a",), None))
+
+    def test_lru_eviction_by_count_and_size(self):
+        cache = ResultCache(max_entries=2)
+        cache.put(("a",), None, None, "1")
+        cache.put(("b",), None, None, "2")
+        cache.get(("a",), None)
+        cache.put(("c",), None, None, "3")
+        self.assertIsNone(cache.get(("b",), None))
+        self.assertEqual(cache.get(("a",), None), "1")
+
+        cache = ResultCache(max_bytes=10)
+        cache.put(("a",), None, None, "x" * 6)
+        cache.put(("b",), None, None, "y" * 6)
+        self.assertIsNone(cache.get(("a",), None))
+        self.assertEqual(cache.stats()["bytes"], 6)
+
+    def test_invalidate_library(self):
+        cache = ResultCache()
+        cache.put(("a",), "/lib1", None, "1")
+        cache.put(("b",), "/lib2", None, "2")
+        self.assertEqual(cache.invalidate_library("/lib1"), 1)
+        self.assertIsNone(cache.get(("a",), None))
+        self.assertEqual(cache.get(("b",), None), "2")
+
+    def test_library_fingerprint_tracks_wal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            library = make_library(tmp)
+            before = library_fingerprint(library)
+            self.assertIsNotNone(before)
+            with open(os.path.join(library, "database", "Photos.sqlite-wal"), "w") as fh:
+                fh.write("changes")
+            self.assertNotEqual(before, library_fingerprint(library))
+            self.assertIsNone(library_fingerprint(os.path.join(tmp, "missing")))
+
+
+class TestCachedTools(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, COUNTING_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.library = make_library(tmp.name)
+        self.calls = os.path.join(tmp.name, "calls.txt")
+        env = mock.patch.dict(os.environ, {"STUB_CALLS": self.calls})
+        env.start()
+        self.addCleanup(env.stop)
+        cache = mock.patch.object(server, "_result_cache", ResultCache())
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def _spawns(self):
+        if not os.path.exists(self.calls):
+            return 0
+        with open(self.calls) as fh:
+            return len(fh.readlines())
+
+    def test_repeated_listing_served_from_cache(self):
+        first = asyncio.run(server.albums(library=self.library, json=True))
+        second = asyncio.run(server.albums(library=self.library, json=True))
+        self.assertEqual(first, second)
+        self.assertEqual(self._spawns(), 1)
+        # Different arguments are a different key
+        asyncio.run(server.albums(library=self.library))
+        self.assertEqual(self._spawns(), 2)
+
+    def test_library_change_invalidates(self):
+        asyncio.run(server.keywords(library=self.library))
+        with open(os.path.join(self.library, "database", "Photos.sqlite-wal"), "w") as fh:
+            fh.write("changes")
+        asyncio.run(server.keywords(library=self.library))
+        self.assertEqual(self._spawns(), 2)
+
+    def test_mutating_tool_invalidates_library(self):
+        asyncio.run(server.persons(library=self.library, json=True))
+        asyncio.run(server.push_exif(metadata="all", library=self.library, uuid=["U1"]))
+        self.assertEqual(server._result_cache.stats()["entries"], 0)
+        asyncio.run(server.persons(library=self.library, json=True))
+        self.assertEqual(self._spawns(), 3)
+
+    def test_resolve_library_default(self):
+        self.assertTrue(resolve_library(None).endswith("Photos Library.photoslibrary"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Ensure src/ is on sys.path so we can import the package in editable/dev mode
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.chunking import ChunkCostModel, MAX_CHUNK_SIZE  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Prints one line per --uuid so per-UUID results can be extracted from a chunk
+PER_UUID_STUB = """
+import os, sys
+args = sys.argv[1:]
+uuids = [args[i + 1] for i, a in enumerate(args) if a == "--uuid"]
+with open(os.environ["STUB_CALLS"], "a") as fh:
+    fh.write(str(len(uuids)) + "\\n")
+for u in uuids:
+    print("processed " + u)
+print("summary: %d photos" % len(uuids))
+"""
+
+
+class TestChunkCostModel(unittest.TestCase):
+    def test_priors_before_samples(self):
+        model = ChunkCostModel(startup_cost=1.0, per_item_cost=0.1)
+        self.assertEqual(model.estimate(), (1.0, 0.1))
+
+    def test_fits_startup_and_per_item_cost(self):
+        model = ChunkCostModel()
+        for n in (1, 10, 50, 100):
+            model.record(n, 3.0 + 0.02 * n)
+        startup, per_item = model.estimate()
+        self.assertAlmostEqual(startup, 3.0, places=6)
+        self.assertAlmostEqual(per_item, 0.02, places=6)
+
+    def test_expensive_startup_means_bigger_chunks(self):
+        cheap = ChunkCostModel(startup_cost=0.1, per_item_cost=0.1)
+        costly = ChunkCostModel(startup_cost=5.0, per_item_cost=0.1)
+        self.assertLess(cheap.chunk_size(10_000, 4), costly.chunk_size(10_000, 4))
+
+    def test_chunk_size_bounds(self):
+        model = ChunkCostModel(startup_cost=100.0, per_item_cost=0.001)
+        self.assertEqual(model.chunk_size(100_000, 1), MAX_CHUNK_SIZE)
+        # Never larger than an even split across workers
+        self.assertEqual(model.chunk_size(40, 4), 10)
+        self.assertEqual(model.chunk_size(0, 4), 0)
+        self.assertEqual(ChunkCostModel(startup_cost=0.0001, per_item_cost=10).chunk_size(5, 1), 1)
+
+
+class TestBatchEditByUUIDChunked(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, PER_UUID_STUB)
+        self.calls = os.path.join(os.path.dirname(server._resolved_osxphotos_path or ""), "calls.txt")
+        patcher = mock.patch.dict(os.environ, {"STUB_CALLS": self.calls, "MCP_OSXPHOTOS_MAX_CONCURRENCY": "4"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call_sizes(self):
+        with open(self.calls) as fh:
+            return sorted(int(line) for line in fh)
+
+    def test_explicit_chunk_size(self):
+        uuids = [f"U-{i}" for i in range(5)]
+        out = asyncio.run(server.batch_edit_by_uuid(uuid=uuids, chunk_size=2, max_workers=2))
+        data = json.loads(out)
+        self.assertEqual([entry["uuid"] for entry in data], uuids)
+        self.assertEqual(self._call_sizes(), [1, 2, 2])
+        for entry in data:
+            self.assertEqual(set(entry), {"uuid", "result", "elapsed_seconds"})
+            self.assertEqual(entry["result"].splitlines()[0], f"processed {entry['uuid']}")
+
+    def test_auto_chunking_packs_uuids(self):
+        uuids = [f"U-{i}" for i in range(40)]
+        with mock.patch.object(server, "_push_exif_cost_model", ChunkCostModel(startup_cost=2.0, per_item_cost=0.01)):
+            out = asyncio.run(server.batch_edit_by_uuid(uuid=uuids, max_workers=2))
+        self.assertEqual(len(json.loads(out)), 40)
+        sizes = self._call_sizes()
+        self.assertEqual(sum(sizes), 40)
+        # Expensive startup relative to per-item cost: the first chunk takes an even share
+        # and later chunks shrink with the remaining work (guided self-scheduling)
+        self.assertEqual(max(sizes), 20)
+        self.assertLess(len(sizes), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.export_shards import PER_PHOTO_COST, merge_export_dbs, plan_shards  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+MB = 1000 * 1000
+
+# `query --json`: five photos, "big" being by far the largest; the stub logs its argv.
+# `export DEST --uuid-from-file F --exportdb DB`: logs the uuids, records each photo in
+# DB (run 2 with --update) and fails if it was given the uuid "bad".
+EXPORT_STUB = """
+import json, os, sqlite3, sys
+args = sys.argv[1:]
+photos = [("big", 50_000_000), ("a", 1_000_000), ("b", 1_000_000), ("c", 1_000_000), ("d", 1_000_000)]
+if os.environ.get("STUB_BAD"):
+    photos.append(("bad", 1_000_000))
+def value(flag):
+    return args[args.index(flag) + 1] if flag in args else None
+with open(os.environ["STUB_LOG"], "a") as fh:
+    if args[0] == "query":
+        fh.write("query " + " ".join(args[1:]) + "\\n")
+        print(json.dumps([{"uuid": u, "original_filesize": s} for u, s in photos]))
+        sys.exit(0)
+    with open(value("--uuid-from-file")) as uf:
+        uuids = sorted(line.strip() for line in uf if line.strip())
+    fh.write("export " + " ".join(uuids) + "\\n")
+db = sqlite3.connect(value("--exportdb"))
+db.execute("CREATE TABLE IF NOT EXISTS export_data (id INTEGER PRIMARY KEY, uuid TEXT UNIQUE, run INTEGER)")
+db.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, args TEXT)")
+db.execute("INSERT INTO runs (args) VALUES (?)", (" ".join(args),))
+print(f"Exporting {len(uuids)} photos")
+for u in uuids:
+    if u == "bad":
+        db.commit()
+        sys.stderr.write("export failed\\n")
+        sys.exit(1)
+    db.execute("INSERT OR REPLACE INTO export_data (uuid, run) VALUES (?, ?)", (u, 2 if "--update" in args else 1))
+    print(f"Exported {u}")
+db.commit()
+"""
+
+
+class TestPlanShards(unittest.TestCase):
+    def test_balanced_by_size(self):
+        photos = [("big", 50 * MB)] + [(f"p{i}", MB) for i in range(8)]
+        plan = plan_shards(photos, 2)
+        self.assertEqual([s.uuids for s in plan], [["big"], [f"p{i}" for i in range(8)]])
+        self.assertEqual([s.size for s in plan], [50 * MB, 8 * MB])
+
+    def test_equal_sizes_split_by_count_and_empty_shards_are_dropped(self):
+        photos = [(f"p{i}", 0) for i in range(5)]
+        self.assertEqual(sorted(len(s.uuids) for s in plan_shards(photos, 2)), [2, 3])
+        self.assertEqual(len(plan_shards(photos[:2], 4)), 2)
+        self.assertEqual(plan_shards([], 3), [])
+        self.assertGreater(PER_PHOTO_COST, 0)
+
+    def test_photos_with_the_same_file_name_share_a_shard(self):
+        photos = [
+            ("a", 10 * MB, "IMG_0001.JPG"),
+            ("b", 10 * MB, "IMG_0002.JPG"),
+            ("c", 10 * MB, "img_0001.heic"),
+            ("d", 10 * MB, "IMG_0003.JPG"),
+            ("e", 10 * MB, None),
+        ]
+        plan = plan_shards(photos, 4)
+        self.assertEqual(len(plan), 4)
+        self.assertIn(["a", "c"], [s.uuids for s in plan])
+        self.assertEqual(sorted(u for s in plan for u in s.uuids), ["a", "b", "c", "d", "e"])
+
+
+class TestMergeExportDbs(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def db(self, name, rows):
+        path = os.path.join(self.dir, name)
+        db = sqlite3.connect(path)
+        db.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, uuid TEXT UNIQUE, state TEXT)")
+        db.executemany("INSERT INTO files (uuid, state) VALUES (?, ?)", rows)
+        db.commit()
+        db.close()
+        return path
+
+    def rows(self, path):
+        db = sqlite3.connect(path)
+        try:
+            return sorted(db.execute("SELECT uuid, state FROM files"))
+        finally:
+            db.close()
+
+    def test_changes_from_every_shard_win_over_seeded_rows(self):
+        seed = [("a", "old"), ("b", "old")]
+        target = self.db("export.db", seed)
+        # Each shard starts from the seed; shard 0 updates a, shard 1 updates b and adds c
+        shard0 = self.db("shard-0.db", [("a", "new"), ("b", "old")])
+        shard1 = self.db("shard-1.db", [("a", "old"), ("b", "new"), ("c", "new")])
+        merge_export_dbs(target, [shard0, shard1, os.path.join(self.dir, "never-started.db")])
+        self.assertEqual(self.rows(target), [("a", "new"), ("b", "new"), ("c", "new")])
+        self.assertEqual(sorted(os.listdir(self.dir)), ["export.db"])
+
+    def test_without_a_seed_the_shards_are_combined(self):
+        target = os.path.join(self.dir, "export.db")
+        merge_export_dbs(target, [self.db("s0.db", [("a", "1")]), self.db("s1.db", [("b", "1")])])
+        self.assertEqual(self.rows(target), [("a", "1"), ("b", "1")])
+
+
+class TestShardedExport(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, EXPORT_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dest = os.path.join(tmp.name, "export")
+        self.log = os.path.join(tmp.name, "log")
+        env = mock.patch.dict(os.environ, {"STUB_LOG": self.log, "MCP_OSXPHOTOS_WORKERS": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def runs(self, kind):
+        with open(self.log) as fh:
+            return sorted(line.split()[1:] for line in fh if line.startswith(kind))
+
+    def export(self, **kwargs):
+        return asyncio.run(server.export_photos(dest=self.dest, shards=2, **kwargs))
+
+    def exported(self):
+        db = sqlite3.connect(os.path.join(self.dest, ".osxphotos_export.db"))
+        try:
+            return sorted(db.execute("SELECT uuid, run FROM export_data")), db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        finally:
+            db.close()
+
+    def test_shards_export_once_and_merge_their_databases(self):
+        out = self.export(keyword=["Travel"])
+        self.assertTrue(out.startswith("Sharded export: 5 photos (54.0 MB) in 2 shards of 1-4 photos"), out)
+        self.assertIn("[shard 1: 4 photos, 4.0 MB]", out)
+        self.assertEqual(self.runs("export"), [["a", "b", "c", "d"], ["big"]])
+        # Filters select the photos once; the shards only get their uuid files
+        self.assertEqual(self.runs("query"), [["--json", "--keyword", "Travel"]])
+        self.assertEqual(self.exported(), ([("a", 1), ("b", 1), ("big", 1), ("c", 1), ("d", 1)], 2))
+        self.assertEqual(os.listdir(self.dest), [".osxphotos_export.db"])
+
+        self.export(update=True)
+        self.assertEqual(self.exported(), ([("a", 2), ("b", 2), ("big", 2), ("c", 2), ("d", 2)], 4))
+
+    def test_limit_and_skip_uuid_are_applied_before_planning(self):
+        self.export(skip_uuid=["big"], limit=3)
+        self.assertEqual(sorted(sum(self.runs("export"), [])), ["a", "b", "c"])
+
+    def test_failed_shard_keeps_what_the_others_exported(self):
+        with mock.patch.dict(os.environ, {"STUB_BAD": "1"}):
+            out = self.export()
+        self.assertTrue(out.startswith("Error: 1 of 2 shards failed"), out)
+        uuids = [uuid for uuid, _run in self.exported()[0]]
+        self.assertIn("big", uuids)
+        self.assertNotIn("bad", uuids)
+
+    def test_a_raising_shard_stops_the_others_before_the_merge(self):
+        events = []
+
+        async def run(cmd, timeout=None, group=None):
+            if "shard-0" in " ".join(cmd):
+                await asyncio.sleep(0.01)
+                raise RuntimeError("shard crashed")
+            try:
+                await asyncio.sleep(5)
+            finally:
+                events.append("shard 1 stopped")
+
+        def merge(main_db, shard_dbs):
+            events.append("merged")
+
+        with mock.patch.object(server, "run_with_progress", run), \
+                mock.patch.object(server, "merge_export_dbs", merge):
+            with self.assertRaises(RuntimeError):
+                self.export()
+        self.assertEqual(events, ["shard 1 stopped", "merged"])
+
+    def test_unsplittable_options_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.export(cleanup=True)
+        with self.assertRaises(ValueError):
+            self.export(filename="{created.year}")
+        self.assertFalse(os.path.exists(self.log))
+
+
+if __name__ == "__main__":
+    unittest.main()
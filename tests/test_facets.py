@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.cache import ResultCache  # noqa: E402
+from mcp_osxphotos.facets import aggregate, facet_row  # noqa: E402
+from mcp_osxphotos.projection import JsonArrayParser  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+PHOTOS = [
+    {"uuid": "a", "date": "2024-05-01T10:00:00+02:00", "keywords": ["Lake", "Summer"], "persons": ["Alice", "Bob"],
+     "uti_original": "public.heic", "original_filesize": 300,
+     "exif_info": {"camera_make": "Apple", "camera_model": "iPhone 15 Pro"}},
+    {"uuid": "b", "date": "2023-12-31T23:30:00-05:00", "keywords": ["Lake"], "persons": ["Alice"],
+     "uti_original": "public.jpeg", "original_filesize": 200,
+     "exif_info": {"camera_make": "Canon", "camera_model": "Canon EOS R5"}},
+    {"uuid": "c", "date": "2024-01-02T08:00:00+00:00", "albums": ["Trip"], "uti": "public.jpeg",
+     "original_filesize": 100, "exif_info": {}},
+]
+
+# `query --json ...`: the photos above; logs argv
+QUERY_STUB = """
+import json, os, sys
+with open(os.environ["STUB_LOG"], "a") as fh:
+    fh.write(" ".join(sys.argv[1:]) + "\\n")
+print(json.dumps(json.loads(os.environ["STUB_PHOTOS"])))
+"""
+
+
+def facet_rows(output):
+    """Rows of `output` parsed the way the server does: streamed, one row per photo."""
+    rows = []
+    parser = JsonArrayParser(lambda photo: rows.append(facet_row(photo)))
+    parser.feed(output.encode())
+    parser.close()
+    return rows
+
+
+class TestAggregate(unittest.TestCase):
+    def setUp(self):
+        self.rows = facet_rows(json.dumps(PHOTOS))
+
+    def test_rows_keep_only_grouping_attributes(self):
+        row = facet_row(PHOTOS[1])
+        # The year is the one the photo was taken in locally, not in UTC
+        self.assertEqual((row.year, row.month, row.camera, row.size), ("2023", "2023-12", "Canon EOS R5", 200))
+        self.assertEqual(self.rows[0].camera, "Apple iPhone 15 Pro")
+        self.assertEqual((self.rows[2].uti, self.rows[2].camera, self.rows[2].person), ("public.jpeg", None, ()))
+        self.assertEqual(facet_rows(" "), [])
+
+    def test_groups_by_one_or_more_dimensions(self):
+        by_year = aggregate(self.rows, ["year"])
+        self.assertEqual((by_year["photos"], by_year["bytes"]), (3, 600))
+        self.assertEqual(by_year["groups"], [
+            {"year": "2023", "count": 1, "bytes": 200}, {"year": "2024", "count": 2, "bytes": 400},
+        ])
+        by_person = aggregate(self.rows, ["person"])["groups"]
+        self.assertEqual(by_person, [
+            {"person": "Alice", "count": 2, "bytes": 500},
+            {"person": "Bob", "count": 1, "bytes": 300},
+            {"person": None, "count": 1, "bytes": 100},
+        ])
+        crossed = aggregate(self.rows, ["year", "person", "year"])
+        self.assertEqual(crossed["by"], ["year", "person"])
+        self.assertIn({"year": "2024", "person": "Bob", "count": 1, "bytes": 300}, crossed["groups"])
+        self.assertEqual(len(crossed["groups"]), 4)
+
+    def test_limit_sums_the_rest(self):
+        result = aggregate(self.rows, ["uti"], limit=1)
+        self.assertEqual(result["groups"], [{"uti": "public.jpeg", "count": 2, "bytes": 300}])
+        self.assertEqual(result["other"], {"groups": 1, "count": 1, "bytes": 300})
+        with self.assertRaises(ValueError):
+            aggregate(self.rows, ["lens"])
+
+
+class TestPhotoFacetsTool(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, QUERY_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.library = os.path.join(tmp.name, "A.photoslibrary")
+        os.makedirs(os.path.join(self.library, "database"))
+        with open(os.path.join(self.library, "database", "Photos.sqlite"), "wb") as fh:
+            fh.write(b"v1")
+        self.log = os.path.join(tmp.name, "log")
+        patcher = mock.patch.object(server, "_result_cache", ResultCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = mock.patch.dict(os.environ, {
+            "STUB_LOG": self.log, "STUB_PHOTOS": json.dumps(PHOTOS), "MCP_OSXPHOTOS_WORKERS": "0",
+            "MCP_OSXPHOTOS_QUERY_INDEX": "0",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+    def runs(self):
+        with open(self.log) as fh:
+            return [line.split() for line in fh]
+
+    def test_schema_lists_the_query_filters(self):
+        tool = server.mcp._tool_manager.get_tool("photo_facets")
+        properties = tool.parameters["properties"]
+        self.assertIn("keyword", properties)
+        self.assertIn("from_date", properties)
+        self.assertNotIn("print_template", properties)
+        self.assertEqual(tool.parameters["required"], ["by"])
+
+    def test_breakdowns_of_one_selection_share_a_query(self):
+        by_year = json.loads(asyncio.run(server.photo_facets(["year"], library=self.library, keyword=["Lake"])))
+        self.assertEqual(by_year["photos"], 3)
+        result = asyncio.run(server.mcp.call_tool(
+            "photo_facets", {"by": ["camera"], "library": self.library, "keyword": ["Lake"]}
+        ))
+        text = result[0][0].text if isinstance(result, tuple) else result[0].text
+        self.assertEqual(json.loads(text)["groups"][0], {"camera": "Apple iPhone 15 Pro", "count": 1, "bytes": 300})
+        self.assertEqual(self.runs(), [["query", "--library", self.library, "--json", "--keyword", "Lake"]])
+        # Another selection runs its own query
+        asyncio.run(server.photo_facets(["year"], library=self.library))
+        self.assertEqual(len(self.runs()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.help_cache import HelpCache, parse_commands, parse_options  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+ROOT_HELP = """Usage: osxphotos [OPTIONS] COMMAND [ARGS]...
+
+  osxphotos: the multi-tool for your Photos library.
+
+Options:
+  -v, --version  Show the version and exit.
+  -h, --help     Show this message and exit.
+
+Commands:
+  albums         Print out albums found in the Photos library.
+  query          Query the Photos database using 1 or more search options;...
+"""
+
+QUERY_HELP = """Usage: osxphotos query [OPTIONS]
+
+  Query the Photos database.
+
+Options:
+  --library, --db PHOTOS_LIBRARY_PATH
+                                  Specify path to Photos library. If not
+                                  provided, will use the last library.
+  --keyword KEYWORD               Search for photos with keyword KEYWORD.
+  --favorite / --not-favorite     Search for photos marked favorite.
+  --json                          Print output in JSON format.
+  -V, --verbose                   Print verbose output.
+  -h, --help                      Show this message and exit.
+"""
+
+# Logs each invocation to $STUB_CALLS and prints canned help text
+HELP_STUB = f"""
+import os, sys
+args = sys.argv[1:]
+with open(os.environ["STUB_CALLS"], "a") as fh:
+    fh.write(" ".join(args) + "\\n")
+if args == ["--version"]:
+    print("osxphotos, version 0.99.0")
+elif args == ["--help"]:
+    print({ROOT_HELP!r})
+elif args == ["albums", "--help"]:
+    print("Usage: osxphotos albums [OPTIONS]\\n\\nOptions:\\n  --json  JSON.\\n  --library PATH  Library.\\n")
+elif args == ["query", "--help"]:
+    print({QUERY_HELP!r})
+elif args[:1] == ["help"]:
+    print("long help for " + (args[1] if len(args) > 1 else "osxphotos"))
+else:
+    print(" ".join(args))
+"""
+
+
+class TestHelpParsing(unittest.TestCase):
+    def test_parse_options(self):
+        self.assertEqual(
+            parse_options(QUERY_HELP),
+            {"--library", "--db", "--keyword", "--favorite", "--not-favorite", "--json", "-V", "--verbose", "-h", "--help"},
+        )
+
+    def test_parse_commands(self):
+        self.assertEqual(parse_commands(ROOT_HELP), ["albums", "query"])
+
+    def test_store_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HelpCache(tmp)
+            key = ("/bin/osxphotos", 1)
+            cache.set_version(key, "1.0")
+            ns = HelpCache.namespace(key, "1.0")
+            cache.put(ns, "options", "query", QUERY_HELP)
+            fresh = HelpCache(tmp)
+            self.assertEqual(fresh.version(key), "1.0")
+            self.assertIn("--keyword", fresh.options(ns, "query"))
+            self.assertIsNone(fresh.options(ns, "albums"))
+            self.assertNotEqual(HelpCache.namespace(key, "1.1"), ns)
+
+
+class TestServerHelpCache(unittest.TestCase):
+    def setUp(self):
+        self.bin = install_stub(self, HELP_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.calls = os.path.join(tmp.name, "calls")
+        env = mock.patch.dict(os.environ, {"STUB_CALLS": self.calls, "MCP_OSXPHOTOS_WORKERS": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        cache = mock.patch.object(server, "_help_cache", HelpCache(os.path.join(tmp.name, "help")))
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def spawned(self):
+        if not os.path.exists(self.calls):
+            return []
+        with open(self.calls) as fh:
+            return fh.read().splitlines()
+
+    def test_prewarm_then_serve_from_cache(self):
+        asyncio.run(server._prewarm_help())
+        self.assertEqual(self.spawned(), [
+            "--version", "--help", "help",
+            "albums --help", "help albums",
+            "query --help", "help query",
+        ])
+        asyncio.run(server._prewarm_help())
+        self.assertEqual(len(self.spawned()), 7)
+        self.assertEqual(asyncio.run(server.help_command("query")).strip(), "long help for query")
+        self.assertEqual(len(self.spawned()), 7)
+
+    def test_help_miss_is_cached(self):
+        first = asyncio.run(server.help_command("albums"))
+        second = asyncio.run(server.help_command("albums"))
+        self.assertEqual(first, second)
+        self.assertEqual(self.spawned(), ["--version", "help albums"])
+
+    def test_unknown_command_rejected_without_spawning(self):
+        asyncio.run(server._prewarm_help())
+        before = len(self.spawned())
+        with self.assertRaises(ValueError) as cm:
+            asyncio.run(server.help_command("qeury"))
+        self.assertIn("query", str(cm.exception))
+        self.assertEqual(len(self.spawned()), before)
+
+    def test_unknown_flag_rejected_without_spawning(self):
+        asyncio.run(server._prewarm_help())
+        before = len(self.spawned())
+        self.assertEqual(asyncio.run(server.query_photos(json=True, keyword=["a"])).strip(), "query --json --keyword a")
+        with self.assertRaises(ValueError) as cm:
+            asyncio.run(server.query_photos(json=True, not_favorite=True, count=True))
+        self.assertIn("--count", str(cm.exception))
+        self.assertNotIn("--not-favorite", str(cm.exception))
+        self.assertEqual(len(self.spawned()), before + 1)
+
+    def test_new_binary_disables_stale_validation(self):
+        asyncio.run(server._prewarm_help())
+        os.utime(self.bin, ns=(0, 1))
+        # The binary is checked again on a refresh (any help call does one); its version
+        # is unknown, so there is no validation and the call goes through
+        server._refresh_help_namespace()
+        self.assertEqual(asyncio.run(server.query_photos(count=True)).strip(), "query --count")
+
+    def test_argv_builds_reuse_the_namespace_and_misses(self):
+        asyncio.run(server._prewarm_help())
+        with mock.patch.object(server, "binary_key", wraps=server.binary_key) as key, \
+                mock.patch("builtins.open", wraps=open) as opened:
+            for _ in range(3):
+                server.build_argv("query_photos", {"json": True})
+                server.build_argv("albums", {"json": True})
+                # No help cached for this command: looked for on disk once
+                server.build_argv("labels", {"json": True})
+        self.assertEqual(key.call_count, 0)
+        self.assertEqual(opened.call_count, 1)
+
+    def test_no_validation_without_cached_help(self):
+        self.assertEqual(asyncio.run(server.query_photos(count=True)).strip(), "query --count")
+        self.assertEqual(self.spawned(), ["query --count"])
+
+
+if __name__ == "__main__":
+    unittest.main()
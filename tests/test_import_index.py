@@ -0,0 +1,159 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.import_index import ImportIndex, collect_files  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# `import FILE...`: log the files to $STUB_LOG, one run per line; a file named "bad.jpg" fails
+IMPORT_STUB = """
+import os, sys
+args = sys.argv[1:]
+files = [a for a in args[1:] if not a.startswith("-") and os.path.isfile(a)]
+with open(os.environ["STUB_LOG"], "a") as fh:
+    fh.write(" ".join(sorted(os.path.basename(f) for f in files)) + "\\n")
+if any(os.path.basename(f) == "bad.jpg" for f in files):
+    sys.stderr.write("import failed\\n")
+    sys.exit(1)
+for f in files:
+    print("Imported " + os.path.basename(f))
+"""
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+
+class TestImportIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = os.path.join(tmp.name, "card")
+        self.index = ImportIndex(os.path.join(tmp.name, "index.sqlite3"))
+        self.addCleanup(self.index.close)
+        _write(os.path.join(self.root, "IMG_1.jpg"), b"one")
+        _write(os.path.join(self.root, "IMG_1.xmp"), b"<xmp/>")
+        _write(os.path.join(self.root, ".hidden.jpg"), b"x")
+        _write(os.path.join(self.root, "sub", "IMG_2.heic"), b"two")
+        _write(os.path.join(self.root, "sub", "deeper", "IMG_3.mov"), b"three")
+
+    def names(self, paths):
+        return sorted(os.path.relpath(p, self.root) for p in paths)
+
+    def test_collect_files_honors_walk_and_glob(self):
+        with ThreadPoolExecutor(4) as pool:
+            self.assertEqual(self.names(collect_files([self.root], False, None, pool)), ["IMG_1.jpg"])
+            self.assertEqual(
+                self.names(collect_files([self.root], True, None, pool)),
+                ["IMG_1.jpg", "sub/IMG_2.heic", "sub/deeper/IMG_3.mov"],
+            )
+            self.assertEqual(self.names(collect_files([self.root], True, ["*.heic"], pool)), ["sub/IMG_2.heic"])
+            # Explicit files are not filtered by glob
+            explicit = os.path.join(self.root, "IMG_1.jpg")
+            self.assertEqual(self.names(collect_files([explicit], False, ["*.heic"], pool)), ["IMG_1.jpg"])
+
+    def test_scan_skips_imported_content(self):
+        first = self.index.scan("/lib", [self.root], walk=True)
+        self.assertEqual((len(first.files), len(first.new), first.hashed), (3, 3, 3))
+        self.index.record("/lib", {p: first.digests[p] for p in first.new[:2]})
+
+        second = self.index.scan("/lib", [self.root], walk=True)
+        self.assertEqual(self.names(second.new), ["sub/deeper/IMG_3.mov"])
+        self.assertEqual(second.hashed, 0)
+        # Another library has its own history
+        self.assertEqual(len(self.index.scan("/other", [self.root], walk=True).new), 3)
+
+        # Same content under a new name is still known; changed content is new
+        _write(os.path.join(self.root, "copy.jpg"), b"one")
+        _write(os.path.join(self.root, "sub", "IMG_2.heic"), b"two, edited")
+        third = self.index.scan("/lib", [self.root], walk=True)
+        self.assertEqual(self.names(third.new), ["sub/IMG_2.heic", "sub/deeper/IMG_3.mov"])
+        self.assertEqual(third.hashed, 2)
+
+    def test_files_sharing_a_stem_stay_together(self):
+        _write(os.path.join(self.root, "IMG_1.mov"), b"live video")
+        image = os.path.join(self.root, "IMG_1.jpg")
+        self.index.record("/lib", {image: self.index.scan("/lib", [self.root]).digests[image]})
+        _write(os.path.join(self.root, "IMG_1.mov"), b"live video, new")
+        self.assertEqual(self.names(self.index.scan("/lib", [self.root]).new), ["IMG_1.jpg", "IMG_1.mov"])
+
+
+class TestImportPhotosPreScan(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, IMPORT_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = os.path.join(tmp.name, "card")
+        self.log = os.path.join(tmp.name, "log")
+        self.library = os.path.join(tmp.name, "A.photoslibrary")
+        index = ImportIndex(os.path.join(tmp.name, "index.sqlite3"))
+        self.addCleanup(index.close)
+        patcher = mock.patch.object(server, "_import_index", index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = mock.patch.dict(os.environ, {"STUB_LOG": self.log, "MCP_OSXPHOTOS_WORKERS": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        for name in ("a.jpg", "b.jpg", "sub/c.jpg"):
+            _write(os.path.join(self.root, name), name.encode())
+
+    def runs(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as fh:
+            return [line.split() for line in fh]
+
+    def import_card(self, **kwargs):
+        return asyncio.run(server.import_photos(
+            files_or_dirs=[self.root], walk=True, skip_imported=True, library=self.library, **kwargs
+        ))
+
+    def test_only_new_files_are_imported(self):
+        first = self.import_card()
+        self.assertTrue(first.startswith("Pre-scan: 3 files, 0 already imported, 3 to import"), first)
+        self.assertIn("Imported c.jpg", first)
+        second = self.import_card()
+        self.assertTrue(second.startswith("Pre-scan: 3 files, 3 already imported, 0 to import"), second)
+        _write(os.path.join(self.root, "d.jpg"), b"d")
+        self.import_card()
+        self.assertEqual(self.runs(), [["a.jpg", "b.jpg", "c.jpg"], ["d.jpg"]])
+
+    def test_long_file_lists_are_split(self):
+        with mock.patch.object(server, "_IMPORT_ARGV_BYTES", 1):
+            self.import_card()
+        self.assertEqual(self.runs(), [["a.jpg"], ["b.jpg"], ["c.jpg"]])
+
+    def test_failed_and_dry_runs_are_not_recorded(self):
+        _write(os.path.join(self.root, "bad.jpg"), b"bad")
+        failed = self.import_card()
+        self.assertTrue(failed.startswith("Error: import failed"), failed)
+        os.remove(os.path.join(self.root, "bad.jpg"))
+        self.import_card(dry_run=True)
+        self.import_card()
+        self.assertEqual(len(self.runs()), 3)
+        self.assertEqual(self.runs()[-1], ["a.jpg", "b.jpg", "c.jpg"])
+
+    def test_without_skip_imported_the_tree_is_passed_through(self):
+        asyncio.run(server.import_photos(files_or_dirs=[self.root], walk=True, library=self.library))
+        asyncio.run(server.import_photos(files_or_dirs=[self.root], walk=True, library=self.library))
+        # The stub only logs files; a directory argument is passed as is
+        self.assertEqual(self.runs(), [[], []])
+
+
+if __name__ == "__main__":
+    unittest.main()
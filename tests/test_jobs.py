@@ -0,0 +1,253 @@
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import jobs, server  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# `export DEST`: report progress for three photos; DEST "hang" sleeps, "fail" exits 2
+JOB_STUB = """
+import sys, time
+args = sys.argv[1:]
+if args[:1] == ["export"]:
+    print("Exporting 3 photos to " + args[1], flush=True)
+    for name in ("a", "b", "c"):
+        print("Exported " + name + ".jpg", flush=True)
+        time.sleep(0.05)
+    if args[1] == "hang":
+        time.sleep(60)
+    if args[1] == "fail":
+        sys.stderr.write("disk full\\n")
+        sys.exit(2)
+    sys.exit(0)
+print(" ".join(args))
+"""
+
+
+async def _wait(job_id, states=("succeeded", "failed", "cancelled", "interrupted", "exited"), timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = json.loads(await server.job_status(job_id))
+        if status["state"] in states:
+            return status
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {status['state']}")
+
+
+def _reap(proc):
+    proc.kill()
+    proc.wait()
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, JOB_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = os.path.join(tmp.name, "jobs.sqlite3")
+        self.manager = jobs.JobManager(self.db, log_lines=4, kill_grace=0.5)
+        self.manager.sample_interval = 0.05
+        self.addCleanup(self.manager.close)
+        patcher = mock.patch.object(server, "_jobs", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def spawn_orphan(self):
+        proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"], start_new_session=True)
+        self.addCleanup(_reap, proc)
+        return proc
+
+    def test_job_runs_in_background(self):
+        async def scenario():
+            started = time.monotonic()
+            job = json.loads(await server.start_job("export_photos", {"dest": "out", "verbose": True}))
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertIn(job["state"], ("queued", "running"))
+            status = await _wait(job["job_id"])
+            output = json.loads(await server.job_output(job["job_id"]))
+            return status, output
+
+        status, output = asyncio.run(scenario())
+        self.assertEqual(status["state"], "succeeded")
+        self.assertEqual(status["exit_code"], 0)
+        self.assertEqual(status["progress"]["completed"], 3)
+        self.assertEqual(status["progress"]["total"], 3)
+        self.assertEqual(status["log_lines"], 4)
+        self.assertGreater(status["peak_rss_bytes"], 0)
+        self.assertEqual(output["lines"][0], "Exporting 3 photos to out")
+        self.assertIn("Exported c.jpg", output["result"])
+
+    def test_failed_job(self):
+        async def scenario():
+            job = json.loads(await server.start_job("export_photos", {"dest": "fail"}))
+            status = await _wait(job["job_id"])
+            return status, json.loads(await server.job_output(job["job_id"], since=3))
+
+        status, output = asyncio.run(scenario())
+        self.assertEqual(status["state"], "failed")
+        self.assertEqual(status["exit_code"], 2)
+        self.assertEqual(output["lines"], ["Exported c.jpg", "[stderr] disk full"])
+        self.assertTrue(output["result"].startswith("Error:"))
+
+    def test_log_ring_buffer(self):
+        job = jobs.Job("j", "export_photos", {}, log_lines=2)
+        for i in range(5):
+            job.add_line("stdout", f"line {i}")
+        out = job.output(since=1, limit=1)
+        self.assertEqual((out["first_line"], out["dropped"], out["lines"], out["next"]), (3, 2, ["line 3"], 4))
+
+    def test_cancel_kills_processes(self):
+        async def scenario():
+            job = json.loads(await server.start_job("export_photos", {"dest": "hang"}))
+            while not json.loads(await server.job_status(job["job_id"]))["pids"]:
+                await asyncio.sleep(0.02)
+            pid = json.loads(await server.job_status(job["job_id"]))["pids"][0]
+            cancelled = json.loads(await server.cancel_job(job["job_id"]))
+            status = await _wait(job["job_id"])
+            await asyncio.sleep(0.3)
+            return pid, cancelled, status
+
+        pid, cancelled, status = asyncio.run(scenario())
+        self.assertEqual(cancelled["state"], "cancelled")
+        self.assertEqual(status["state"], "cancelled")
+        self.assertIsNone(jobs.process_token(pid))
+        self.assertTrue(asyncio.run(server.cancel_job(cancelled["job_id"])).startswith("Error:"))
+
+    def test_status_survives_restart(self):
+        async def scenario():
+            job = json.loads(await server.start_job("export_photos", {"dest": "out"}))
+            await _wait(job["job_id"])
+            return job
+
+        job = asyncio.run(scenario())
+        fresh = jobs.JobManager(self.db)
+        self.addCleanup(fresh.close)
+        with mock.patch.object(server, "_jobs", fresh):
+            status = json.loads(asyncio.run(server.job_status(job["job_id"])))
+            listing = json.loads(asyncio.run(server.job_status()))
+        self.assertEqual(status["state"], "succeeded")
+        self.assertEqual(status["progress"]["completed"], 3)
+        self.assertEqual([j["job_id"] for j in listing], [job["job_id"]])
+
+    def test_orphans_are_reaped_on_startup(self):
+        proc = self.spawn_orphan()
+        job = jobs.Job("orphan", "export_photos", {"dest": "x"}, log_lines=4)
+        job.state = jobs.RUNNING
+        job.pids = {proc.pid: jobs.process_token(proc.pid)}
+        gone = jobs.Job("gone", "sync", {}, log_lines=4)
+        gone.state = jobs.RUNNING
+        gone.pids = {proc.pid: "not-this-process"}
+        self.manager.save(job)
+        self.manager.save(gone)
+        fresh = jobs.JobManager(self.db, kill_grace=0.5)
+        self.addCleanup(fresh.close)
+        changed = asyncio.run(fresh.recover())
+        self.assertEqual({j.id: j.state for j in changed}, {"orphan": "interrupted", "gone": "interrupted"})
+        proc.wait(timeout=5)
+        self.assertEqual(proc.returncode, -15)
+
+    def test_jobs_of_a_live_server_are_left_alone(self):
+        proc = self.spawn_orphan()
+        server_proc = self.spawn_orphan()
+        for job_id, owner in (("live", server_proc.pid), ("dead", proc.pid)):
+            job = jobs.Job(job_id, "export_photos", {"dest": job_id}, log_lines=4)
+            job.state = jobs.RUNNING
+            job.pids = {proc.pid: jobs.process_token(proc.pid)}
+            job.owner_pid = owner
+            # "dead" names a server whose pid was reused by another process
+            job.owner_token = jobs.process_token(owner) if job_id == "live" else "not-this-process"
+            self.manager.save(job)
+        fresh = jobs.JobManager(self.db, kill_grace=0.5)
+        self.addCleanup(fresh.close)
+        with mock.patch.object(jobs, "_signal_group") as signal_group:
+            changed = asyncio.run(fresh.recover())
+        self.assertEqual([j.id for j in changed], ["dead"])
+        self.assertEqual(fresh.get("live").state, "running")
+        self.assertEqual(fresh.get("live").owner_pid, server_proc.pid)
+        signal_group.assert_called_once_with(proc.pid, jobs.signal.SIGTERM)
+
+    def test_reaping_spares_a_reused_pid(self):
+        proc = self.spawn_orphan()
+        with mock.patch.object(jobs, "_signal_group") as signal_group:
+            # Recorded with another token: the pid now belongs to an unrelated process
+            asyncio.run(self.manager._reap({proc.pid: "not-this-process"}))
+            signal_group.assert_not_called()
+            asyncio.run(self.manager._reap({proc.pid: jobs.process_token(proc.pid)}))
+        signal_group.assert_called_once_with(proc.pid, jobs.signal.SIGKILL)
+
+    def test_job_files_without_owners_are_upgraded(self):
+        db = sqlite3.connect(self.db)
+        db.execute(jobs._SCHEMA.replace(",\n    owner_pid INTEGER,\n    owner_token TEXT", ""))
+        db.execute("INSERT INTO jobs (id, tool, arguments, state, created) VALUES ('old', 'sync', '{}', 'running', 1)")
+        db.commit()
+        db.close()
+        fresh = jobs.JobManager(self.db)
+        self.addCleanup(fresh.close)
+        self.assertIsNone(fresh.get("old").owner_pid)
+        # Without a recorded server the job counts as orphaned
+        self.assertEqual([j.state for j in asyncio.run(fresh.recover())], ["interrupted"])
+
+    def test_started_jobs_record_their_server(self):
+        async def scenario():
+            job = json.loads(await server.start_job("export_photos", {"dest": "out"}))
+            await _wait(job["job_id"])
+            return job["job_id"]
+
+        job_id = asyncio.run(scenario())
+        fresh = jobs.JobManager(self.db)
+        self.addCleanup(fresh.close)
+        job = fresh.get(job_id)
+        self.assertEqual((job.owner_pid, job.owner_token), (os.getpid(), jobs.process_token(os.getpid())))
+        self.assertTrue(job.owner_alive)
+
+    def test_orphans_are_reattached(self):
+        proc = self.spawn_orphan()
+        job = jobs.Job("orphan", "export_photos", {"dest": "x"}, log_lines=4)
+        job.state = jobs.RUNNING
+        job.pids = {proc.pid: jobs.process_token(proc.pid)}
+        self.manager.save(job)
+        fresh = jobs.JobManager(self.db, orphans="reattach")
+        fresh.sample_interval = 0.05
+        self.addCleanup(fresh.close)
+
+        async def scenario():
+            await fresh.recover()
+            self.assertEqual(fresh.get("orphan").state, "reattached")
+            await asyncio.sleep(0.2)
+            proc.kill()
+            proc.wait()
+            await fresh.get("orphan").task
+            return fresh.get("orphan")
+
+        reattached = asyncio.run(scenario())
+        self.assertEqual(reattached.state, "exited")
+        self.assertGreater(reattached.peak_rss, 0)
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError) as cm:
+            asyncio.run(server.start_job("export_foto", {}))
+        self.assertIn("export_photos", str(cm.exception))
+        with self.assertRaises(ValueError):
+            asyncio.run(server.start_job("export_photos", {}))
+        with self.assertRaises(ValueError):
+            asyncio.run(server.start_job("start_job", {"tool": "albums"}))
+        self.assertTrue(asyncio.run(server.job_status("nope")).startswith("Error:"))
+
+
+if __name__ == "__main__":
+    unittest.main()
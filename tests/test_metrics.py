@@ -0,0 +1,131 @@
+import asyncio
+import inspect
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.metrics import Histogram, ServerMetrics  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# `persons` prints a fixed JSON document after a short delay; `fail` exits 2
+METRICS_STUB = """
+import sys, time
+args = sys.argv[1:]
+if args[:1] == ["fail"]:
+    sys.stderr.write("boom\\n")
+    sys.exit(2)
+time.sleep(0.05)
+print('{"persons": {"Alice": 3}}')
+"""
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_interpolate_within_buckets(self):
+        hist = Histogram((1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+            hist.observe(value)
+        self.assertEqual(hist.cumulative(), [("1", 1), ("2", 3), ("4", 4), ("+Inf", 5)])
+        self.assertAlmostEqual(hist.quantile(0.5), 1.75)
+        self.assertEqual(hist.quantile(1.0), 10.0)
+        self.assertEqual(hist.summary()["count"], 5)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_prometheus_text(self):
+        metrics = ServerMetrics()
+        metrics.record_tool('odd"name', 0.2, error=True)
+        metrics.add_cache("result", lambda: (3, 1))
+        text = metrics.prometheus()
+        self.assertIn('mcp_osxphotos_tool_calls_total{tool="odd\\"name"} 1', text)
+        self.assertIn('mcp_osxphotos_tool_duration_seconds_bucket{tool="odd\\"name",le="0.25"} 1', text)
+        self.assertIn('mcp_osxphotos_cache_hits_total{cache="result"} 3', text)
+        self.assertIn("# TYPE mcp_osxphotos_tool_duration_seconds histogram", text)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sub", "mcp.prom")
+            metrics.write_prometheus(path)
+            with open(path) as fh:
+                self.assertIn('mcp_osxphotos_tool_errors_total{tool="odd\\"name"} 1', fh.read())
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["mcp.prom"])
+
+
+class TestServerMetrics(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, METRICS_STUB)
+        env = mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_WORKERS": "0", "MCP_OSXPHOTOS_CACHE_TTL": "300"})
+        env.start()
+        self.addCleanup(env.stop)
+        # Tools report to the instance they were wrapped with at registration
+        self.tool_metrics = server._metrics
+        metrics = mock.patch.object(server, "_metrics", ServerMetrics())
+        metrics.start()
+        self.addCleanup(metrics.stop)
+
+    def snapshot(self):
+        return json.loads(server.server_metrics())
+
+    def test_commands_are_measured(self):
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", "persons", "--json"]))
+        asyncio.run(server.run_osxphotos_command(["osxphotos", "fail"]))
+        commands = self.snapshot()["commands"]
+        persons = commands["persons"]
+        self.assertEqual((persons["calls"], persons["errors"], persons["runners"]), (1, {}, {"subprocess": 1}))
+        self.assertEqual(persons["stdout_bytes"], len(out.encode()))
+        self.assertEqual(persons["first_byte_seconds"]["count"], 1)
+        self.assertGreaterEqual(persons["duration_seconds"]["max"], 0.05)
+        self.assertEqual(commands["fail"]["errors"], {"exit": 1})
+        self.assertEqual(commands["fail"]["stderr_bytes"], len(b"boom\n"))
+
+    def test_tool_calls_are_measured(self):
+        async def scenario():
+            await server.mcp.call_tool("persons", {"json": True})
+            await server.mcp.call_tool("persons", {"json": True})
+            await server.mcp.call_tool("job_status", {"job_id": "missing"})
+
+        start = self.tool_metrics.snapshot()
+        asyncio.run(scenario())
+        end = self.tool_metrics.snapshot()
+
+        def calls(snap, tool):
+            return snap["tools"].get(tool, {"calls": 0, "errors": 0})
+
+        self.assertEqual(calls(end, "persons")["calls"] - calls(start, "persons")["calls"], 2)
+        self.assertEqual(calls(end, "job_status")["errors"] - calls(start, "job_status")["errors"], 1)
+        cache = end["caches"]["result"]
+        self.assertGreaterEqual(cache["hits"] - start["caches"]["result"]["hits"], 1)
+
+    def test_metrics_file_is_written_while_serving(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mcp.prom")
+
+            async def scenario():
+                async with server._server_lifespan(server.mcp):
+                    await asyncio.sleep(0.05)
+                    self.assertTrue(os.path.exists(path))
+                    server._metrics.record_tool("late", 0.1, error=False)
+
+            env = {"MCP_OSXPHOTOS_METRICS_FILE": path, "MCP_OSXPHOTOS_HELP_PREWARM": "0"}
+            with mock.patch.dict(os.environ, env), mock.patch.object(server, "_jobs", mock.AsyncMock()):
+                asyncio.run(scenario())
+            with open(path) as fh:
+                self.assertIn('mcp_osxphotos_tool_calls_total{tool="late"} 1', fh.read())
+
+    def test_wrapped_tools_keep_their_schema(self):
+        tool = server.mcp.get_tool("persons")
+        self.assertIsNot(tool.fn, server.persons)
+        self.assertIn("json", tool.parameters["properties"])
+        self.assertIs(inspect.unwrap(tool.fn), server.persons)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import inspect
+import os
+import sys
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.server import (  # noqa: E402
+    OPTION_FLAG,
+    OPTION_GROUP,
+    OPTION_LOCATION,
+    OPTION_MULTI,
+    OPTION_PAIRS,
+    OPTION_POSITIONAL,
+    OPTION_VALUE,
+    build_argv,
+)
+
+
+def _specs(tool):
+    return {spec.name: spec for spec in server._argv_builder(tool).specs}
+
+
+class TestOptionSpecs(unittest.TestCase):
+    def test_every_cli_tool_has_a_builder(self):
+        # Tools that do not take parameters run a fixed argv
+        fixed = {"about", "docs", "update", "osxphotos_health", "python_version", "server_metrics"}
+        # Background job tools do not run osxphotos themselves
+        fixed |= server._JOB_TOOLS
+        # Served from the local photo index or from query_photos' builder
+        fixed |= {"search_photos", "photo_facets"}
+        tools = set(server.mcp._tool_manager._tools)
+        self.assertEqual(tools - fixed, set(server._ARGV_REGISTRY))
+
+    def test_specs_follow_signature(self):
+        for tool in server._ARGV_REGISTRY:
+            builder = server._argv_builder(tool)
+            fn = server.mcp._tool_manager._tools[tool].fn
+            params = [p for p in inspect.signature(fn).parameters if p not in server._SERVER_PARAMS]
+            names = [spec.name for spec in builder.specs]
+            self.assertTrue(set(names) <= set(params), tool)
+
+    def test_kinds_are_derived_from_annotations(self):
+        specs = _specs("export_photos")
+        self.assertEqual(specs["dest"].kind, OPTION_POSITIONAL)
+        self.assertEqual(specs["convert_to_jpeg"].kind, OPTION_FLAG)
+        self.assertEqual(specs["filename"].kind, OPTION_VALUE)
+        self.assertEqual(specs["keyword"].kind, OPTION_MULTI)
+        self.assertEqual(specs["exif"].kind, OPTION_PAIRS)
+        self.assertEqual(specs["sidecar_template"].kind, OPTION_GROUP)
+        self.assertEqual(specs["sidecar_template"].arity, 3)
+        self.assertEqual(_specs("batch_edit")["location"].kind, OPTION_LOCATION)
+
+    def test_flag_overrides(self):
+        self.assertEqual(_specs("dump")["print_template"].flag, "--print")
+        self.assertEqual(_specs("install")["requirements_file"].flag, "-r")
+
+    def test_server_params_and_skipped_params_are_not_options(self):
+        self.assertNotIn("page_size", _specs("query_photos"))
+        self.assertNotIn("cursor", _specs("query_photos"))
+        specs = _specs("batch_edit_by_uuid")
+        for name in ("uuid", "max_workers", "chunk_size"):
+            self.assertNotIn(name, specs)
+
+    def test_build_argv_follows_signature_order(self):
+        cmd = build_argv("export_photos", {
+            "dest": "/tmp/out",
+            "keyword": ["a", "b"],
+            "update": True,
+            "dry_run": False,
+            "exif": [{"tag": "Make", "value": "Apple"}],
+            "filename": None,
+        })
+        self.assertEqual(cmd, [
+            "osxphotos", "export", "/tmp/out",
+            "--keyword", "a", "--keyword", "b",
+            "--exif", "Make", "Apple",
+            "--update",
+        ])
+
+    def test_positionals_come_first(self):
+        cmd = build_argv("compare", {"verbose": True, "library_a": "A", "library_b": "B"})
+        self.assertEqual(cmd, ["osxphotos", "compare", "A", "B", "--verbose"])
+        cmd = build_argv("run", {"python_file": "x.py", "args": ["--n", "1"]})
+        self.assertEqual(cmd, ["osxphotos", "run", "x.py", "--n", "1"])
+
+    def test_location_and_pairs_validate(self):
+        self.assertEqual(
+            build_argv("batch_edit", {"location": [1.0, 2.0]}),
+            ["osxphotos", "batch-edit", "--location", "1.0", "2.0"],
+        )
+        with self.assertRaises(ValueError):
+            build_argv("batch_edit", {"location": [1.0]})
+        with self.assertRaises(ValueError):
+            build_argv("query_photos", {"regex": ["a", "{name}"]})
+
+    def test_builder_returns_fresh_lists(self):
+        first = build_argv("albums", {"json": True})
+        first.append("--extra")
+        self.assertEqual(build_argv("albums", {"json": True}), ["osxphotos", "albums", "--json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
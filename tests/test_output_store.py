@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import output_store, server  # noqa: E402
+from mcp_osxphotos.output_store import OutputStore  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Any command: $STUB_LINES numbered lines
+LINES_STUB = """
+import os
+for i in range(int(os.environ["STUB_LINES"])):
+    print(f"line {i:05d} of the dump")
+"""
+
+
+class TestOutputStore(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        # Small blocks so ranges cross block boundaries
+        patcher = mock.patch.object(output_store, "BLOCK_SIZE", 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = OutputStore(self.dir)
+        self.addCleanup(self.store.close)
+
+    def test_byte_and_line_ranges(self):
+        data = "".join(f"row {i}, é\n" for i in range(30)).encode() + b"tail"
+        stored = self.store.put(data)
+        self.assertEqual((stored.size, stored.lines), (len(data), 31))
+        lines = data.splitlines(keepends=True)
+        for offset, length in ((0, 5), (7, 23), (100, 1000), (len(data) - 2, 10), (len(data) + 5, 3)):
+            self.assertEqual(self.store.read(stored.digest, offset, length), data[offset:offset + length])
+        self.assertEqual(self.store.read(stored.digest), data)
+        for start, count in ((0, 1), (3, 4), (29, 5), (30, 1), (31, 1), (12, 0)):
+            self.assertEqual(self.store.read_lines(stored.digest, start, count), b"".join(lines[start:start + count]))
+        self.assertEqual(self.store.read_lines(stored.digest, 28), b"".join(lines[28:]))
+        with self.assertRaises(KeyError):
+            self.store.read("0" * 64, 0, 1)
+        with self.assertRaises(ValueError):
+            self.store.read_lines(stored.digest, -1, 1)
+
+    def test_content_addressed_and_compressed(self):
+        data = b"same output\n" * 1000
+        with mock.patch.object(output_store, "BLOCK_SIZE", 64 * 1024):
+            first, second = self.store.put(data), self.store.put(data)
+        self.assertEqual(first, second)
+        self.assertLess(first.stored, len(data) / 5)
+        self.assertEqual(self.store.usage(), (1, first.stored))
+
+    def test_least_recently_read_outputs_are_evicted(self):
+        self.store.max_bytes = 1
+        a = self.store.put(b"a" * 100)
+        time.sleep(0.01)
+        b = self.store.put(b"b" * 100)
+        # Only the newest output survives a cap smaller than any output
+        self.assertIsNone(self.store.get(a.digest))
+        self.store.max_bytes = b.stored * 2 + 1
+        c = self.store.put(b"c" * 100)
+        time.sleep(0.01)
+        self.store.read(b.digest, 0, 1)
+        time.sleep(0.01)
+        self.store.put(b"d" * 100)
+        self.assertIsNone(self.store.get(c.digest))
+        self.assertIsNotNone(self.store.get(b.digest))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, c.digest[:2], f"{c.digest}.z")))
+
+
+class TestLargeToolOutputs(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, LINES_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = OutputStore(tmp.name)
+        self.addCleanup(store.close)
+        patcher = mock.patch.object(server, "_output_store", store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = mock.patch.dict(os.environ, {
+            "STUB_LINES": "1000", "MCP_OSXPHOTOS_SPILL_BYTES": "4096", "MCP_OSXPHOTOS_WORKERS": "0",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+    def read(self, uri):
+        contents = asyncio.run(server.mcp.read_resource(uri))
+        return list(contents)[0].content
+
+    def test_large_output_is_stored_and_read_in_ranges(self):
+        out = asyncio.run(server.dump())
+        self.assertTrue(out.startswith("Output of dump is 23000 bytes (1000 lines), too large"), out)
+        self.assertIn("line 00019 of the dump", out)
+        self.assertNotIn("line 00020", out)
+        uri = out.split("stored as ", 1)[1].split(".\n", 1)[0]
+        self.assertEqual(self.read(f"{uri}/lines/998/5"), "line 00998 of the dump\nline 00999 of the dump\n")
+        self.assertEqual(self.read(f"{uri}/bytes/23/10"), "line 00001")
+        self.assertIn('"lines": 1000', self.read(uri))
+        with self.assertRaises(Exception):
+            self.read(f"{server._OUTPUT_URI}{'0' * 64}/lines/0/1")
+
+    def test_small_outputs_errors_and_other_tools_are_inline(self):
+        with mock.patch.dict(os.environ, {"STUB_LINES": "3"}):
+            self.assertTrue(asyncio.run(server.orphans()).startswith("line 00000"))
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_SPILL_BYTES": "0"}):
+            self.assertEqual(len(asyncio.run(server.dump())), 23000)
+        self.assertEqual(len(asyncio.run(server.keywords())), 23000)
+        self.assertTrue(asyncio.run(server.exportdb("export.db", report=["r.csv", "1"])).startswith("Output of exportdb"))
+
+
+if __name__ == "__main__":
+    unittest.main()
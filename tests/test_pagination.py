@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Ensure src/ is on sys.path so we can import the package in editable/dev mode
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.pagination import CursorError, CursorStore, decode_cursor  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# `query --json` returns 25 photos and records each spawn in $STUB_CALLS
+QUERY_STUB = """
+import json, os, sys
+with open(os.environ["STUB_CALLS"], "a") as fh:
+    fh.write(" ".join(sys.argv[1:]) + "\\n")
+print(json.dumps([{"uuid": "U%02d" % i, "title": "photo %d" % i} for i in range(25)]))
+"""
+
+
+class TestCursorStore(unittest.TestCase):
+    def setUp(self):
+        self.store = CursorStore(ttl=60)
+        self.addCleanup(self.store.close)
+
+    def test_pages_walk_all_items(self):
+        spill_id = self.store.spill([{"i": i} for i in range(7)])
+        items, cursor, total = self.store.page(spill_id, 0, 3)
+        self.assertEqual(total, 7)
+        seen = list(items)
+        while cursor:
+            sid, offset, size = decode_cursor(cursor)
+            items, cursor, _ = self.store.page(sid, offset, size)
+            seen.extend(items)
+        self.assertEqual(seen, [{"i": i} for i in range(7)])
+
+    def test_expired_spills_are_collected(self):
+        store = CursorStore(ttl=0.05)
+        self.addCleanup(store.close)
+        spill_id = store.spill([1, 2, 3])
+        path = store._spills[spill_id].path
+        time.sleep(0.1)
+        self.assertEqual(store.gc(), 1)
+        self.assertFalse(os.path.exists(path))
+        with self.assertRaises(CursorError):
+            store.page(spill_id, 0, 1)
+
+    def test_malformed_cursor(self):
+        with self.assertRaises(CursorError):
+            decode_cursor("not-a-cursor")
+
+
+class TestQueryPhotosPagination(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, QUERY_STUB)
+        self.calls = os.path.join(os.path.dirname(server._resolved_osxphotos_path or ""), "calls.txt")
+        env = mock.patch.dict(os.environ, {"STUB_CALLS": self.calls})
+        env.start()
+        self.addCleanup(env.stop)
+        store = mock.patch.object(server, "_cursor_store", CursorStore(ttl=60))
+        store.start()
+        self.addCleanup(store.stop)
+
+    def test_pages_served_from_spill(self):
+        first = json.loads(asyncio.run(server.query_photos(keyword=["cat"], page_size=10)))
+        self.assertEqual(first["total"], 25)
+        self.assertEqual([p["uuid"] for p in first["results"]], ["U%02d" % i for i in range(10)])
+        uuids = [p["uuid"] for p in first["results"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            page = json.loads(asyncio.run(server.query_photos(cursor=cursor)))
+            uuids.extend(p["uuid"] for p in page["results"])
+            cursor = page["next_cursor"]
+        self.assertEqual(uuids, ["U%02d" % i for i in range(25)])
+        with open(self.calls) as fh:
+            calls = fh.readlines()
+        # One osxphotos run for all three pages, with JSON output implied
+        self.assertEqual(len(calls), 1)
+        self.assertIn("--json", calls[0])
+        self.assertNotIn("--page-size", calls[0])
+
+    def test_pages_are_read_off_the_event_loop(self):
+        first = json.loads(asyncio.run(server.query_photos(keyword=["cat"], page_size=10)))
+        read, threads = server._cursor_store.page, []
+
+        def page(*args):
+            threads.append(threading.current_thread())
+            return read(*args)
+
+        with mock.patch.object(server._cursor_store, "page", page):
+            later = json.loads(asyncio.run(server.query_photos(cursor=first["next_cursor"])))
+        self.assertEqual(later["results"][0]["uuid"], "U10")
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_unknown_cursor_is_an_error(self):
+        out = asyncio.run(server.query_photos(cursor="eyJzIjoiZGVhZCIsIm8iOjAsIm4iOjEwfQ"))
+        self.assertTrue(out.startswith("Error:"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.photo_index import PhotoIndex, match_expression  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+
+def photo(uuid, date="2024-05-01T10:00:00+02:00", added="2024-05-02T10:00:00+00:00", **fields):
+    record = {
+        "uuid": uuid, "date": date, "date_added": added, "keywords": [], "persons": [], "albums": [],
+        "folders": {}, "labels": [], "title": None, "description": None, "original_filename": f"{uuid}.jpg",
+        "uti_original": "public.jpeg", "path": f"/lib/{uuid}.jpg", "isphoto": True, "ismovie": False,
+    }
+    record.update(fields)
+    return record
+
+
+PHOTOS = [
+    photo("a", keywords=["Lake", "Summer"], persons=["Alice"], favorite=True, title="Lake house"),
+    photo("b", date="2023-12-31T23:30:00-05:00", keywords=["lake"], albums=["Trip"], folders={"Trip": ["2023"]}),
+    photo("c", date="2022-01-01T00:00:00+00:00", labels=["Dog"], path=None, latitude=1.0, longitude=2.0,
+          title="Beach"),
+    photo("d", albums=["Trip/Day 1"], isphoto=False, ismovie=True, description="At the lake"),
+]
+
+COMO = photo("e", title="Ferry", labels=["Boat"], place={
+    "name": "Bellagio, Lombardia, Italia", "names": {"city": ["Bellagio"], "body_of_water": ["Lago di Como"]},
+})
+
+# `query --json [--added-after DATE]`: the records in $STUB_PHOTOS added after DATE; logs argv.
+# With $STUB_TRUNCATE set the JSON output is cut short.
+QUERY_STUB = """
+import datetime, json, os, sys
+args = sys.argv[1:]
+with open(os.environ["STUB_LOG"], "a") as fh:
+    fh.write(" ".join(args) + "\\n")
+with open(os.environ["STUB_PHOTOS"]) as fh:
+    photos = json.load(fh)
+if "--added-after" in args:
+    after = datetime.datetime.fromisoformat(args[args.index("--added-after") + 1])
+    photos = [p for p in photos if datetime.datetime.fromisoformat(p["date_added"]) > after]
+if "--count" in args:
+    print(len(photos))
+else:
+    out = json.dumps(photos)
+    print(out[:-20] if os.environ.get("STUB_TRUNCATE") else out)
+"""
+
+
+class TestPhotoIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index = PhotoIndex(os.path.join(tmp.name, "index.sqlite3"))
+        self.addCleanup(self.index.close)
+        self.index.rebuild("/lib", PHOTOS, [[1, 2]])
+
+    def uuids(self, **filters):
+        return sorted(json.loads(r)["uuid"] for r in self.index.query("/lib", filters))
+
+    def test_named_attributes(self):
+        self.assertEqual(self.uuids(keyword=["Lake"]), ["a"])
+        self.assertEqual(self.uuids(keyword=["lake"], ignore_case=True), ["a", "b"])
+        self.assertEqual(self.uuids(keyword=["Summer", "lake"]), ["a", "b"])
+        self.assertEqual(self.uuids(no_keyword=True), ["c", "d"])
+        self.assertEqual(self.uuids(person=["Alice"], favorite=True), ["a"])
+        self.assertEqual(self.uuids(label=["Dog"]), ["c"])
+        # Albums are matched on their folder path; "//" escapes a slash in a name
+        self.assertEqual(self.uuids(album=["2023/Trip"]), ["b"])
+        self.assertEqual(self.uuids(album=["Trip"]), [])
+        self.assertEqual(self.uuids(album=["Trip//Day 1"]), ["d"])
+
+    def test_dates_flags_and_text(self):
+        self.assertEqual(self.uuids(year=[2023]), ["b"])
+        # b was taken on New Year's Eve in New York, already 2024 in UTC
+        self.assertEqual(self.uuids(from_date="2024-01-01T00:00:00+00:00"), ["a", "b", "d"])
+        self.assertEqual(self.uuids(to_date="2024-01-01T04:30:00+00:00"), ["c"])
+        self.assertEqual(self.uuids(missing=True), ["c"])
+        self.assertEqual(self.uuids(location=True), ["c"])
+        self.assertEqual(self.uuids(only_movies=True), ["d"])
+        self.assertEqual(self.uuids(not_favorite=True, not_missing=True), ["b", "d"])
+        # One string, as query_photos passes it: "Beach" shares letters but not the text
+        self.assertEqual(self.uuids(title="Lake"), ["a"])
+        self.assertEqual(self.uuids(description="LAKE", ignore_case=True), ["d"])
+        self.assertEqual(self.uuids(name=["a.jpg", "d.jpg"]), ["a", "d"])
+        self.assertEqual(self.uuids(no_title=True), ["b", "d"])
+        self.assertEqual(self.index.count("/lib", {"uuid": ["a", "c", "x"]}), 2)
+        with self.assertRaises(ValueError):
+            self.index.query("/lib", {"from_date": "yesterday"})
+
+    def test_query_reads_in_batches_without_holding_the_lock(self):
+        with mock.patch("mcp_osxphotos.photo_index._QUERY_BATCH", 3):
+            records = self.index.query("/lib", {})
+            self.assertIs(iter(records), records)
+            self.assertEqual(json.loads(next(records))["uuid"], "a")
+            # Between batches another thread can refresh or query the index
+            self.assertEqual(self.index.count("/lib", {}), 4)
+            self.assertEqual([json.loads(r)["uuid"] for r in records], ["b", "c", "d"])
+
+    def test_update_replaces_records_and_links(self):
+        self.index.update("/lib", [photo("a", keywords=["Winter"]), photo("e")], [[3, 4]])
+        self.assertEqual(self.uuids(keyword=["Lake"]), [])
+        self.assertEqual(self.uuids(keyword=["Winter"]), ["a"])
+        state = self.index.state("/lib")
+        self.assertEqual((state.photos, state.fingerprint, state.stale), (5, "[[3, 4]]", False))
+        self.index.invalidate("/lib")
+        self.assertTrue(self.index.state("/lib").stale)
+        self.assertIsNone(self.index.state("/other"))
+
+    def search(self, text, **kwargs):
+        return [hit["uuid"] for hit in self.index.search("/lib", text, **kwargs)[1]]
+
+    def test_full_text_search(self):
+        self.index.update("/lib", [COMO], [[3]])
+        # The title weighs most, so the photo titled "Lake house" comes first
+        self.assertEqual(self.search("lake")[0], "a")
+        self.assertEqual(sorted(self.search("lake")), ["a", "b", "d"])
+        self.assertEqual(self.search("como boat"), ["e"])
+        self.assertEqual(self.search("bella"), ["e"])
+        self.assertEqual(self.search("dog como"), [])
+        self.assertEqual(sorted(self.search("dog como", match="any")), ["c", "e"])
+        self.assertEqual(self.search('"day 1"'), ["d"])
+        self.assertEqual(self.search("alice", limit=0), [])
+        self.assertEqual(self.index.search("/other", "lake")[0], 0)
+        # Replaced and deleted photos leave the text index too
+        self.index.update("/lib", [photo("a")], [[4]])
+        self.assertEqual(self.search("alice"), [])
+        self.index.rebuild("/lib", [], [[5]])
+        self.assertEqual(self.search("lake"), [])
+
+    def test_match_expression(self):
+        self.assertEqual(match_expression('Lake "summer house" x"y'), '"Lake"* AND "summer house" AND "x"* AND "y"*')
+        self.assertEqual(match_expression("a-b", "any"), '"a"* OR "b"*')
+        with self.assertRaises(ValueError):
+            match_expression(' "" - ')
+
+    def test_supported_filters(self):
+        self.assertTrue(PhotoIndex.supports({"keyword": ["x"], "from_date": "2024-01-01", "favorite": True}))
+        self.assertTrue(PhotoIndex.supports({"regex": None, "place": None, "hidden": False}))
+        self.assertFalse(PhotoIndex.supports({"keyword": ["x"], "place": "Paris"}))
+        self.assertFalse(PhotoIndex.supports({"print_template": ["{uuid}"]}))
+
+
+class TestQueryPhotosFromIndex(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, QUERY_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.library = os.path.join(tmp.name, "A.photoslibrary")
+        os.makedirs(os.path.join(self.library, "database"))
+        self.touch_library()
+        self.log = os.path.join(tmp.name, "log")
+        self.photos = os.path.join(tmp.name, "photos.json")
+        self.write_photos(PHOTOS)
+        index = PhotoIndex(os.path.join(tmp.name, "index.sqlite3"))
+        self.addCleanup(index.close)
+        patcher = mock.patch.object(server, "_photo_index", index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = mock.patch.dict(os.environ, {
+            "STUB_LOG": self.log, "STUB_PHOTOS": self.photos, "MCP_OSXPHOTOS_WORKERS": "0",
+            "MCP_OSXPHOTOS_QUERY_INDEX": "1", "MCP_OSXPHOTOS_COALESCE": "0",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+    def touch_library(self, data=b"v1"):
+        with open(os.path.join(self.library, "database", "Photos.sqlite"), "ab") as fh:
+            fh.write(data)
+
+    def write_photos(self, photos):
+        with open(self.photos, "w") as fh:
+            json.dump(photos, fh)
+
+    def runs(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as fh:
+            return [line.split() for line in fh]
+
+    def query(self, **kwargs):
+        return asyncio.run(server.query_photos(library=self.library, **kwargs))
+
+    def test_supported_queries_use_the_index(self):
+        out = self.query(json=True, keyword=["Lake", "lake"])
+        self.assertEqual(sorted(p["uuid"] for p in json.loads(out)), ["a", "b"])
+        self.assertEqual(self.query(count=True, favorite=True).strip(), "1")
+        page = json.loads(self.query(page_size=2))
+        self.assertEqual((len(page["results"]), page["total"]), (2, 4))
+        columns = json.loads(self.query(columnar=True, fields=["uuid", "title"], person=["Alice"]))
+        self.assertEqual(columns["rows"], [["a", "Lake house"]])
+        # One full build served all four
+        self.assertEqual(self.runs(), [["query", "--library", self.library, "--json"]])
+
+    def test_new_photos_are_fetched_incrementally(self):
+        self.query(json=True)
+        self.write_photos(PHOTOS + [photo("e", added="2024-06-01T00:00:00+00:00", keywords=["Lake"])])
+        self.touch_library()
+        out = self.query(json=True, keyword=["Lake"])
+        self.assertEqual(sorted(p["uuid"] for p in json.loads(out)), ["a", "e"])
+        last = self.runs()[-1]
+        self.assertIn("--added-after", last)
+        self.assertTrue(last[last.index("--added-after") + 1].startswith("2024-05-02T09:59:59"))
+
+    def test_mutations_and_age_force_a_full_rebuild(self):
+        self.query(json=True)
+        asyncio.run(server.run_osxphotos_command(["osxphotos", "batch-edit", "--library", self.library]))
+        self.touch_library()
+        self.query(json=True)
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_QUERY_INDEX_MAX_AGE": "0.000001"}):
+            self.touch_library()
+            self.query(json=True)
+        full = [run for run in self.runs() if run[0] == "query" and "--added-after" not in run]
+        self.assertEqual(len(full), 3)
+
+    def test_search_photos_builds_and_reuses_the_index(self):
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_QUERY_INDEX": "0"}):
+            out = json.loads(asyncio.run(server.search_photos("lake trip", library=self.library)))
+            self.assertEqual(sorted(hit["uuid"] for hit in out["results"]), ["b", "d"])
+            self.write_photos(PHOTOS + [COMO])
+            self.touch_library()
+            out = json.loads(asyncio.run(server.search_photos("como", library=self.library)))
+        self.assertEqual(out["results"][0]["title"], "Ferry")
+        self.assertEqual(len(self.runs()), 2)
+        self.assertIn("--added-after", self.runs()[-1])
+        with self.assertRaises(ValueError):
+            asyncio.run(server.search_photos("  ", library=self.library))
+
+    def test_refresh_streams_large_results_into_the_index(self):
+        self.write_photos([photo(f"p{i:04d}", keywords=["Lake"] if i % 3 else []) for i in range(2000)])
+        self.assertEqual(self.query(count=True, keyword=["Lake"]).strip(), "1333")
+        self.assertEqual(len(self.runs()), 1)
+
+    def test_invalid_refresh_output_rolls_the_index_back(self):
+        with mock.patch.dict(os.environ, {"STUB_TRUNCATE": "1"}):
+            self.query(json=True)
+        library = server.resolve_library(self.library)
+        self.assertIsNone(server._photo_index.state(library))
+        self.query(json=True)
+        self.write_photos(PHOTOS + [COMO])
+        self.touch_library()
+        with mock.patch.dict(os.environ, {"STUB_TRUNCATE": "1"}):
+            out = self.query(count=True)
+        # The failed update ran the query through osxphotos and left the index as it was
+        self.assertEqual(out.strip(), "5")
+        self.assertEqual(server._photo_index.count(library, {}), 4)
+
+    def test_photo_facets_reads_the_index(self):
+        self.query(json=True)
+        out = json.loads(asyncio.run(server.photo_facets(["year"], library=self.library, keyword=["Lake", "lake"])))
+        self.assertEqual(out["groups"], [{"year": "2023", "count": 1, "bytes": 0}, {"year": "2024", "count": 1, "bytes": 0}])
+        self.assertEqual(len(self.runs()), 1)
+
+    def test_unsupported_queries_and_text_output_run_osxphotos(self):
+        self.query(json=True, place="Paris")
+        self.query(keyword=["Lake"])
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_QUERY_INDEX": "0"}):
+            self.query(json=True)
+        self.assertEqual([run[-1] for run in self.runs()], ["Paris", "Lake", "--json"])
+        self.assertIsNone(server._photo_index.state(server.resolve_library(self.library)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Ensure src/ is on sys.path so we can import the package in editable/dev mode
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.progress import ProgressTracker  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Emits an export-like log: a total line, one line per file and a summary
+EXPORT_STUB = """
+import sys, time
+print("Exporting 20 photos to /dest", flush=True)
+for i in range(1, 21):
+    print(f"Exported IMG_{i:04d}.jpg to /dest/2020/1/12/IMG_{i:04d}.jpg", flush=True)
+    time.sleep(0.05)
+print("Processed: 20 photos, exported: 20, missing: 0", flush=True)
+sys.stderr.write("warning: something minor\\n")
+"""
+
+
+class FakeContext:
+    def __init__(self):
+        self.reports = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.reports.append((progress, total, message))
+
+
+class TestProgressTracker(unittest.TestCase):
+    def test_total_and_exported_lines(self):
+        tracker = ProgressTracker()
+        self.assertTrue(tracker.feed("Exporting 3 photos to /Volumes/Backup"))
+        self.assertEqual(tracker.total, 3)
+        tracker.feed("Exported IMG_1.jpg to /Volumes/Backup/2020/1/12/IMG_1.jpg")
+        tracker.feed("Skipped up to date file /Volumes/Backup/IMG_2.jpg")
+        self.assertEqual(tracker.completed, 2)
+        self.assertFalse(tracker.feed("Writing metadata with exiftool"))
+        self.assertIn("2/3 files", tracker.message())
+
+    def test_counter_and_progress_bar_frames(self):
+        tracker = ProgressTracker()
+        tracker.feed("Exporting IMG_0001.JPG (ABC) as IMG_0001.JPG (1/1,200)")
+        self.assertEqual((tracker.completed, tracker.total), (1, 1200))
+        tracker.feed("Exporting ━━━━ 10/1200\rExporting ━━━━━━ 50/1200")
+        self.assertEqual(tracker.completed, 50)
+
+    def test_eta_requires_total(self):
+        tracker = ProgressTracker()
+        tracker.feed("Imported a.jpg")
+        self.assertIsNone(tracker.eta)
+        self.assertIn("1/? files", tracker.message())
+
+
+class TestStreamingExport(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, EXPORT_STUB)
+
+    def test_progress_notifications_and_bounded_tail(self):
+        ctx = FakeContext()
+        env = {"MCP_OSXPHOTOS_LOG_TAIL_LINES": "5"}
+        with mock.patch.object(server, "_request_context", return_value=ctx), \
+                mock.patch.object(server, "_PROGRESS_INTERVAL", 0.0), \
+                mock.patch.dict(os.environ, env):
+            out = asyncio.run(server.export_photos(dest="/dest"))
+        lines = out.splitlines()
+        self.assertEqual(lines[0], "[... 17 earlier lines omitted ...]")
+        self.assertEqual(lines[-1], "Processed: 20 photos, exported: 20, missing: 0")
+        self.assertEqual(len(lines), 6)
+        self.assertGreaterEqual(len(ctx.reports), 20)
+        progress, total, message = ctx.reports[-1]
+        self.assertEqual((progress, total), (20, 20))
+        self.assertIn("files/s", message)
+
+    def test_runs_without_request_context(self):
+        out = asyncio.run(server.import_photos(files_or_dirs=["/photos"]))
+        self.assertIn("Processed: 20 photos", out)
+
+
+if __name__ == "__main__":
+    unittest.main()
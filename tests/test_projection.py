@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.pagination import CursorStore  # noqa: E402
+from mcp_osxphotos.projection import ColumnarBuilder, JsonArrayParser, project  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+PHOTOS = [
+    {"uuid": f"U{i:03d}", "keywords": ["Lake", "Summer"] if i % 2 else ["Lake"], "original_filesize": 1000 + i,
+     "exif_info": {"camera_model": "iPhone 15 Pro"}, "title": f"Photo {i}", "path": f"/lib/été-{i}.heic"}
+    for i in range(300)
+]
+
+# `query --json ...`: PHOTOS on one line, written in small pieces; logs argv
+QUERY_STUB = """
+import json, os, sys
+with open(os.environ["STUB_LOG"], "a") as fh:
+    fh.write(" ".join(sys.argv[1:]) + "\\n")
+data = os.environ["STUB_OUTPUT"].encode()
+for i in range(0, len(data), 1000):
+    sys.stdout.buffer.write(data[i:i + 1000])
+    sys.stdout.buffer.flush()
+"""
+
+
+def parse(data, step):
+    items = []
+    parser = JsonArrayParser(items.append)
+    for i in range(0, len(data), step):
+        parser.feed(data[i:i + step])
+    parser.close()
+    return items
+
+
+class TestJsonArrayParser(unittest.TestCase):
+    def test_any_chunking_yields_the_same_items(self):
+        data = json.dumps(PHOTOS[:20]).encode()
+        for step in (1, 2, 7, 4096):
+            self.assertEqual(parse(data, step), PHOTOS[:20])
+        self.assertEqual(parse(b"[1, 23, \"x\"]\n", 1), [1, 23, "x"])
+        self.assertEqual(parse(b"", 1), [])
+        self.assertEqual(parse(b" [ ] ", 1), [])
+
+    def test_malformed_output_fails_on_close(self):
+        for data in (b'[{"a": 1},', b'{"a": 1}', b"[1 2]", b"[1,]", b"[] x"):
+            parser = JsonArrayParser(lambda item: None)
+            parser.feed(data)
+            with self.assertRaises(ValueError, msg=data):
+                parser.close()
+
+
+class TestProjection(unittest.TestCase):
+    def test_project_follows_dots(self):
+        record = {"uuid": "a", "place": {"name": "Como"}, "exif_info": None}
+        self.assertEqual(
+            project(record, ["uuid", "place.name", "exif_info.camera_model", "missing"]),
+            {"uuid": "a", "place.name": "Como", "exif_info.camera_model": None, "missing": None},
+        )
+
+    def test_columnar_encodes_repeated_strings(self):
+        builder = ColumnarBuilder(["uuid", "keywords", "exif_info.camera_model", "original_filesize"])
+        for photo in PHOTOS[:3]:
+            builder.add(photo)
+        result = builder.result()
+        self.assertEqual(result["columns"], ["uuid", "keywords", "exif_info.camera_model", "original_filesize"])
+        # uuids never repeat and sizes are numbers: only the other two columns are encoded
+        self.assertEqual(result["dictionaries"], {"keywords": ["Lake", "Summer"], "exif_info.camera_model": ["iPhone 15 Pro"]})
+        self.assertEqual(result["rows"][1], ["U001", [0, 1], 0, 1001])
+
+    def test_columnar_without_fields_uses_the_first_record(self):
+        builder = ColumnarBuilder()
+        builder.add({"uuid": "a", "title": None})
+        builder.add({"uuid": "b", "title": "x", "extra": 1})
+        self.assertEqual(builder.result()["columns"], ["uuid", "title"])
+        self.assertEqual(builder.result()["rows"], [["a", None], ["b", "x"]])
+
+
+class TestQueryPhotosShaping(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, QUERY_STUB)
+        self.log = os.path.join(os.path.dirname(server._resolved_osxphotos_path or ""), "log")
+        env = mock.patch.dict(os.environ, {
+            "STUB_LOG": self.log, "STUB_OUTPUT": json.dumps(PHOTOS), "MCP_OSXPHOTOS_WORKERS": "0",
+            "MCP_OSXPHOTOS_QUERY_INDEX": "0",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        store = mock.patch.object(server, "_cursor_store", CursorStore(ttl=60))
+        store.start()
+        self.addCleanup(store.stop)
+
+    def query(self, **kwargs):
+        return asyncio.run(server.query_photos(keyword=["Lake"], **kwargs))
+
+    def test_fields_project_each_photo(self):
+        out = json.loads(self.query(fields=["uuid", "exif_info.camera_model"]))
+        self.assertEqual(len(out), 300)
+        self.assertEqual(out[0], {"uuid": "U000", "exif_info.camera_model": "iPhone 15 Pro"})
+        with open(self.log) as fh:
+            self.assertEqual(fh.read().split(), ["query", "--keyword", "Lake", "--json"])
+
+    def test_columnar_is_smaller_and_complete(self):
+        full = self.query(json=True)
+        compact = self.query(columnar=True, fields=["uuid", "keywords", "path"])
+        self.assertLess(len(compact), len(full) / 3)
+        result = json.loads(compact)
+        keywords = result["dictionaries"]["keywords"]
+        self.assertEqual([keywords[i] for i in result["rows"][1][1]], ["Lake", "Summer"])
+        self.assertEqual(result["rows"][299][2], "/lib/été-299.heic")
+
+    def test_fields_apply_to_pages(self):
+        page = json.loads(self.query(fields=["uuid"], page_size=2))
+        self.assertEqual((page["results"], page["total"]), ([{"uuid": "U000"}, {"uuid": "U001"}], 300))
+        with self.assertRaises(ValueError):
+            self.query(columnar=True, page_size=2)
+
+    def test_stdout_is_handed_over_in_chunks(self):
+        chunks = []
+
+        async def collect(chunk):
+            chunks.append(chunk)
+
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", "query", "--json"], on_stdout=collect))
+        self.assertEqual(out, "")
+        self.assertEqual(json.loads(b"".join(chunks)), PHOTOS)
+
+    def test_truncated_output_is_an_error(self):
+        with mock.patch.dict(os.environ, {"STUB_OUTPUT": json.dumps(PHOTOS)[:-100]}):
+            out = self.query(fields=["uuid"])
+        self.assertTrue(out.startswith("Error: could not parse osxphotos JSON output"), out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.scheduler import LibraryLocks, RWLock, SingleFlight  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Every command sleeps briefly and logs "start|end COMMAND@LAST_ARG TIME" to $STUB_LOG
+TIMED_STUB = """
+import os, sys, time
+args = sys.argv[1] + "@" + os.path.basename(sys.argv[-1])
+def log(event):
+    with open(os.environ["STUB_LOG"], "a") as fh:
+        fh.write(f"{event} {args} {time.monotonic()}\\n")
+log("start")
+time.sleep(0.3)
+log("end")
+print(args)
+"""
+
+
+class TestRWLock(unittest.TestCase):
+    def test_readers_share_writers_exclude(self):
+        async def scenario():
+            lock = RWLock()
+            await lock.acquire(False)
+            await lock.acquire(False)
+            self.assertEqual(lock.readers, 2)
+            writer = asyncio.create_task(lock.acquire(True))
+            await asyncio.sleep(0.01)
+            self.assertFalse(writer.done())
+            # A reader arriving after a waiting writer queues behind it
+            reader = asyncio.create_task(lock.acquire(False))
+            await asyncio.sleep(0.01)
+            self.assertFalse(reader.done())
+            lock.release(False)
+            lock.release(False)
+            await writer
+            self.assertTrue(lock.writer)
+            self.assertFalse(reader.done())
+            lock.release(True)
+            await reader
+            self.assertEqual((lock.readers, lock.writer), (1, False))
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_does_not_block(self):
+        async def scenario():
+            lock = RWLock()
+            await lock.acquire(False)
+            writer = asyncio.create_task(lock.acquire(True))
+            await asyncio.sleep(0.01)
+            writer.cancel()
+            await asyncio.sleep(0.01)
+            await asyncio.wait_for(lock.acquire(False), 1)
+            self.assertEqual(lock.readers, 2)
+
+        asyncio.run(scenario())
+
+    def test_nested_hold_does_not_wait(self):
+        async def scenario():
+            locks = LibraryLocks()
+            async with locks.hold([("/lib", True)]):
+                async with locks.hold([("/lib", True)]):
+                    async with locks.hold([("/lib", False)]):
+                        self.assertTrue(locks.status()["/lib"]["writer"])
+            self.assertEqual(locks.status(), {})
+
+        asyncio.run(asyncio.wait_for(scenario(), 2))
+
+
+class TestLibraryScheduling(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, TIMED_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log = os.path.join(tmp.name, "log")
+        self.lib_a = os.path.join(tmp.name, "A.photoslibrary")
+        self.lib_b = os.path.join(tmp.name, "B.photoslibrary")
+        env = mock.patch.dict(os.environ, {
+            "STUB_LOG": self.log, "MCP_OSXPHOTOS_WORKERS": "0", "MCP_OSXPHOTOS_MAX_CONCURRENCY": "8",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+    def run_all(self, *commands):
+        async def scenario():
+            await asyncio.gather(*(server.run_osxphotos_command(cmd) for cmd in commands))
+        asyncio.run(scenario())
+        spans = {}
+        with open(self.log) as fh:
+            for line in fh:
+                _event, command, at = line.split()
+                spans.setdefault(command, []).append(float(at))
+        return sorted(spans.values())
+
+    def overlapped(self, *commands):
+        intervals = self.run_all(*commands)
+        return any(intervals[i + 1][0] < intervals[i][1] for i in range(len(intervals) - 1))
+
+    def cmd(self, subcommand, library):
+        return ["osxphotos", subcommand, "--library", library]
+
+    def test_classification(self):
+        self.assertEqual(server._library_access(self.cmd("query", self.lib_a)), [(os.path.realpath(self.lib_a), False)])
+        self.assertEqual(server._library_access(self.cmd("timewarp", self.lib_a)), [(os.path.realpath(self.lib_a), True)])
+        export = ["osxphotos", "export", "/tmp/out", "--add-exported-to-album", "x", "--library", self.lib_a]
+        self.assertTrue(server._library_access(export)[0][1])
+        self.assertEqual(len(server._library_access(["osxphotos", "compare", self.lib_a, self.lib_b])), 2)
+        self.assertEqual(server._library_access(["osxphotos", "about"]), [])
+        self.assertEqual(server._library_access(["osxphotos", "query", "--help"]), [])
+        self.assertEqual(server._library_access(["osxphotos", "--version"]), [])
+        self.assertEqual(server._library_access(["osxphotos", "-h"]), [])
+
+    def test_readers_run_in_parallel(self):
+        self.assertTrue(self.overlapped(self.cmd("query", self.lib_a), self.cmd("albums", self.lib_a)))
+
+    def test_writers_are_exclusive_per_library(self):
+        self.assertFalse(self.overlapped(self.cmd("timewarp", self.lib_a), self.cmd("sync", self.lib_a)))
+
+    def test_writer_excludes_readers(self):
+        self.assertFalse(self.overlapped(self.cmd("push-exif", self.lib_a), self.cmd("query", self.lib_a)))
+
+    def test_libraries_do_not_block_each_other(self):
+        self.assertTrue(self.overlapped(self.cmd("timewarp", self.lib_a), self.cmd("timewarp", self.lib_b)))
+
+    def test_batch_edit_by_uuid_chunks_share_the_write_lock(self):
+        start = time.monotonic()
+        asyncio.run(server.batch_edit_by_uuid(uuid=["u1", "u2"], library=self.lib_a, chunk_size=1, max_workers=2))
+        self.assertLess(time.monotonic() - start, 0.55)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, TIMED_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log = os.path.join(tmp.name, "log")
+        self.lib = os.path.join(tmp.name, "A.photoslibrary")
+        env = mock.patch.dict(os.environ, {
+            "STUB_LOG": self.log, "MCP_OSXPHOTOS_WORKERS": "0", "MCP_OSXPHOTOS_MAX_CONCURRENCY": "8",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        flights = mock.patch.object(server, "_single_flight", SingleFlight())
+        flights.start()
+        self.addCleanup(flights.stop)
+
+    def spawned(self):
+        if not os.path.exists(self.log):
+            return 0
+        with open(self.log) as fh:
+            return sum(1 for line in fh if line.startswith("start"))
+
+    def test_concurrent_duplicates_share_one_process(self):
+        async def scenario():
+            return await asyncio.gather(*(server.persons(library=self.lib, json=True) for _ in range(5)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.spawned(), 1)
+        self.assertEqual(server._single_flight.stats()["coalesced"], 4)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        cmd = ["osxphotos", "query", "--library", self.lib]
+        asyncio.run(server.run_osxphotos_command(cmd))
+        asyncio.run(server.run_osxphotos_command(cmd))
+        self.assertEqual(self.spawned(), 2)
+
+    def test_writers_and_different_timeouts_are_not_coalesced(self):
+        async def scenario():
+            await asyncio.gather(
+                server.run_osxphotos_command(["osxphotos", "timewarp", "--library", self.lib]),
+                server.run_osxphotos_command(["osxphotos", "timewarp", "--library", self.lib]),
+                server.run_osxphotos_command(["osxphotos", "query", "--library", self.lib], timeout=10),
+                server.run_osxphotos_command(["osxphotos", "query", "--library", self.lib], timeout=20),
+            )
+
+        asyncio.run(scenario())
+        self.assertEqual(self.spawned(), 4)
+        self.assertEqual(server._single_flight.stats()["coalesced"], 0)
+
+    def test_cancelling_one_caller_keeps_the_run(self):
+        async def scenario():
+            flights = SingleFlight()
+            started = asyncio.Event()
+
+            async def work():
+                started.set()
+                await asyncio.sleep(0.1)
+                return "done"
+
+            first = asyncio.create_task(flights.run("k", work))
+            second = asyncio.create_task(flights.run("k", work))
+            await started.wait()
+            first.cancel()
+            self.assertEqual(await second, "done")
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+
+            third = asyncio.create_task(flights.run("k", work))
+            await asyncio.sleep(0.01)
+            third.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await third
+            await asyncio.sleep(0)
+            self.assertEqual(flights.stats(), {"runs": 2, "coalesced": 1, "in_flight": 0})
+
+        asyncio.run(scenario())
+
+    def test_shared_run_takes_its_own_library_lock(self):
+        async def scenario():
+            locks, flights = LibraryLocks(), SingleFlight()
+
+            async def work():
+                # Not covered by the first caller's lock: waits until it is released
+                async with locks.hold([(self.lib, False)]):
+                    return "done"
+
+            async with locks.hold([(self.lib, True)]):
+                shared = asyncio.create_task(flights.run("k", work))
+                await asyncio.sleep(0.05)
+                self.assertFalse(shared.done())
+            return await shared
+
+        self.assertEqual(asyncio.run(scenario()), "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import sys
@@ -22,7 +23,7 @@ class SmokeTests(unittest.TestCase):
         self.assertTrue(os.path.exists(data['executable']))
 
     def test_osxphotos_health_tool(self):
-        out = server.osxphotos_health()
+        out = asyncio.run(server.osxphotos_health())
         data = json.loads(out)
         # Should always return a dict with at least 'found' (bool)
         self.assertIn('found', data)
@@ -33,13 +34,13 @@ class SmokeTests(unittest.TestCase):
 
     def test_osxphotos_batch_edit_alias_exists(self):
         # Should be invocable without raising; dry-run to avoid side effects
-        out = server.batch_edit(dry_run=True, keyword=["animal"])  # type: ignore[arg-type]
+        out = asyncio.run(server.batch_edit(dry_run=True, keyword=["animal"]))  # type: ignore[arg-type]
         # The command might fail at runtime if osxphotos isn't installed; that's OK.
         # We only assert that the function exists and returns a string.
         self.assertIsInstance(out, str)
     def test_batch_edit_available(self):
         # Ensure the canonical batch_edit tool exists
-        out = server.batch_edit(dry_run=True, keyword=["animal"])  # type: ignore[arg-type]
+        out = asyncio.run(server.batch_edit(dry_run=True, keyword=["animal"]))  # type: ignore[arg-type]
         self.assertIsInstance(out, str)
 
 
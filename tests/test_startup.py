@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from typing import List, Optional
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from mcp_osxphotos import startup  # noqa: E402
+from mcp_osxphotos.lazy_tools import LazyFastMCP  # noqa: E402
+
+
+async def greet(name: str, shout: bool = False, tags: Optional[List[str]] = None) -> str:
+    """Say hello."""
+    text = f"hello {name}"
+    return text.upper() if shout else text
+
+
+async def count(items: List[str]) -> str:
+    """Count items."""
+    return str(len(items))
+
+
+def _server(cache_path, lazy=True):
+    server = LazyFastMCP("test", lazy=lazy, schema_cache=cache_path)
+    server.tool()(greet)
+    server.tool()(count)
+    return server
+
+
+def _dump(tools):
+    return [t.model_dump(mode="json", by_alias=True, exclude_none=True) for t in tools]
+
+
+class TestLazyTools(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = os.path.join(self.tmp.name, "schemas.json")
+
+    def test_registration_is_deferred(self):
+        _server(self.cache).build_schema_cache()
+        server = _server(self.cache)
+        self.assertEqual(server._tool_manager.list_tools(), [])
+        self.assertEqual(set(server._deferred), {"greet", "count"})
+
+    def test_without_cache_tools_are_registered_eagerly(self):
+        server = _server(self.cache)
+        self.assertFalse(server.lazy)
+        self.assertEqual({t.name for t in server._tool_manager.list_tools()}, {"greet", "count"})
+        self.assertFalse(os.path.exists(self.cache))
+        # The cache is written after the first tools/list, so the next start is lazy
+        asyncio.run(server.list_tools())
+        self.assertTrue(_server(self.cache).lazy)
+
+    def test_list_tools_matches_eager_and_writes_cache(self):
+        eager = asyncio.run(_server(self.cache, lazy=False).list_tools())
+        lazy = asyncio.run(_server(self.cache).list_tools())
+        self.assertEqual(_dump(lazy), _dump(eager))
+        with open(self.cache) as fh:
+            self.assertEqual(len(json.load(fh)["tools"]), 2)
+
+    def test_cached_schemas_are_served_without_building_tools(self):
+        asyncio.run(_server(self.cache).list_tools())
+        server = _server(self.cache)
+        tools = asyncio.run(server.list_tools())
+        self.assertEqual({t.name for t in tools}, {"greet", "count"})
+        self.assertEqual(server._tool_manager.list_tools(), [])
+
+    def test_call_builds_only_that_tool(self):
+        _server(self.cache).build_schema_cache()
+        server = _server(self.cache)
+        asyncio.run(server.call_tool("greet", {"name": "ann", "shout": True}))
+        self.assertEqual([t.name for t in server._tool_manager.list_tools()], ["greet"])
+        self.assertEqual(set(server._deferred), {"count"})
+
+    def test_stale_cache_is_rebuilt(self):
+        with open(self.cache, "w") as fh:
+            json.dump({"key": "stale", "tools": [{"name": "gone", "inputSchema": {"type": "object"}}]}, fh)
+        tools = asyncio.run(_server(self.cache).list_tools())
+        self.assertEqual({t.name for t in tools}, {"greet", "count"})
+        with open(self.cache) as fh:
+            self.assertNotEqual(json.load(fh)["key"], "stale")
+
+    def test_corrupt_cache_is_ignored(self):
+        with open(self.cache, "w") as fh:
+            fh.write("{not json")
+        tools = asyncio.run(_server(self.cache).list_tools())
+        self.assertEqual(len(tools), 2)
+
+    def test_build_schema_cache(self):
+        server = _server(self.cache)
+        self.assertEqual(server.build_schema_cache(), self.cache)
+        fresh = _server(self.cache)
+        self.assertIsNotNone(fresh._load_schema_cache(fresh.schema_cache_key()))
+
+
+class TestStartupProfile(unittest.TestCase):
+    def test_import_timing_and_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pkg = os.path.join(tmp, "profiled_pkg")
+            os.mkdir(pkg)
+            with open(os.path.join(pkg, "__init__.py"), "w") as fh:
+                fh.write("import time\ntime.sleep(0.002)\nfrom . import child\n")
+            with open(os.path.join(pkg, "child.py"), "w") as fh:
+                fh.write("import time\ntime.sleep(0.002)\n")
+            report_path = os.path.join(tmp, "profile.txt")
+            profile = startup.StartupProfile(report_path)
+            sys.path.insert(0, tmp)
+            sys.meta_path.insert(0, profile)
+            try:
+                import profiled_pkg  # noqa: F401
+            finally:
+                sys.path.remove(tmp)
+                sys.modules.pop("profiled_pkg", None)
+                sys.modules.pop("profiled_pkg.child", None)
+                profile.mark("imported")
+                profile.finish()
+            self.assertNotIn(profile, sys.meta_path)
+            records = {r.name: r for r in profile.imports}
+            parent, child = records["profiled_pkg"], records["profiled_pkg.child"]
+            self.assertEqual((parent.depth, child.depth), (0, 1))
+            self.assertGreaterEqual(parent.cumulative_us, parent.self_us + child.cumulative_us)
+            with open(report_path) as fh:
+                text = fh.read()
+            self.assertIn("imported", text)
+            self.assertIn("|   profiled_pkg.child", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# `hang`: start a grandchild that records its pid, print some progress, then sleep
+HANG_STUB = """
+import os, subprocess, sys, time
+args = sys.argv[1:]
+if "hang" in args:
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    with open(os.environ["STUB_PIDS"], "w") as fh:
+        fh.write(f"{os.getpid()} {child.pid}")
+    print("exported 1 of 3", flush=True)
+    sys.stderr.write("warning: slow disk\\n")
+    sys.stderr.flush()
+    time.sleep(60)
+print(" ".join(args))
+"""
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            # Zombies waiting for a reaper count as stopped
+            return fh.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return not os.path.isdir("/proc")
+
+
+class TestTimeouts(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, HANG_STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.pids = os.path.join(tmp.name, "pids")
+        env = mock.patch.dict(os.environ, {"STUB_PIDS": self.pids, "MCP_OSXPHOTOS_WORKERS": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        grace = mock.patch.object(server, "_KILL_GRACE", 0.5)
+        grace.start()
+        self.addCleanup(grace.stop)
+
+    def read_pids(self):
+        with open(self.pids) as fh:
+            return [int(p) for p in fh.read().split()]
+
+    def assert_group_stopped(self):
+        deadline = time.monotonic() + 3
+        pids = self.read_pids()
+        while any(_alive(p) for p in pids) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse([p for p in pids if _alive(p)])
+
+    def test_timeout_returns_partial_result_and_kills_group(self):
+        start = time.monotonic()
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", "query", "hang"], timeout=0.5))
+        self.assertLess(time.monotonic() - start, 5)
+        first, _, body = out.partition("\n")
+        self.assertTrue(first.startswith("Error: osxphotos timed out after 0.5s"))
+        partial = json.loads(body)
+        self.assertEqual(partial["error"], "timeout")
+        self.assertEqual(partial["command"], ["osxphotos", "query", "hang"])
+        self.assertIn("exported 1 of 3", partial["stdout_tail"])
+        self.assertIn("warning: slow disk", partial["stderr_tail"])
+        self.assert_group_stopped()
+
+    def test_timeout_with_progress_keeps_tails(self):
+        out = asyncio.run(server.run_with_progress(["osxphotos", "export", "hang"], timeout=0.5))
+        partial = json.loads(out.partition("\n")[2])
+        self.assertIn("exported 1 of 3", partial["stdout_tail"])
+        self.assertIn("warning: slow disk", partial["stderr_tail"])
+        self.assert_group_stopped()
+
+    def test_tool_timeout_parameter(self):
+        out = asyncio.run(server.albums(library="hang", timeout=0.5))
+        self.assertTrue(out.startswith("Error: osxphotos timed out"))
+
+    def test_cancellation_kills_group(self):
+        async def scenario():
+            task = asyncio.create_task(server.run_osxphotos_command(["osxphotos", "export", "hang"]))
+            while not os.path.exists(self.pids):
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # Let the reaper task escalate and collect the child
+            await asyncio.sleep(1.0)
+
+        asyncio.run(scenario())
+        self.assert_group_stopped()
+
+    def test_category_defaults(self):
+        self.assertEqual(server._timeout_category(["osxphotos", "albums"]), "listing")
+        self.assertEqual(server._timeout_category(["osxphotos", "query"]), "query")
+        self.assertEqual(server._timeout_category(["osxphotos", "timewarp"]), "mutation")
+        self.assertEqual(server._timeout_category(["osxphotos", "export", "/tmp"]), "export")
+        self.assertIsNone(server._command_timeout(["osxphotos", "export"]))
+        self.assertEqual(server._command_timeout(["osxphotos", "albums"]), 300.0)
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_TIMEOUT_LISTING": "0", "MCP_OSXPHOTOS_TIMEOUT_EXPORT": "60"}):
+            self.assertIsNone(server._command_timeout(["osxphotos", "albums"]))
+            self.assertEqual(server._command_timeout(["osxphotos", "export"]), 60.0)
+        # Per-call values win over the category default; 0 disables the limit
+        self.assertEqual(server._command_timeout(["osxphotos", "export"], 5), 5)
+        self.assertIsNone(server._command_timeout(["osxphotos", "albums"], 0))
+
+    def test_env_default_applies(self):
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_TIMEOUT_LISTING": "0.5"}):
+            out = asyncio.run(server.run_osxphotos_command(["osxphotos", "albums", "hang"]))
+        self.assertTrue(out.startswith("Error: osxphotos timed out after 0.5s"))
+
+    def test_fast_command_unaffected(self):
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", "albums"], timeout=5))
+        self.assertEqual(out.strip(), "albums")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.cache import ResultCache  # noqa: E402
+from mcp_osxphotos.tracing import Tracer  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+STUB = """
+import sys
+print('{"persons": {"Alice": 3}}')
+"""
+
+
+def _load(path):
+    """Parse a trace file the way a trace viewer does: an array that may lack its "]"."""
+    with open(path) as fh:
+        text = fh.read()
+    return json.loads(text.rstrip().rstrip(",") + "]")
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, STUB)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "trace.jsonl")
+        env = mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_WORKERS": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        cache = mock.patch.object(server, "_result_cache", ResultCache(ttl=0))
+        cache.start()
+        self.addCleanup(cache.stop)
+        # Tools were wrapped with the server's tracer at registration: switch that one on
+        tracer = mock.patch.multiple(server._tracer, path=self.path, enabled=True)
+        tracer.start()
+        self.addCleanup(tracer.stop)
+        self.addCleanup(server._tracer.close)
+
+    def test_tool_call_breakdown(self):
+        asyncio.run(server.mcp.call_tool("persons", {"json": True}))
+        events = _load(self.path)
+        spans = {e["name"]: e for e in events if e["ph"] == "X"}
+        for name in ("tools/call persons", "validate_arguments", "tool persons", "build_argv", "result_cache",
+                     "osxphotos persons", "queue_wait", "spawn", "child", "decode_output", "serialize_result"):
+            self.assertIn(name, spans)
+        self.assertEqual({e["tid"] for e in events}, {spans["tool persons"]["tid"]})
+        names = [e["args"]["name"] for e in events if e["ph"] == "M"]
+        self.assertEqual(names, [f"persons #{spans['tool persons']['tid']}"])
+
+        def inside(inner, outer):
+            a, b = spans[inner], spans[outer]
+            return b["ts"] <= a["ts"] and a["ts"] + a["dur"] <= b["ts"] + b["dur"]
+
+        self.assertTrue(inside("tool persons", "tools/call persons"))
+        self.assertTrue(inside("child", "osxphotos persons"))
+        self.assertTrue(inside("osxphotos persons", "tool persons"))
+        self.assertEqual(spans["child"]["args"]["returncode"], 0)
+
+    def tool(self, name):
+        # The registered (wrapped) function, as a background job calls it
+        return server.mcp.get_tool(name).fn
+
+    def test_calls_outside_a_request_get_their_own_track(self):
+        async def scenario():
+            await asyncio.gather(self.tool("persons")(json=True), self.tool("keywords")(json=True))
+
+        asyncio.run(scenario())
+        events = _load(self.path)
+        tracks = {e["tid"] for e in events if e["ph"] == "X"}
+        self.assertEqual(len(tracks), 2)
+
+    def test_appends_across_restarts(self):
+        asyncio.run(self.tool("persons")(json=True))
+        server._tracer.close()
+        asyncio.run(self.tool("persons")(json=True))
+        events = _load(self.path)
+        self.assertEqual(sum(1 for e in events if e["name"] == "tool persons"), 2)
+
+
+class TestDisabledTracer(unittest.TestCase):
+    def test_disabled_tracer_is_a_no_op(self):
+        tracer = Tracer(None)
+        self.assertIs(tracer.span("a"), tracer.span("b"))
+
+        def tool():
+            return "ok"
+
+        self.assertEqual(tracer.instrument(tool)(), "ok")
+        with tracer.call("tool"):
+            tracer.complete("x", 0, 1)
+        self.assertIsNone(tracer._fh)
+
+    def test_unwritable_path_disables_tracing(self):
+        with tempfile.NamedTemporaryFile() as fh:
+            tracer = Tracer(os.path.join(fh.name, "trace.jsonl"))
+            with tracer.span("a"):
+                pass
+        self.assertFalse(tracer.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Any command: prints {"argv", "file", "uuids"} with the contents of --uuid-from-file
+UUID_STUB = """
+import json, os, sys
+args = sys.argv[1:]
+path = args[args.index("--uuid-from-file") + 1] if "--uuid-from-file" in args else None
+uuids = open(path).read().split() if path and os.path.exists(path) else None
+print(json.dumps({"argv": args, "file": path, "uuids": uuids}))
+"""
+
+UUIDS = [f"UUID-{i:04d}" for i in range(12)]
+
+
+def uuid_args(uuids):
+    return [arg for uuid in uuids for arg in ("--uuid", uuid)]
+
+
+class TestUuidFile(unittest.TestCase):
+    def setUp(self):
+        install_stub(self, UUID_STUB)
+        env = mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_UUID_FILE_THRESHOLD": "10", "MCP_OSXPHOTOS_WORKERS": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def run_command(self, *args):
+        out = asyncio.run(server.run_osxphotos_command(["osxphotos", *args]))
+        return json.loads(out)
+
+    def test_long_lists_go_through_a_file_that_is_removed(self):
+        result = self.run_command("batch-edit", "--title", "x", *uuid_args(UUIDS))
+        self.assertEqual(result["argv"], ["batch-edit", "--title", "x", "--uuid-from-file", result["file"]])
+        self.assertEqual(result["uuids"], UUIDS)
+        self.assertFalse(os.path.exists(result["file"]))
+
+    def test_short_lists_and_other_commands_keep_argv(self):
+        short = self.run_command("sync", *uuid_args(UUIDS[:10]))
+        self.assertEqual(short["argv"], ["sync", *uuid_args(UUIDS[:10])])
+        other = self.run_command("places", *uuid_args(UUIDS))
+        self.assertIsNone(other["file"])
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_UUID_FILE_THRESHOLD": "0"}):
+            self.assertIsNone(self.run_command("query", *uuid_args(UUIDS))["file"])
+
+    def test_a_given_uuid_file_is_merged(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as fh:
+            fh.write("# selected\nGIVEN-1\n\nGIVEN-2\n")
+        self.addCleanup(os.remove, fh.name)
+        result = self.run_command("query", "--uuid-from-file", fh.name, *uuid_args(UUIDS), "--json")
+        self.assertEqual(result["argv"], ["query", "--json", "--uuid-from-file", result["file"]])
+        self.assertEqual(result["uuids"], UUIDS + ["GIVEN-1", "GIVEN-2"])
+        self.assertTrue(os.path.exists(fh.name))
+        # An unreadable file is left for osxphotos to report
+        missing = self.run_command("query", "--uuid-from-file", "/nonexistent/uuids.txt", *uuid_args(UUIDS))
+        self.assertEqual(missing["file"], "/nonexistent/uuids.txt")
+
+    def test_tools_pass_long_lists_through_a_file(self):
+        out = asyncio.run(server.timewarp(uuid=UUIDS, add_to_album="x"))
+        result = json.loads(out)
+        self.assertEqual(result["uuids"], UUIDS)
+        self.assertNotIn("--uuid", result["argv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
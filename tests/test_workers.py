@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+# Ensure src/ is on sys.path so we can import the package in editable/dev mode
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from mcp_osxphotos import server  # noqa: E402
+from mcp_osxphotos.workers import osxphotos_python  # noqa: E402
+from osxphotos_stub import install_stub  # noqa: E402
+
+# Minimal importable stand-in for the osxphotos package: `pid` prints the worker pid,
+# `confirm` asks for confirmation like timewarp or batch-edit without --force
+FAKE_CLI = """
+import os
+import click
+
+@click.group()
+def cli_main():
+    pass
+
+@cli_main.command()
+def pid():
+    click.echo(str(os.getpid()))
+
+@cli_main.command()
+@click.argument("code", type=int)
+def fail(code):
+    click.echo("bad things", err=True)
+    raise SystemExit(code)
+
+@cli_main.command()
+def confirm():
+    click.confirm("Really?", abort=True)
+    click.echo("confirmed")
+"""
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        install_stub(self)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        pkg = os.path.join(tmp.name, "osxphotos")
+        os.makedirs(os.path.join(pkg, "cli"))
+        with open(os.path.join(pkg, "__init__.py"), "w") as fh:
+            fh.write('__version__ = "0.0-test"\n')
+        with open(os.path.join(pkg, "cli", "__init__.py"), "w") as fh:
+            fh.write(textwrap.dedent(FAKE_CLI))
+        self.fake_path = tmp.name
+
+    def _env(self, **extra):
+        env = {
+            "MCP_OSXPHOTOS_WORKERS": "1",
+            "MCP_OSXPHOTOS_WORKER_PYTHON": sys.executable,
+            "PYTHONPATH": self.fake_path,
+        }
+        env.update(extra)
+        return mock.patch.dict(os.environ, env)
+
+    def _run_many(self, *commands):
+        async def scenario():
+            try:
+                return [await server.run_osxphotos_command(cmd) for cmd in commands]
+            finally:
+                pool = server._worker_pool()
+                if pool is not None:
+                    await pool.close()
+
+        return asyncio.run(scenario())
+
+    def test_commands_reuse_warm_worker(self):
+        with self._env():
+            first, second = self._run_many(["osxphotos", "pid"], ["osxphotos", "pid"])
+        self.assertEqual(first, second)
+        self.assertNotEqual(first.strip(), str(os.getpid()))
+
+    def test_worker_recycled_after_max_jobs(self):
+        with self._env(MCP_OSXPHOTOS_WORKER_MAX_JOBS="1"):
+            first, second = self._run_many(["osxphotos", "pid"], ["osxphotos", "pid"])
+        self.assertNotEqual(first, second)
+
+    def test_nonzero_exit_maps_to_error(self):
+        with self._env():
+            (out,) = self._run_many(["osxphotos", "fail", "3"])
+        self.assertTrue(out.startswith("Error: "))
+        self.assertIn("bad things", out)
+
+    def test_prompts_abort_instead_of_reading_the_protocol_pipe(self):
+        async def scenario():
+            try:
+                out = await server.run_osxphotos_command(["osxphotos", "confirm"], timeout=30)
+                # The worker is still usable afterwards
+                pid = await server.run_osxphotos_command(["osxphotos", "pid"], timeout=30)
+                return out, pid
+            finally:
+                await server._worker_pool().close()
+
+        with self._env():
+            out, pid = asyncio.run(scenario())
+        self.assertTrue(out.startswith("Error: "), out)
+        self.assertIn("Aborted!", out)
+        self.assertNotEqual(pid.strip(), str(os.getpid()))
+
+    def test_workers_stop_with_the_server(self):
+        async def scenario():
+            async with server._server_lifespan(server.mcp):
+                await server.run_osxphotos_command(["osxphotos", "pid"])
+                pool = server._worker_pool()
+                (worker,) = pool._idle
+            return pool, worker
+
+        with self._env(MCP_OSXPHOTOS_HELP_PREWARM="0"), mock.patch.object(server, "_jobs", mock.AsyncMock()):
+            pool, worker = asyncio.run(scenario())
+        self.assertEqual(pool.status()["idle"], 0)
+        self.assertIsNotNone(worker.proc.returncode)
+
+    def test_falls_back_to_subprocess_when_unavailable(self):
+        # Without the fake package on PYTHONPATH the worker cannot import osxphotos
+        with self._env(PYTHONPATH=""):
+            (out,) = self._run_many(["osxphotos", "pid"])
+        # The stub executable echoes its arguments
+        self.assertEqual(out.strip(), "pid")
+
+    def test_excluded_commands_bypass_workers(self):
+        with self._env():
+            (out,) = self._run_many(["osxphotos", "install", "foo"])
+        self.assertEqual(out.strip(), "install foo")
+
+    def test_python_discovered_from_shebang(self):
+        with tempfile.NamedTemporaryFile("w", suffix="osxphotos", delete=False) as fh:
+            fh.write("#!/opt/venv/bin/python3.12\nprint('hi')\n")
+        self.addCleanup(os.unlink, fh.name)
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_WORKER_PYTHON": ""}):
+            self.assertEqual(osxphotos_python(fh.name), "/opt/venv/bin/python3.12")
+        with open(fh.name, "wb") as out:
+            out.write(b"\xcf\xfa\xed\xfe binary")
+        with mock.patch.dict(os.environ, {"MCP_OSXPHOTOS_WORKER_PYTHON": ""}):
+            self.assertIsNone(osxphotos_python(fh.name))
+
+
+if __name__ == "__main__":
+    unittest.main()